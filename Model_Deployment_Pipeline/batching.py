@@ -0,0 +1,123 @@
+import asyncio
+import inspect
+import os
+from inference_executor import InferenceSaturated
+
+# Batching window (overridable per deployment)
+MAX_BATCH_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "128"))
+MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
+MAX_QUEUED_REVIEWS = int(os.environ.get("BATCH_MAX_QUEUE", "1024"))
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-review predictions into one vectorized predict call.
+
+    Requests are queued and flushed as a batch when either `max_batch_size` reviews
+    are waiting or `max_wait_ms` has elapsed since the first review of the batch arrived.
+    Batches are dispatched concurrently, so an async `predict_batch` backed by a pool keeps
+    every worker busy. At most `max_queue` reviews may wait; beyond that `submit` raises
+    InferenceSaturated.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_queue=MAX_QUEUED_REVIEWS):
+        self.predict_batch = predict_batch  # callable (sync or async): list[str] -> list of predictions
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self._queue = None
+        self._worker = None
+        self._in_flight = set()
+
+    def start(self):
+        """Start the background batching task on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching task, failing any reviews still waiting in the queue."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, review):
+        """Queue a single review and wait for its prediction."""
+        return (await self.submit_many([review]))[0]
+
+    async def submit_many(self, reviews):
+        """Queue several reviews; they may be split across or merged with other batches.
+
+        Either all reviews are queued or, if the queue cannot hold them, none are and
+        InferenceSaturated is raised.
+        """
+        if self._queue.qsize() + len(reviews) > self.max_queue:
+            raise InferenceSaturated(
+                f"Cannot queue {len(reviews)} reviews, {self._queue.qsize()} already waiting for a batch"
+            )
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for review in reviews:
+            future = loop.create_future()
+            self._queue.put_nowait((review, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        """Wait for the first review, then gather more until the batch is full or the window closes."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Drain anything already queued without yielding to the loop
+            while not self._queue.empty() and len(batch) < self.max_batch_size:
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - loop.time()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Skip reviews whose caller already went away (e.g. client disconnect)
+            batch = [(review, future) for review, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        reviews = [review for review, _ in batch]
+        try:
+            predictions = self.predict_batch(reviews)
+            if inspect.isawaitable(predictions):
+                predictions = await predictions
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
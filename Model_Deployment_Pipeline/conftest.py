@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import numpy as np
+import pytest
+
+# Keep tests off BigQuery and GCS polling; must be set before the app modules are imported
+os.environ.setdefault("PREDICTION_LOG_SINK", "file")
+os.environ.setdefault("MODEL_POLL_INTERVAL_S", "0")
+
+# The exporter lives with the training code
+MODEL_PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Model_Pipeline")
+if MODEL_PIPELINE_DIR not in sys.path:
+    sys.path.append(MODEL_PIPELINE_DIR)
+
+TRAINING_REVIEWS = [
+    ("This product is amazing, I love it!", 2),
+    ("Great quality, works perfectly and arrived early", 2),
+    ("Très bien, j'adore ce café", 2),
+    ("Best purchase this year, highly recommended", 2),
+    ("It is okay, nothing special.", 1),
+    ("Average product, does the job I guess", 1),
+    ("Not bad, not great either", 1),
+    ("Terrible quality, it broke after one day.", 0),
+    ("Awful, waste of money, do not buy", 0),
+    ("Stopped working, the seller never replied", 0),
+]
+
+
+class StubModel:
+    """Model double that predicts class 2 for everything; holds each call until `release` is set."""
+
+    classes_ = np.array([0, 1, 2])
+
+    def __init__(self, block=False):
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def predict(self, reviews):
+        return np.argmax(self.predict_proba(reviews), axis=1)
+
+    def predict_proba(self, reviews):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(10)
+        return np.tile([0.1, 0.2, 0.7], (len(reviews), 1))
+
+
+def train_pipeline(**vectorizer_params):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.pipeline import Pipeline
+
+    reviews, labels = zip(*TRAINING_REVIEWS)
+    pipeline = Pipeline([("tfidf", TfidfVectorizer(**vectorizer_params)), ("nb", MultinomialNB())])
+    return pipeline.fit(list(reviews), list(labels))
+
+
+@pytest.fixture(scope="session")
+def exported_model_path(tmp_path_factory):
+    """A small trained pipeline exported to .nbm, as Model_training.py would publish it."""
+    from model_export import export_model
+
+    path = str(tmp_path_factory.mktemp("model") / "model.nbm")
+    export_model(train_pipeline(ngram_range=(1, 2)), path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def app_main(tmp_path_factory):
+    """The FastAPI app module, imported once with a stub model instead of the GCS download."""
+    import model_loader
+
+    workdir = tmp_path_factory.mktemp("app")
+    (workdir / "templates").mkdir()
+    (workdir / "static").mkdir()
+    (workdir / "templates" / "index.html").write_text("{{ sentiment }}")
+
+    load_latest_model = model_loader.load_latest_model
+    model_loader.load_latest_model = lambda *args, **kwargs: (StubModel(), "1")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+        model_loader.load_latest_model = load_latest_model
+    return main
+
+
+@pytest.fixture(scope="session")
+def app_client(app_main):
+    """One client for the whole session: shutdown closes the executor, so the app cannot restart."""
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_main.app) as client:
+        yield client
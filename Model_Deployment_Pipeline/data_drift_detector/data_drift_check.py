@@ -1,11 +1,16 @@
 from google.cloud import storage, bigquery
 import pandas as pd
 from sklearn.feature_extraction.text import CountVectorizer
-from scipy.stats import chi2_contingency
+from scipy.stats import chi2
+from collections import Counter
 import tempfile
+import base64
+import zipfile
+import time
 import os
 import numpy as np
 import requests  # <-- missing import
+from drift_state import SECONDS_PER_HOUR, DriftState, parse_window
 
 # Get key path (for local testing only — not needed in GKE if using Workload Identity or mounted secret)
 KEY_FILE = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
@@ -14,69 +19,374 @@ KEY_FILE = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
 if KEY_FILE and not os.path.exists(KEY_FILE):
     raise ValueError(f"GCP key file not found at: {KEY_FILE}")
 
-def load_reference_data(bucket_name="mlops_dataset123", blob_path="data/raw/Sampled_Chunk.csv"):
+# Drift test config
+DRIFT_ALPHA = 0.001
+MIN_TERM_COUNT = 5  # Terms seen fewer times in total are not tested
+P_VALUE_CORRECTION = os.environ.get("DRIFT_P_CORRECTION") or None  # None, "bonferroni" or "fdr_bh"
+
+# Reference vocabulary snapshots (built once per reference dataset)
+SNAPSHOT_DIR = os.environ.get("DRIFT_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "drift_reference"))
+SNAPSHOT_GCS_PREFIX = "drift_reference/"
+
+# Incremental drift monitoring over the prediction logs
+LOGS_TABLE = "mlops-project-test-448822.sentiment_data.user_logs"
+DRIFT_WINDOWS = [w.strip() for w in os.environ.get("DRIFT_WINDOWS", "1h,24h,7d").split(",") if w.strip()]
+DRIFT_TRIGGER_WINDOW = os.environ.get("DRIFT_TRIGGER_WINDOW", "24h")  # Window whose drift triggers retraining
+# Rows are only ingested once they are this old, so rows still in the logger's buffer are not skipped
+INGEST_LAG_S = int(os.environ.get("DRIFT_INGEST_LAG_S", "300"))
+# Logged reviews are counted in buckets of this many seconds; every window must be a whole number of them
+BUCKET_S = int(os.environ.get("DRIFT_BUCKET_S", "300"))
+STATE_PATH = os.path.join(os.environ.get("DRIFT_STATE_DIR", tempfile.gettempdir()), "drift_state.npz")
+STATE_BLOB = "drift_state/drift_state.npz"
+
+# Both sides are streamed in chunks of this many rows, so peak memory does not grow with the data
+CHUNK_SIZE = int(os.environ.get("DRIFT_CHUNK_SIZE", "50000"))
+CURRENT_DATA_PATH = os.environ.get("DRIFT_CURRENT_PATH")  # Local CSV (review, timestamp) standing in for BigQuery
+
+def load_reference_data(bucket_name="mlops_dataset123", blob_path="data/raw/Sampled_Chunk.csv", chunksize=CHUNK_SIZE):
+    """Yields the reference reviews as DataFrames of at most `chunksize` rows."""
     client = storage.Client() if not KEY_FILE else storage.Client.from_service_account_json(KEY_FILE)
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_path)
     
-    _, temp_path = tempfile.mkstemp()
-    blob.download_to_filename(temp_path)
-    
-    df = pd.read_csv(temp_path)
-    df["review_texts"] = df["review_headline"].fillna("") + " " + df["review_body"].fillna("")
-    return df[["review_texts"]]
+    fd, temp_path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        blob.download_to_filename(temp_path)
+        for df in pd.read_csv(temp_path, usecols=["review_headline", "review_body"], chunksize=chunksize):
+            df["review_texts"] = df["review_headline"].fillna("") + " " + df["review_body"].fillna("")
+            yield df[["review_texts"]]
+    finally:
+        os.remove(temp_path)
+
+def review_texts(chunk):
+    """The chunk's `review_texts`, with missing reviews (NULL in the logs) as empty strings."""
+    return chunk["review_texts"].fillna("").astype(str)
+
+def count_terms(chunks, vocabulary=None):
+    """Sums per-term counts over an iterable of DataFrames with a `review_texts` column.
+
+    With a fixed `vocabulary` returns a count array aligned with it. Otherwise the vocabulary is
+    learned incrementally and (sorted vocabulary, counts) is returned, identical to fitting one
+    CountVectorizer on all rows at once; memory is bounded by the vocabulary, not the row count.
+    Missing reviews count as empty.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    if vocabulary is not None:
+        vectorizer = CountVectorizer(vocabulary=vocabulary.tolist())
+        counts = np.zeros(len(vocabulary), dtype=np.int64)
+        for chunk in chunks:
+            counts += np.asarray(vectorizer.transform(review_texts(chunk)).sum(axis=0), dtype=np.int64).ravel()
+        return counts
+
+    term_counts = Counter()
+    for chunk in chunks:
+        vectorizer = CountVectorizer()
+        try:
+            chunk_counts = vectorizer.fit_transform(review_texts(chunk))
+        except ValueError:
+            continue  # No terms at all in this chunk
+        chunk_totals = np.asarray(chunk_counts.sum(axis=0)).ravel().tolist()
+        term_counts.update(dict(zip(vectorizer.get_feature_names_out().tolist(), chunk_totals)))
+
+    vocabulary = sorted(term_counts)
+    counts = np.fromiter((term_counts[term] for term in vocabulary), dtype=np.int64, count=len(vocabulary))
+    # Object array: a fixed-width unicode array would pad every term to the longest one
+    return np.array(vocabulary, dtype=object), counts
+
+def build_reference_snapshot(reference_chunks):
+    """Fits the reference vocabulary; returns (vocabulary, per-term counts) in vocabulary order."""
+    vocabulary, counts = count_terms(reference_chunks)
+    if len(vocabulary) == 0:
+        raise ValueError("Reference data contains no terms")
+    return vocabulary, counts
+
+def save_reference_snapshot(path, vocabulary, counts, data_hash):
+    """Writes the snapshot as an uncompressed .npz (no pickled objects), atomically.
+
+    Terms are stored as one UTF-8 byte table plus int64 offsets (term i is
+    term_bytes[term_offsets[i]:term_offsets[i + 1]]), so long terms are neither truncated nor padded.
+    """
+    encoded = [term.encode("utf-8") for term in vocabulary]
+    term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    term_offsets[1:] = np.cumsum([len(term) for term in encoded])
+    term_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, term_bytes=term_bytes, term_offsets=term_offsets, counts=counts, data_hash=np.array(data_hash))
+    os.replace(temp_path, path)
+
+def read_reference_snapshot(path):
+    """Returns (vocabulary, counts); raises ValueError if the file is not a complete snapshot."""
+    try:
+        with np.load(path, allow_pickle=False) as snapshot:
+            term_bytes = snapshot["term_bytes"].tobytes()
+            term_offsets = snapshot["term_offsets"]
+            counts = snapshot["counts"]
+    except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Unreadable reference snapshot {path}: {e}") from e
+
+    if (len(term_offsets) != len(counts) + 1 or term_offsets[0] != 0 or term_offsets[-1] != len(term_bytes)
+            or np.any(np.diff(term_offsets) < 0)):
+        raise ValueError(f"Corrupt term table in reference snapshot {path}")
+    vocabulary = np.array([term_bytes[start:end].decode("utf-8")
+                           for start, end in zip(term_offsets[:-1].tolist(), term_offsets[1:].tolist())],
+                          dtype=object)
+    return vocabulary, counts
+
+def download_reference_snapshot(blob, path):
+    """Downloads next to `path` and renames into place, so a failed download never leaves a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz.download")
+    os.close(fd)
+    try:
+        blob.download_to_filename(temp_path)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+def reference_data_key(blob):
+    """Snapshot key of the reference data blob, read from its metadata without downloading it.
+
+    Composite uploads have no MD5, so their CRC32C (with the size) is used instead, and the
+    generation as a last resort; the MD5 key stays a bare hex digest, as in existing snapshots.
+    """
+    if blob.md5_hash:
+        return base64.b64decode(blob.md5_hash).hex()
+    if blob.crc32c:
+        return f"crc32c-{base64.b64decode(blob.crc32c).hex()}-{blob.size}"
+    if blob.generation:
+        return f"generation-{blob.generation}"
+    raise ValueError(f"Reference data gs://{blob.bucket.name}/{blob.name} has no checksum or generation")
+
+def load_reference_snapshot(bucket_name="mlops_dataset123", blob_path="data/raw/Sampled_Chunk.csv"):
+    """Returns the reference (vocabulary, counts), fitting them only once per reference dataset.
+
+    Snapshots are keyed by `reference_data_key` and looked up in the local snapshot dir, then in
+    GCS, before refitting from the raw CSV; a snapshot that fails to load is skipped.
+    """
+    client = storage.Client() if not KEY_FILE else storage.Client.from_service_account_json(KEY_FILE)
+    bucket = client.bucket(bucket_name)
+    reference_blob = bucket.get_blob(blob_path)
+    if reference_blob is None:
+        raise FileNotFoundError(f"Reference data not found: gs://{bucket_name}/{blob_path}")
+    data_hash = reference_data_key(reference_blob)
+
+    snapshot_name = f"{data_hash}.npz"
+    local_path = os.path.join(SNAPSHOT_DIR, snapshot_name)
+    if os.path.exists(local_path):
+        try:
+            reference = read_reference_snapshot(local_path)
+            print(f"✅ Using local reference snapshot {snapshot_name}")
+            return reference
+        except ValueError as e:
+            print(f"⚠️ {e}, ignoring it.")
+
+    snapshot_blob = bucket.blob(SNAPSHOT_GCS_PREFIX + snapshot_name)
+    if snapshot_blob.exists():
+        try:
+            download_reference_snapshot(snapshot_blob, local_path)
+            reference = read_reference_snapshot(local_path)
+            print(f"✅ Downloaded reference snapshot gs://{bucket_name}/{snapshot_blob.name}")
+            return reference
+        except Exception as e:
+            print(f"⚠️ Could not use reference snapshot gs://{bucket_name}/{snapshot_blob.name}: {e}")
+
+    print("🔹 No usable reference snapshot found, building it from the raw reference data...")
+    vocabulary, counts = build_reference_snapshot(load_reference_data(bucket_name, blob_path))
+    save_reference_snapshot(local_path, vocabulary, counts, data_hash)
+    snapshot_blob.upload_from_filename(local_path)
+    print(f"✅ Uploaded reference snapshot to gs://{bucket_name}/{snapshot_blob.name}")
+    return vocabulary, counts
+
+def load_current_data_from_file(path, since, until, chunksize=CHUNK_SIZE):
+    """Yields logged reviews from a local CSV with `review` and `timestamp` columns."""
+    for df in pd.read_csv(path, usecols=["review", "timestamp"], chunksize=chunksize):
+        timestamps = pd.to_datetime(df["timestamp"], utc=True)
+        seconds = (timestamps - pd.Timestamp(0, tz="UTC")).dt.total_seconds()
+        in_range = (seconds > since) & (seconds <= until)
+        yield pd.DataFrame({
+            "review_texts": df.loc[in_range, "review"].fillna("").astype(str),
+            "timestamp": seconds[in_range],
+        })
+
+def load_current_data(since, until, chunksize=CHUNK_SIZE):
+    """Yields logged reviews with since < timestamp <= until (epoch seconds), one page at a time."""
+    if CURRENT_DATA_PATH:
+        yield from load_current_data_from_file(CURRENT_DATA_PATH, since, until, chunksize)
+        return
 
-def load_current_data():
     client = bigquery.Client() if not KEY_FILE else bigquery.Client.from_service_account_json(KEY_FILE)
-    query = "SELECT review AS review_texts FROM `mlops-project-test-448822.sentiment_data.user_logs`"
-    return client.query(query).to_dataframe()
+    query = (
+        "SELECT review AS review_texts, UNIX_MICROS(timestamp) / 1e6 AS timestamp "
+        f"FROM `{LOGS_TABLE}` "
+        "WHERE timestamp > TIMESTAMP_MICROS(@since) AND timestamp <= TIMESTAMP_MICROS(@until)"
+    )
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("since", "INT64", int(since * 1e6)),
+        bigquery.ScalarQueryParameter("until", "INT64", int(until * 1e6)),
+    ])
+    rows = client.query(query, job_config=job_config).result(page_size=chunksize)
+    yield from rows.to_dataframe_iterable()
 
-def detect_data_drift(reference_df, current_df, output_path="drift_report.html"):
-    vectorizer = CountVectorizer()
-    ref_counts = vectorizer.fit_transform(reference_df["review_texts"])
-    current_counts = vectorizer.transform(current_df["review_texts"])
-    
-    ref_word_counts = np.array(ref_counts.sum(axis=0)).flatten()
-    current_word_counts = np.array(current_counts.sum(axis=0)).flatten()
-    
+def chi2_2x2(count_ref, count_curr, total_ref, total_curr):
+    """Pearson chi-square (no Yates correction) of every term's 2x2 table, computed as whole arrays.
+
+    Row 1 is (count_ref, total_ref - count_ref), row 2 is (count_curr, total_curr - count_curr).
+    Tables with an empty row or column have no defined statistic and get p = 1.
+    """
+    a = np.asarray(count_ref, dtype=np.float64)
+    c = np.asarray(count_curr, dtype=np.float64)
+    b = total_ref - a
+    d = total_curr - c
+    n = float(total_ref) + float(total_curr)
+
+    denominator = (a + b) * (c + d) * (a + c) * (b + d)
+    valid = denominator > 0
+    stat = np.zeros_like(a)
+    stat[valid] = n * (a[valid] * d[valid] - b[valid] * c[valid]) ** 2 / denominator[valid]
+
+    p_values = np.ones_like(a)
+    p_values[valid] = chi2.sf(stat[valid], df=1)
+    return stat, p_values
+
+def adjust_p_values(p_values, method=None):
+    """Multiple-testing correction: None, "bonferroni" or "fdr_bh" (Benjamini-Hochberg)."""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    m = p_values.size
+    if method is None or m == 0:
+        return p_values
+    if method == "bonferroni":
+        return np.minimum(p_values * m, 1.0)
+    if method == "fdr_bh":
+        order = np.argsort(p_values)
+        ranked = p_values[order] * m / np.arange(1, m + 1)
+        ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+        adjusted = np.empty_like(p_values)
+        adjusted[order] = np.minimum(ranked, 1.0)
+        return adjusted
+    raise ValueError(f"Unknown p-value correction: {method}")
+
+def drift_test(feature_names, ref_word_counts, current_word_counts, alpha=DRIFT_ALPHA,
+               correction=P_VALUE_CORRECTION):
+    """Chi-square test of every term's reference vs. current frequency."""
     total_ref_counts = ref_word_counts.sum()
     total_current_counts = current_word_counts.sum()
-    
-    drifted_features = 0
-    significant_features = []
-    alpha = 0.001
-
-    for i, word in enumerate(vectorizer.get_feature_names_out()):
-        count_ref = ref_word_counts[i]
-        count_curr = current_word_counts[i]
-        if count_ref + count_curr < 5:
-            continue
-
-        table = [
-            [count_ref, total_ref_counts - count_ref],
-            [count_curr, total_current_counts - count_curr]
-        ]
-        chi2, p, _, _ = chi2_contingency(table, correction=False)
-        if p < alpha:
-            drifted_features += 1
-            significant_features.append(word)
-    
-    total_features = len(vectorizer.get_feature_names_out())
-    drift_detected = (drifted_features / total_features) > alpha
 
+    # Test every sufficiently frequent term at once
+    tested = np.flatnonzero(ref_word_counts + current_word_counts >= MIN_TERM_COUNT)
+    _, p_values = chi2_2x2(
+        ref_word_counts[tested], current_word_counts[tested], total_ref_counts, total_current_counts
+    )
+    p_values = adjust_p_values(p_values, correction)
+
+    significant = tested[p_values < alpha]
+    drifted_features = int(significant.size)
+    total_features = len(feature_names)
+    return {
+        "drift_detected": (drifted_features / total_features) > alpha,
+        "drifted_features": drifted_features,
+        "total_features": total_features,
+        "significant_features": feature_names[significant].tolist(),
+        "current_terms": int(total_current_counts),
+    }
+
+def write_drift_report(output_path, sections):
+    """Writes the HTML report; `sections` is a list of (title or None, drift_test result)."""
     with open(output_path, "w", encoding="utf-8") as f:
         f.write("<html><head><title>Data Drift Report</title></head><body>")
         f.write("<h1>Data Drift Report</h1>")
-        f.write(f"<p><strong>Drift Detected:</strong> {drift_detected}</p>")
-        f.write(f"<p><strong>Drifted Features:</strong> {drifted_features} / {total_features}</p>")
-        if significant_features:
-            f.write("<ul>")
-            for word in significant_features[:20]:
-                f.write(f"<li>{word}</li>")
-            f.write("</ul>")
+        for title, result in sections:
+            if title:
+                f.write(f"<h2>{title}</h2>")
+                f.write(f"<p><strong>Terms Observed:</strong> {result['current_terms']}</p>")
+            f.write(f"<p><strong>Drift Detected:</strong> {result['drift_detected']}</p>")
+            f.write(f"<p><strong>Drifted Features:</strong> {result['drifted_features']} / {result['total_features']}</p>")
+            if result["significant_features"]:
+                f.write("<ul>")
+                for word in result["significant_features"][:20]:
+                    f.write(f"<li>{word}</li>")
+                f.write("</ul>")
         f.write("</body></html>")
-    
-    return drift_detected, drifted_features
+
+def detect_data_drift(reference, current, output_path="drift_report.html", alpha=DRIFT_ALPHA,
+                      correction=P_VALUE_CORRECTION):
+    """`reference` is a (vocabulary, counts) snapshot, or raw reference data to fit one from.
+
+    Raw data (reference or `current`) is a DataFrame or an iterable of DataFrame chunks with a
+    `review_texts` column.
+    """
+    if not isinstance(reference, tuple):
+        reference = build_reference_snapshot(reference)
+    feature_names, ref_word_counts = reference
+
+    current_word_counts = count_terms(current, vocabulary=feature_names)
+
+    result = drift_test(feature_names, ref_word_counts, current_word_counts, alpha, correction)
+    write_drift_report(output_path, [(None, result)])
+    return result["drift_detected"], result["drifted_features"]
+
+def load_drift_state(vocabulary, bucket_name="mlops_dataset123"):
+    """Restores the incremental drift state saved by the previous run (GCS copy wins over local)."""
+    client = storage.Client() if not KEY_FILE else storage.Client.from_service_account_json(KEY_FILE)
+    blob = client.bucket(bucket_name).blob(STATE_BLOB)
+    if blob.exists():
+        os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+        blob.download_to_filename(STATE_PATH)
+    return DriftState.load(STATE_PATH, vocabulary, BUCKET_S)
+
+def save_drift_state(state, bucket_name="mlops_dataset123"):
+    state.save(STATE_PATH)
+    client = storage.Client() if not KEY_FILE else storage.Client.from_service_account_json(KEY_FILE)
+    client.bucket(bucket_name).blob(STATE_BLOB).upload_from_filename(STATE_PATH)
+
+def detect_windowed_drift(reference, output_path="drift_report.html", windows=DRIFT_WINDOWS,
+                          trigger_window=DRIFT_TRIGGER_WINDOW, bucket_name="mlops_dataset123"):
+    """Ingests only the reviews logged since the last run, then tests drift over each rolling window.
+
+    Returns (drift_detected, drifted_features) for `trigger_window`.
+    """
+    feature_names, ref_word_counts = reference
+    window_seconds = {window: parse_window(window) * SECONDS_PER_HOUR for window in windows}
+    window_seconds.setdefault(trigger_window, parse_window(trigger_window) * SECONDS_PER_HOUR)
+    uneven = [window for window, seconds in window_seconds.items() if seconds % BUCKET_S]
+    if uneven:
+        raise ValueError(f"Drift windows {uneven} are not a whole number of {BUCKET_S}s buckets")
+    max_window_seconds = max(window_seconds.values())
+
+    state = load_drift_state(feature_names, bucket_name)
+    # Ingest up to a bucket boundary, so every window ends there and covers exactly its span
+    until = state.bucket_start(time.time() - INGEST_LAG_S)
+    since = until - max_window_seconds
+    if state.watermark is not None:
+        since = max(since, state.watermark)
+
+    if until > since:
+        vectorizer = CountVectorizer(vocabulary=feature_names.tolist())
+        ingested = 0
+        for chunk in load_current_data(since, until):
+            state.add(chunk["timestamp"].to_numpy(dtype=np.float64), vectorizer.transform(review_texts(chunk)))
+            ingested += len(chunk)
+        print(f"🔹 Ingested {ingested} new logged reviews")
+        state.watermark = until
+    end = state.watermark
+    state.prune(end, max_window_seconds)
+    save_drift_state(state, bucket_name)
+
+    results = {
+        window: drift_test(feature_names, ref_word_counts, state.window_counts(end, seconds))
+        for window, seconds in window_seconds.items()
+    }
+    end_label = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(end))
+    write_drift_report(output_path, [(f"Last {window} to {end_label}", result) for window, result in results.items()])
+
+    trigger = results[trigger_window]
+    return trigger["drift_detected"], trigger["drifted_features"]
 
 def upload_report_to_gcs(local_path, bucket_name="mlops_dataset123", gcs_path="drift_report/drift_report.html"):
     client = storage.Client() if not KEY_FILE else storage.Client.from_service_account_json(KEY_FILE)
@@ -111,11 +421,10 @@ def trigger_github_action():
 
 
 if __name__ == "__main__":
-    reference_df = load_reference_data()
-    current_df = load_current_data()
+    reference = load_reference_snapshot()
     
     report_path = "drift_report.html"
-    drift_detected, drifted_features = detect_data_drift(reference_df, current_df, report_path)
+    drift_detected, drifted_features = detect_windowed_drift(reference, report_path)
 
     print(f"🚨 Drift Detected: {drift_detected} | Features Drifted: {drifted_features}")
     upload_report_to_gcs(report_path)
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+from scipy import sparse
+
+SECONDS_PER_HOUR = 3600
+
+
+def parse_window(window):
+    """Parses a window like "1h", "24h" or "7d" into a number of hours."""
+    window = window.strip().lower()
+    if window.endswith("d"):
+        return int(window[:-1]) * 24
+    if window.endswith("h"):
+        return int(window[:-1])
+    return int(window)
+
+
+def vocabulary_key(vocabulary):
+    """Fingerprint of the reference vocabulary; state built on another vocabulary is discarded."""
+    digest = hashlib.md5()
+    for term in vocabulary:
+        digest.update(term.encode("utf-8") + b"\n")
+    return digest.hexdigest()
+
+
+class DriftState:
+    """Rolling per-bucket term counts of logged reviews, plus the watermark of the last ingested row.
+
+    Counts are kept as one sparse row per time bucket of `bucket_seconds` over the reference
+    vocabulary, so any window is the sum of its bucket rows and each run only has to count the rows
+    logged since the last one. Windows end on a bucket boundary and only count whole buckets, so a
+    "1h" window covers the full hour before its end rather than the current clock hour.
+    """
+
+    def __init__(self, vocab_key, vocab_size, bucket_seconds, watermark=None, buckets=None, counts=None):
+        self.vocab_key = vocab_key
+        self.vocab_size = int(vocab_size)
+        self.bucket_seconds = int(bucket_seconds)
+        self.watermark = watermark  # Epoch seconds up to which logged rows were ingested, or None
+        self.buckets = np.zeros(0, dtype=np.int64) if buckets is None else buckets  # Bucket start // bucket_seconds
+        self.counts = sparse.csr_matrix((0, self.vocab_size), dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def load(cls, path, vocabulary, bucket_seconds):
+        """Loads saved state, starting fresh if there is none or it was built on another vocabulary or bucket size."""
+        vocab_key = vocabulary_key(vocabulary)
+        if not os.path.exists(path):
+            return cls(vocab_key, len(vocabulary), bucket_seconds)
+
+        with np.load(path, allow_pickle=False) as saved:
+            if str(saved["vocab_key"]) != vocab_key:
+                print("⚠️ Reference vocabulary changed, resetting incremental drift state.")
+                return cls(vocab_key, len(vocabulary), bucket_seconds)
+            if "bucket_seconds" not in saved or int(saved["bucket_seconds"]) != bucket_seconds:
+                print("⚠️ Drift bucket size changed, resetting incremental drift state.")
+                return cls(vocab_key, len(vocabulary), bucket_seconds)
+            counts = sparse.csr_matrix(
+                (saved["data"], saved["indices"], saved["indptr"]),
+                shape=(len(saved["buckets"]), len(vocabulary)),
+            )
+            watermark = float(saved["watermark"]) if saved["watermark"] >= 0 else None
+            return cls(vocab_key, len(vocabulary), bucket_seconds, watermark, saved["buckets"], counts)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                vocab_key=np.array(self.vocab_key),
+                bucket_seconds=np.array(self.bucket_seconds),
+                watermark=np.array(-1.0 if self.watermark is None else self.watermark),
+                buckets=self.buckets,
+                data=self.counts.data,
+                indices=self.counts.indices,
+                indptr=self.counts.indptr,
+            )
+        os.replace(temp_path, path)
+
+    def bucket_start(self, timestamp):
+        """Start (epoch seconds) of the bucket containing `timestamp`."""
+        return float(np.floor(timestamp / self.bucket_seconds) * self.bucket_seconds)
+
+    def add(self, timestamps, term_counts):
+        """Adds per-review term counts (sparse, one row per review) at their epoch-second timestamps."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if timestamps.size == 0:
+            return
+        buckets = np.floor(timestamps / self.bucket_seconds).astype(np.int64)
+
+        # Sum existing bucket rows and the new review rows into one row per distinct bucket
+        all_buckets = np.concatenate([self.buckets, buckets])
+        all_rows = sparse.vstack([self.counts, sparse.csr_matrix(term_counts, dtype=np.int64)], format="csr")
+        unique_buckets, row_bucket = np.unique(all_buckets, return_inverse=True)
+        grouping = sparse.csr_matrix(
+            (np.ones(len(all_buckets), dtype=np.int64), (row_bucket, np.arange(len(all_buckets)))),
+            shape=(len(unique_buckets), len(all_buckets)),
+        )
+        self.buckets = unique_buckets
+        self.counts = (grouping @ all_rows).tocsr()
+
+        newest = float(timestamps.max())
+        self.watermark = newest if self.watermark is None else max(self.watermark, newest)
+
+    def prune(self, end, max_window_seconds):
+        """Drops bucket rows that end before the largest window ending at `end` begins."""
+        keep = (self.buckets + 1) * self.bucket_seconds > end - max_window_seconds
+        self.buckets = self.buckets[keep]
+        self.counts = self.counts[keep]
+
+    def window_counts(self, end, window_seconds):
+        """Dense per-term counts of the whole buckets inside [end - window_seconds, end)."""
+        starts = self.buckets * self.bucket_seconds
+        rows = (starts >= end - window_seconds) & (starts + self.bucket_seconds <= end)
+        return np.asarray(self.counts[rows].sum(axis=0), dtype=np.int64).ravel()
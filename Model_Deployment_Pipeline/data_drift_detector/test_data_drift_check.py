@@ -0,0 +1,255 @@
+import base64
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency
+from sklearn.feature_extraction.text import CountVectorizer
+import data_drift_check
+from data_drift_check import (MIN_TERM_COUNT, adjust_p_values, chi2_2x2, count_terms, drift_test,
+                              read_reference_snapshot, reference_data_key, save_reference_snapshot)
+
+# (term count in reference, term count in current); totals are shared by every term
+TOTAL_REF, TOTAL_CURR = 1000, 400
+TERM_COUNTS = [(10, 4), (50, 5), (0, 12), (7, 0), (300, 180), (999, 399), (1, 1), (500, 50)]
+
+
+# Empty and missing reviews, punctuation-only ones, and terms that only appear in a single row
+REVIEWS = [
+    "Great product, great price!", "", None, "Broke after a day. Refund please", "!!! ...", "great",
+    "Très bien, café naïve", None, "I", "refund refund refund", "zebra", "", "Price was OK; delivery late",
+    "GREAT Great great", "a b c", "last review mentions xylophone",
+]
+
+
+def chunked(reviews, chunk_size):
+    return [pd.DataFrame({"review_texts": reviews[start:start + chunk_size]})
+            for start in range(0, len(reviews), chunk_size)]
+
+
+def reference_bh(p_values):
+    """Benjamini-Hochberg adjusted p-values, computed one rank at a time."""
+    m = len(p_values)
+    order = sorted(range(m), key=lambda i: p_values[i])
+    adjusted = [0.0] * m
+    running_min = 1.0
+    for rank in range(m, 0, -1):
+        i = order[rank - 1]
+        running_min = min(running_min, p_values[i] * m / rank)
+        adjusted[i] = running_min
+    return adjusted
+
+
+def test_chi2_matches_scipy_without_yates_correction():
+    count_ref, count_curr = (np.array(column) for column in zip(*TERM_COUNTS))
+    stat, p_values = chi2_2x2(count_ref, count_curr, TOTAL_REF, TOTAL_CURR)
+    for k, (a, c) in enumerate(TERM_COUNTS):
+        table = [[a, TOTAL_REF - a], [c, TOTAL_CURR - c]]
+        expected_stat, expected_p, _, _ = chi2_contingency(table, correction=False)
+        np.testing.assert_allclose(stat[k], expected_stat, rtol=1e-10, err_msg=f"Statistic of {table}")
+        np.testing.assert_allclose(p_values[k], expected_p, rtol=1e-10, atol=1e-300, err_msg=f"p-value of {table}")
+
+
+@pytest.mark.parametrize("count_ref, count_curr, total_ref, total_curr", [
+    ([0, 0], [0, 0], 100, 50),  # Term never seen: empty column
+    ([3, 5], [0, 0], 100, 0),  # No current terms at all: empty row
+    ([100, 100], [50, 50], 100, 50),  # Only this term: the other column is empty
+])
+def test_chi2_of_degenerate_tables_is_not_significant(count_ref, count_curr, total_ref, total_curr):
+    stat, p_values = chi2_2x2(count_ref, count_curr, total_ref, total_curr)
+    assert np.all(stat == 0) and np.all(p_values == 1)
+    # scipy rejects these tables outright, since some expected frequency is zero
+    with pytest.raises(ValueError):
+        chi2_contingency([[count_ref[0], total_ref - count_ref[0]], [count_curr[0], total_curr - count_curr[0]]],
+                         correction=False)
+
+
+@pytest.mark.parametrize("p_values", [
+    [0.01, 0.04, 0.03, 0.005, 0.2, 0.9],
+    [0.02, 0.02, 0.02, 0.5, 0.001, 0.001],  # Ties
+    [0.9, 0.5, 0.04, 0.03, 0.02, 0.01],  # Reverse order
+    [0.05] * 6,
+    [0.3],
+])
+def test_benjamini_hochberg_matches_reference(p_values):
+    adjusted = adjust_p_values(p_values, "fdr_bh")
+    np.testing.assert_allclose(adjusted, reference_bh(p_values), rtol=1e-15)
+    # Adjusted p-values keep the order of the raw ones, and tied p-values stay tied
+    order = np.argsort(p_values, kind="stable")
+    assert np.all(np.diff(adjusted[order]) >= 0)
+    for p in set(p_values):
+        assert len(set(adjusted[np.array(p_values) == p])) == 1
+
+
+def test_bonferroni_and_no_correction():
+    p_values = np.array([0.001, 0.02, 0.4])
+    np.testing.assert_allclose(adjust_p_values(p_values, "bonferroni"), [0.003, 0.06, 1.0])
+    assert np.array_equal(adjust_p_values(p_values, None), p_values)
+    assert adjust_p_values([], "fdr_bh").size == 0
+    with pytest.raises(ValueError):
+        adjust_p_values(p_values, "holm")
+
+
+@pytest.mark.parametrize("correction", [None, "bonferroni", "fdr_bh"])
+def test_drift_test_flags_terms_whose_frequency_changed(correction):
+    feature_names = np.array(["great", "broke", "refund", "rare", "price"], dtype=object)
+    ref_counts = np.array([500, 100, 20, 1, 200])
+    current_counts = np.array([100, 300, 20, 2, 150])
+    result = drift_test(feature_names, ref_counts, current_counts, alpha=0.001, correction=correction)
+
+    # "rare" is below MIN_TERM_COUNT and never tested; "refund" changed too little to be significant
+    assert ref_counts[3] + current_counts[3] < MIN_TERM_COUNT
+    assert result["significant_features"] == ["great", "broke"]
+    assert result["drifted_features"] == 2 and result["total_features"] == 5
+    assert result["drift_detected"] and result["current_terms"] == current_counts.sum()
+
+
+def test_drift_test_on_identical_frequencies_finds_no_drift():
+    feature_names = np.array(["a", "b", "c"], dtype=object)
+    counts = np.array([300, 200, 100])
+    result = drift_test(feature_names, counts, counts * 2, correction="fdr_bh")
+    assert result["drifted_features"] == 0 and not result["drift_detected"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 16, 100])
+def test_streamed_counts_match_one_count_vectorizer(chunk_size):
+    texts = ["" if review is None else review for review in REVIEWS]
+    vectorizer = CountVectorizer()
+    expected = np.asarray(vectorizer.fit_transform(texts).sum(axis=0)).ravel()
+
+    vocabulary, counts = count_terms(chunked(REVIEWS, chunk_size))
+    assert vocabulary.dtype == object
+    assert vocabulary.tolist() == vectorizer.get_feature_names_out().tolist()
+    assert counts.tolist() == expected.tolist()
+
+    # Counting against a fixed vocabulary gives the same totals
+    assert count_terms(chunked(REVIEWS, chunk_size), vocabulary=vocabulary).tolist() == expected.tolist()
+
+
+def test_count_terms_skips_chunks_without_terms():
+    chunks = [pd.DataFrame({"review_texts": texts}) for texts in ([None, ""], ["great"], ["!!!", "a"], [None])]
+    vocabulary, counts = count_terms(chunks)
+    assert vocabulary.tolist() == ["great"] and counts.tolist() == [1]
+    assert count_terms(chunked([None, "", "..."], 2))[0].size == 0
+
+
+def test_count_terms_accepts_a_single_data_frame():
+    vocabulary, counts = count_terms(pd.DataFrame({"review_texts": ["good good", None, "bad"]}))
+    assert dict(zip(vocabulary, counts)) == {"bad": 1, "good": 2}
+    fixed = np.array(["bad", "good", "unseen"], dtype=object)
+    assert count_terms(pd.DataFrame({"review_texts": ["good good", None]}), vocabulary=fixed).tolist() == [0, 2, 0]
+
+
+class FakeBlob:
+    def __init__(self, name, md5_hash=None, crc32c=None, size=None, generation=None, bucket=None):
+        self.name, self.md5_hash, self.crc32c, self.size, self.generation = name, md5_hash, crc32c, size, generation
+        self.bucket = bucket
+        self.uploads = 0
+
+    def exists(self):
+        return self.name in self.bucket.files
+
+    def upload_from_filename(self, path):
+        with open(path, "rb") as f:
+            self.bucket.files[self.name] = f.read()
+        self.uploads += 1
+
+    def download_to_filename(self, path):
+        with open(path, "wb") as f:
+            f.write(self.bucket.files[self.name])
+
+
+class FakeBucket:
+    """GCS bucket double holding the reference CSV's metadata and any uploaded snapshots."""
+
+    name = "test-bucket"
+
+    def __init__(self, reference_blob):
+        self.files = {}
+        self.reference_blob = reference_blob
+        reference_blob.bucket = self
+        self.snapshot_blobs = {}
+
+    def get_blob(self, name):
+        return self.reference_blob if name == self.reference_blob.name else None
+
+    def blob(self, name):
+        return self.snapshot_blobs.setdefault(name, FakeBlob(name, bucket=self))
+
+
+class FakeClient:
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, name):
+        return self._bucket
+
+
+def b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def test_snapshot_round_trips_long_and_non_ascii_terms(tmp_path):
+    vocabulary = np.array(["a", "café", "naïve", "x" * 500, "日本語", "straße", "zz"], dtype=object)
+    counts = np.array([3, 1, 4, 1, 5, 9, 2], dtype=np.int64)
+    path = str(tmp_path / "snapshots" / "reference.npz")
+    save_reference_snapshot(path, vocabulary, counts, "abc123")
+
+    loaded_vocabulary, loaded_counts = read_reference_snapshot(path)
+    assert loaded_vocabulary.dtype == object and loaded_vocabulary.tolist() == vocabulary.tolist()
+    assert np.array_equal(loaded_counts, counts)
+    assert os.listdir(tmp_path / "snapshots") == ["reference.npz"], "The temp file should have been renamed"
+    with np.load(path, allow_pickle=False) as snapshot:
+        assert snapshot["term_bytes"].dtype == np.uint8 and str(snapshot["data_hash"]) == "abc123"
+
+
+@pytest.mark.parametrize("corrupt", ["truncated", "offsets", "layout"])
+def test_unreadable_snapshots_raise_value_error(tmp_path, corrupt):
+    path = str(tmp_path / "reference.npz")
+    save_reference_snapshot(path, np.array(["good", "terms"], dtype=object), np.array([1, 2]), "abc")
+    if corrupt == "truncated":
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+    elif corrupt == "offsets":
+        with np.load(path) as snapshot:
+            arrays = dict(snapshot)
+        arrays["term_offsets"] = np.array([0, 6, 4])
+        np.savez(path, **arrays)
+    else:
+        # The earlier layout kept the vocabulary as a fixed-width unicode array
+        np.savez(path, vocabulary=np.array(["good", "terms"]), counts=np.array([1, 2]), data_hash=np.array("abc"))
+    with pytest.raises(ValueError):
+        read_reference_snapshot(path)
+
+
+def test_reference_data_key_falls_back_for_composite_uploads():
+    md5 = FakeBlob("data.csv", md5_hash=b64(bytes.fromhex("00ff" * 8)), crc32c=b64(b"\x01\x02\x03\x04"), size=10)
+    assert reference_data_key(md5) == "00ff" * 8, "MD5 keys must not change, so existing snapshots stay valid"
+    composite = FakeBlob("data.csv", crc32c=b64(b"\x01\x02\x03\x04"), size=10, generation=7)
+    assert reference_data_key(composite) == "crc32c-01020304-10"
+    assert reference_data_key(FakeBlob("data.csv", generation=7)) == "generation-7"
+
+
+def test_composite_reference_data_is_snapshotted_and_reused(tmp_path, monkeypatch):
+    bucket = FakeBucket(FakeBlob("data/raw/Sampled_Chunk.csv", crc32c=b64(b"\xaa\xbb\xcc\xdd"), size=123))
+    monkeypatch.setattr(data_drift_check, "KEY_FILE", None)
+    monkeypatch.setattr(data_drift_check.storage, "Client", lambda: FakeClient(bucket))
+    monkeypatch.setattr(data_drift_check, "SNAPSHOT_DIR", str(tmp_path))
+    fits = []
+
+    def load_reference_data(bucket_name, blob_path):
+        fits.append(blob_path)
+        yield pd.DataFrame({"review_texts": ["great product", "broke after a day", "great price"]})
+
+    monkeypatch.setattr(data_drift_check, "load_reference_data", load_reference_data)
+    vocabulary, counts = data_drift_check.load_reference_snapshot(blob_path="data/raw/Sampled_Chunk.csv")
+    assert vocabulary.tolist() == ["after", "broke", "day", "great", "price", "product"]
+    assert counts.tolist() == [1, 1, 1, 2, 1, 1]
+    snapshot_name = data_drift_check.SNAPSHOT_GCS_PREFIX + "crc32c-aabbccdd-123.npz"
+    assert bucket.snapshot_blobs[snapshot_name].uploads == 1
+
+    # Later runs reuse the local snapshot, then the uploaded one, without refitting
+    assert data_drift_check.load_reference_snapshot()[0].tolist() == vocabulary.tolist()
+    os.remove(tmp_path / "crc32c-aabbccdd-123.npz")
+    assert data_drift_check.load_reference_snapshot()[1].tolist() == counts.tolist()
+    assert fits == ["data/raw/Sampled_Chunk.csv"]
@@ -0,0 +1,180 @@
+import calendar
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+import data_drift_check
+from drift_state import DriftState, parse_window
+
+VOCABULARY = np.array(["bad", "good", "great"], dtype=object)
+BUCKET_S = 300
+HOUR = 3600
+
+
+def at(clock_time, day="2025-03-10"):
+    """Epoch seconds of an HH:MM[:SS] UTC time."""
+    return float(calendar.timegm(pd.Timestamp(f"{day} {clock_time}").timetuple()))
+
+
+def one_hot(terms):
+    """One review row per term, counting that term once."""
+    index = {term: i for i, term in enumerate(VOCABULARY)}
+    columns = [index[term] for term in terms]
+    return sparse.csr_matrix((np.ones(len(columns)), (np.arange(len(columns)), columns)), shape=(len(columns), 3))
+
+
+def new_state():
+    return DriftState("key", len(VOCABULARY), BUCKET_S)
+
+
+def test_parse_window():
+    assert [parse_window(w) for w in ["1h", "24h", "7d", " 2H ", "3"]] == [1, 24, 168, 2, 3]
+
+
+def test_window_covers_the_full_span_before_its_end():
+    state = new_state()
+    state.add([at("08:54:59"), at("08:55"), at("09:30"), at("09:54:59"), at("09:55")],
+              one_hot(["bad", "good", "good", "great", "bad"]))
+
+    # A run at 10:02 with a 5 minute ingest lag ends its windows at 09:55
+    end = state.bucket_start(at("10:02") - 300)
+    assert end == at("09:55")
+    counts = state.window_counts(end, HOUR)
+    assert dict(zip(VOCABULARY, counts)) == {"bad": 0, "good": 2, "great": 1}, \
+        "Reviews from 08:55 to 09:54:59 belong to the last hour; the clock hour boundary at 09:00 does not matter"
+    assert state.window_counts(end, 24 * HOUR).tolist() == [1, 2, 1]
+    assert state.window_counts(at("10:00"), HOUR).tolist() == [1, 1, 1], "The 09:55 bucket is complete by 10:00"
+
+
+def test_window_never_counts_a_partial_bucket():
+    state = new_state()
+    state.add([at("09:50"), at("09:56")], one_hot(["good", "bad"]))
+    # 09:58 is inside the 09:55 bucket, which is not over yet
+    assert state.window_counts(at("09:58"), HOUR).tolist() == [0, 1, 0]
+    assert state.window_counts(at("10:00"), HOUR).tolist() == [1, 1, 0]
+
+
+def test_add_merges_reviews_into_existing_buckets():
+    state = new_state()
+    state.add([at("09:01"), at("09:02")], one_hot(["good", "good"]))
+    state.add([at("09:04"), at("09:40")], one_hot(["bad", "good"]))
+    assert state.buckets.tolist() == [int(at("09:00")) // BUCKET_S, int(at("09:40")) // BUCKET_S]
+    assert state.counts.toarray().tolist() == [[1, 2, 0], [0, 1, 0]]
+    assert state.watermark == at("09:40")
+
+
+def test_prune_drops_only_buckets_outside_the_largest_window():
+    state = new_state()
+    state.add([at("09:54:59", "2025-03-03"), at("09:55", "2025-03-03"), at("12:00", "2025-03-09"), at("09:50")],
+              one_hot(["bad", "good", "great", "good"]))
+    end = at("09:55")
+    week = 7 * 24 * HOUR
+    before = state.window_counts(end, week)
+
+    state.prune(end, week)
+    assert len(state.buckets) == 3, "Only the bucket that ended before the week began should be dropped"
+    assert np.array_equal(state.window_counts(end, week), before)
+    assert state.window_counts(end, week).tolist() == [0, 2, 1]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "drift_state.npz")
+    state = DriftState.load(path, VOCABULARY, BUCKET_S)
+    assert state.watermark is None and state.counts.shape == (0, 3)
+    state.add([at("09:00"), at("11:30")], one_hot(["good", "bad"]))
+    state.watermark = at("11:55")
+    state.save(path)
+
+    loaded = DriftState.load(path, VOCABULARY, BUCKET_S)
+    assert loaded.watermark == at("11:55") and np.array_equal(loaded.buckets, state.buckets)
+    assert np.array_equal(loaded.counts.toarray(), state.counts.toarray())
+
+
+def test_state_resets_on_another_vocabulary_or_bucket_size(tmp_path):
+    path = str(tmp_path / "drift_state.npz")
+    state = DriftState.load(path, VOCABULARY, BUCKET_S)
+    state.add([at("09:00")], one_hot(["good"]))
+    state.save(path)
+
+    assert DriftState.load(path, VOCABULARY, 600).watermark is None
+    assert DriftState.load(path, np.array(["other"], dtype=object), BUCKET_S).watermark is None
+    # State saved before buckets had a configurable size counted whole clock hours
+    np.savez(path, vocab_key=np.array(state.vocab_key), watermark=np.array(at("09:00")),
+             bucket_hours=np.array([1]), data=np.array([1]), indices=np.array([1]), indptr=np.array([0, 1]))
+    assert DriftState.load(path, VOCABULARY, BUCKET_S).counts.shape == (0, 3)
+
+
+class LogRun:
+    """Runs detect_windowed_drift against a local log CSV, keeping the state in memory."""
+
+    def __init__(self, tmp_path, monkeypatch):
+        self.tmp_path = tmp_path
+        self.monkeypatch = monkeypatch
+        self.state = None
+        self.logs = []
+        self.queries = []
+        monkeypatch.setattr(data_drift_check, "CURRENT_DATA_PATH", str(tmp_path / "logs.csv"))
+        monkeypatch.setattr(data_drift_check, "BUCKET_S", BUCKET_S)
+        monkeypatch.setattr(data_drift_check, "INGEST_LAG_S", 300)
+        monkeypatch.setattr(data_drift_check, "load_drift_state", self.load)
+        monkeypatch.setattr(data_drift_check, "save_drift_state", lambda state, bucket_name: None)
+
+        load_current_data = data_drift_check.load_current_data
+
+        def record_query(since, until, chunksize=data_drift_check.CHUNK_SIZE):
+            self.queries.append((since, until))
+            return load_current_data(since, until, chunksize)
+
+        monkeypatch.setattr(data_drift_check, "load_current_data", record_query)
+
+    def load(self, vocabulary, bucket_name):
+        if self.state is None:
+            self.state = DriftState("key", len(vocabulary), BUCKET_S)
+        return self.state
+
+    def log(self, clock_time, review, day="2025-03-10"):
+        self.logs.append({"review": review, "timestamp": pd.Timestamp(f"{day} {clock_time}", tz="UTC").isoformat()})
+        pd.DataFrame(self.logs).to_csv(self.tmp_path / "logs.csv", index=False)
+
+    def run(self, clock_time, windows=("1h", "24h")):
+        self.monkeypatch.setattr(data_drift_check.time, "time", lambda: at(clock_time))
+        reference = (VOCABULARY, np.array([100, 100, 100]))
+        return data_drift_check.detect_windowed_drift(
+            reference, str(self.tmp_path / "report.html"), windows=list(windows), trigger_window="1h",
+        )
+
+
+def test_watermark_advances_to_bucket_boundaries_and_rows_are_ingested_once(tmp_path, monkeypatch):
+    logs = LogRun(tmp_path, monkeypatch)
+    logs.log("09:30", "good good")
+    logs.log("09:57", "bad")  # Still inside the ingest lag at 10:02
+    logs.run("10:02")
+    assert logs.state.watermark == at("09:55")
+    assert logs.queries[-1] == (at("09:55") - 24 * HOUR, at("09:55")), "The first run looks back one full window"
+    assert logs.state.window_counts(at("09:55"), HOUR).tolist() == [0, 2, 0]
+
+    logs.log("10:01", "great")
+    logs.run("10:04")  # 09:59 is still in the 09:55 bucket
+    assert logs.state.watermark == at("09:55") and len(logs.queries) == 1, "Nothing new to ingest yet"
+
+    logs.run("10:12")
+    assert logs.queries[-1] == (at("09:55"), at("10:05")), "Each run only reads rows since the watermark"
+    assert logs.state.watermark == at("10:05")
+    assert logs.state.window_counts(at("10:05"), HOUR).tolist() == [1, 2, 1]
+
+
+def test_long_gaps_only_read_the_largest_window(tmp_path, monkeypatch):
+    logs = LogRun(tmp_path, monkeypatch)
+    logs.log("09:30", "good", day="2025-03-01")
+    logs.log("09:30", "bad")
+    logs.state = DriftState("key", len(VOCABULARY), BUCKET_S, watermark=at("09:55", "2025-03-01"))
+    logs.run("10:02")
+    assert logs.queries[-1] == (at("09:55") - 24 * HOUR, at("09:55")), "Rows older than every window should not be read"
+    assert logs.state.window_counts(at("09:55"), 24 * HOUR).tolist() == [1, 0, 0]
+
+
+def test_windows_must_be_whole_buckets(tmp_path, monkeypatch):
+    logs = LogRun(tmp_path, monkeypatch)
+    monkeypatch.setattr(data_drift_check, "BUCKET_S", 7 * 60)
+    with pytest.raises(ValueError):
+        logs.run("10:02", windows=("1h",))
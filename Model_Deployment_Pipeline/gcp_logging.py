@@ -1,15 +1,190 @@
 from google.cloud import bigquery
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
 
-def log_prediction(review: str, sentiment: str):
-    try:
-        client = bigquery.Client()
-        table_id = "mlops-project-test-448822.sentiment_data.user_logs"  # replace with your actual table
-        row = [{
-            "review": str(review),
-            "sentiment": str(sentiment)
-        }]
-        errors = client.insert_rows_json(table_id, row)
+# ========== Logging Config ==========
+TABLE_ID = os.environ.get("PREDICTION_LOG_TABLE", "mlops-project-test-448822.sentiment_data.user_logs")
+LOG_SINK = os.environ.get("PREDICTION_LOG_SINK", "bigquery")  # "bigquery" or "file"
+LOG_FILE = os.environ.get("PREDICTION_LOG_FILE", os.path.join(tempfile.gettempdir(), "prediction_logs.jsonl"))
+SPILL_PATH = os.environ.get("PREDICTION_LOG_SPILL", os.path.join(tempfile.gettempdir(), "prediction_log_spill.jsonl"))
+MAX_QUEUE_SIZE = int(os.environ.get("PREDICTION_LOG_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.environ.get("PREDICTION_LOG_BATCH_SIZE", "500"))
+FLUSH_INTERVAL_S = float(os.environ.get("PREDICTION_LOG_FLUSH_INTERVAL_S", "2"))
+MAX_RETRIES = int(os.environ.get("PREDICTION_LOG_MAX_RETRIES", "3"))
+
+
+# ========== Sinks ==========
+class BigQuerySink:
+    """Streams rows into BigQuery through a single long-lived client."""
+
+    def __init__(self, table_id=TABLE_ID):
+        self.table_id = table_id
+        self._client = None
+
+    def write(self, rows):
+        if self._client is None:
+            self._client = bigquery.Client()
+        errors = self._client.insert_rows_json(self.table_id, rows)
         if errors:
-            print("🚨 BigQuery insert errors:", errors)
-    except Exception as e:
-        print("🚨 Error logging prediction to BigQuery:", e)
+            raise RuntimeError(f"BigQuery insert errors: {errors}")
+
+
+class FileSink:
+    """Appends rows as JSON lines to a local file (stand-in for BigQuery in tests and local runs)."""
+
+    def __init__(self, path=LOG_FILE):
+        self.path = path
+
+    def write(self, rows):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+
+# ========== Background Logger ==========
+class PredictionLogger:
+    """Buffers prediction rows in memory and writes them to a sink from a background thread.
+
+    Rows are flushed when `batch_size` rows are buffered or every `flush_interval` seconds.
+    Failed writes are retried with jittered exponential backoff and, if the sink stays
+    unavailable, spilled to a local JSON-lines file that is replayed after the next successful write.
+    `log` never blocks: when the queue is full the row is dropped and counted.
+    """
+
+    def __init__(self, sink, max_queue_size=MAX_QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL_S, max_retries=MAX_RETRIES, spill_path=SPILL_PATH,
+                 retry_backoff=0.5):
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_retries = max(0, int(max_retries))
+        self.spill_path = spill_path
+        self.retry_backoff = retry_backoff
+        self.dropped = 0
+        self.spilled = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prediction-logger", daemon=True)
+            self._thread.start()
+        return self
+
+    def log(self, review: str, sentiment: str):
+        """Queues a prediction row without blocking the caller."""
+        row = {
+            "review": str(review),
+            "sentiment": str(sentiment),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=10.0):
+        """Stops the background thread after flushing everything still queued."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stop.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch and self._write_with_retry(batch):
+                self._replay_spill()
+            elif batch:
+                self._spill(batch)
+
+    def _write_with_retry(self, rows):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sink.write(rows)
+                return True
+            except Exception as e:
+                print(f"🚨 Error logging predictions (attempt {attempt + 1}):", e)
+                if attempt < self.max_retries and not self._stop.is_set():
+                    time.sleep(self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+        return False
+
+    def _spill(self, rows):
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+            self.spilled += len(rows)
+        except Exception as e:
+            self.dropped += len(rows)
+            print("🚨 Error spilling prediction logs to disk:", e)
+
+    def _replay_spill(self):
+        """Re-sends rows spilled while the sink was down; rows that fail again stay on disk."""
+        if not os.path.exists(self.spill_path):
+            return
+        replay_path = self.spill_path + ".replay"
+        os.replace(self.spill_path, replay_path)
+        with open(replay_path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            if not self._write_with_retry(chunk):
+                self._spill(rows[start:])
+                break
+        else:
+            print(f"✅ Replayed {len(rows)} spilled prediction logs")
+        os.remove(replay_path)
+
+
+def make_sink(kind=LOG_SINK):
+    if kind == "file":
+        return FileSink()
+    return BigQuerySink()
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_prediction_logger():
+    """Returns the process-wide prediction logger, starting it on first use."""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                _logger = PredictionLogger(make_sink()).start()
+    return _logger
+
+
+def log_prediction(review: str, sentiment: str):
+    """Queues a prediction for background logging; never waits on BigQuery."""
+    get_prediction_logger().log(review, sentiment)
+
+
+def close_prediction_logger(timeout=10.0):
+    """Flushes queued rows and stops the background logger, if one was started."""
+    if _logger is not None:
+        _logger.close(timeout)
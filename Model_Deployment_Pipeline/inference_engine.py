@@ -0,0 +1,191 @@
+import argparse
+import pickle
+import re
+import sys
+import unicodedata
+import numpy as np
+from model_format import ExportedModel, apply_calibration, stored_calibration
+
+
+def strip_accents_unicode(text):
+    """Same as sklearn's strip_accents_unicode."""
+    try:
+        text.encode("ASCII", errors="strict")
+        return text
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize("NFKD", text)
+        return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def strip_accents_ascii(text):
+    """Same as sklearn's strip_accents_ascii."""
+    return unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode("ASCII")
+
+
+ACCENT_STRIPPERS = {None: None, "unicode": strip_accents_unicode, "ascii": strip_accents_ascii}
+
+
+class InferenceEngine:
+    """Scores reviews with an exported TF-IDF + MultinomialNB model using plain NumPy.
+
+    Tokenization follows sklearn's word analyzer (lowercase, accent stripping, token_pattern,
+    stop words, n-grams), and every float operation is done in sklearn's order: counts as
+    float64, sublinear tf, times idf, row normalization, then the feature_log_prob dot product
+    accumulated term by term in feature-index order. Joint log-likelihoods are therefore
+    bit-identical to the sklearn pipeline rebuilt from the same export.
+    """
+
+    def __init__(self, exported):
+        spec = exported.vectorizer_spec
+        self.lowercase = spec["lowercase"]
+        self.strip_accents = ACCENT_STRIPPERS[spec["strip_accents"]]
+        self.token_pattern = re.compile(spec["token_pattern"])
+        self.min_n, self.max_n = spec["ngram_range"]
+        self.stop_words = frozenset(spec["stop_words"] or ())
+        self.binary = spec["binary"]
+        self.sublinear_tf = spec["sublinear_tf"]
+        self.norm = spec["norm"]
+
+        self.vocabulary = dict(zip(exported.terms(), range(exported.n_features)))
+        self.idf = exported.arrays["idf"]
+        # (classes, features), left memory-mapped so worker processes share the pages
+        self.feature_log_prob = exported.arrays["feature_log_prob"]
+        self.class_log_prior = exported.arrays["class_log_prior"].astype(np.float64)
+        self.classes_ = exported.classes
+        self.metadata = exported.metadata
+        self.path = exported.path
+        self.calibration = self.metadata.get("calibration")
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(ExportedModel(path))
+
+    def analyze(self, review):
+        """Terms of one review, exactly as TfidfVectorizer.build_analyzer() would produce them."""
+        if self.lowercase:
+            review = review.lower()
+        if self.strip_accents is not None:
+            review = self.strip_accents(review)
+        tokens = self.token_pattern.findall(review)
+        if self.stop_words:
+            tokens = [token for token in tokens if token not in self.stop_words]
+        if self.max_n == 1:
+            return tokens
+
+        terms = list(tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), min(self.max_n, len(tokens)) + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def _term_counts(self, review):
+        """Sorted feature indices of a review and their counts."""
+        indices = [self.vocabulary[term] for term in self.analyze(review) if term in self.vocabulary]
+        return np.unique(np.array(indices, dtype=np.int64), return_counts=True)
+
+    def joint_log_likelihood(self, reviews):
+        """Per-class joint log-likelihoods, shape (len(reviews), n_classes)."""
+        rows = [self._term_counts(review) for review in reviews]
+        width = max((len(indices) for indices, _ in rows), default=0)
+
+        # Pad every review to the same number of terms; zero weights leave sums bit-for-bit unchanged
+        indices = np.zeros((len(rows), width), dtype=np.int64)
+        weights = np.zeros((len(rows), width), dtype=np.float64)
+        present = np.zeros((len(rows), width), dtype=bool)
+        for row, (term_indices, counts) in enumerate(rows):
+            indices[row, :len(term_indices)] = term_indices
+            weights[row, :len(counts)] = 1.0 if self.binary else counts
+            present[row, :len(term_indices)] = True
+
+        if self.sublinear_tf:
+            weights[present] = np.log(weights[present]) + 1.0
+        weights *= self.idf[indices]
+        weights = self._normalize(weights)
+
+        jll = np.zeros((len(rows), len(self.classes_)))
+        if width:
+            # cumsum accumulates strictly left to right, matching scipy's sparse-dense product
+            # Gathered float32 values widen exactly to float64, as in sklearn's sparse-dense product
+            contributions = weights[:, :, None] * np.moveaxis(self.feature_log_prob[:, indices], 0, -1)
+            jll = np.cumsum(contributions, axis=1)[:, -1, :]
+        return jll + self.class_log_prior
+
+    def _normalize(self, weights):
+        if self.norm is None or weights.shape[1] == 0:
+            return weights
+        if self.norm == "l2":
+            norms = np.sqrt(np.cumsum(weights * weights, axis=1)[:, -1])
+        else:
+            norms = np.cumsum(np.abs(weights), axis=1)[:, -1]
+        norms[norms == 0.0] = 1.0
+        return weights / norms[:, None]
+
+    def naive_bayes_proba(self, reviews):
+        """Uncalibrated class probabilities, as MultinomialNB.predict_proba (softmax via log-sum-exp)."""
+        jll = self.joint_log_likelihood(reviews)
+        top = jll.max(axis=1, keepdims=True)
+        log_norm = np.log(np.exp(jll - top).sum(axis=1, keepdims=True)) + top
+        return np.exp(jll - log_norm)
+
+    def predict_proba(self, reviews):
+        """Class probabilities, calibrated when the model was exported with a calibration."""
+        return apply_calibration(self.naive_bayes_proba(reviews), self.calibration)
+
+    def predict(self, reviews):
+        if self.calibration:
+            return self.classes_[np.argmax(self.predict_proba(reviews), axis=1)]
+        return self.classes_[np.argmax(self.joint_log_likelihood(reviews), axis=1)]
+
+
+def verify_against_pipeline(engine, pipeline, reviews):
+    """Returns the indices of reviews whose joint log-likelihoods differ from the sklearn pipeline."""
+    expected = pipeline[:-1].transform(reviews)
+    expected = pipeline.steps[-1][1].predict_joint_log_proba(expected)
+    actual = engine.joint_log_likelihood(reviews)
+    return [i for i in range(len(reviews)) if not np.array_equal(expected[i], actual[i])]
+
+
+def compare_with_trained_model(engine, model, reviews):
+    """Differences from the trained (float64) pipeline the export came from.
+
+    The export stores float32 arrays, so uncalibrated probabilities differ by rounding (typically
+    ~1e-7) and near-tied reviews may flip label; the calibration on top is applied identically and
+    is left out, since steep isotonic steps would magnify that rounding.
+    Returns (max abs probability difference, label disagreements).
+    """
+    expected = model.predict_proba(reviews)
+    actual = engine.naive_bayes_proba(reviews)
+    disagreements = int(np.sum(expected.argmax(axis=1) != actual.argmax(axis=1)))
+    return float(np.abs(expected - actual).max(initial=0.0)), disagreements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the native engine against sklearn on a golden set.")
+    parser.add_argument("model", help="Exported .nbm model")
+    parser.add_argument("golden", help="Text file with one review per line")
+    parser.add_argument("--pickle", help="Trained .pkl pipeline the model was exported from")
+    parser.add_argument("--atol", type=float, default=1e-6,
+                        help="Largest probability difference allowed against --pickle (default: 1e-6)")
+    args = parser.parse_args()
+
+    exported = ExportedModel(args.model)
+    engine = InferenceEngine(exported)
+    with open(args.golden, encoding="utf-8") as f:
+        golden = [line.rstrip("\n") for line in f]
+    mismatches = verify_against_pipeline(engine, exported.to_pipeline(), golden)
+    if mismatches:
+        print(f"🚨 {len(mismatches)}/{len(golden)} reviews differ from sklearn, e.g. line {mismatches[0] + 1}")
+        sys.exit(1)
+    print(f"✅ Native engine matches sklearn bit-for-bit on {len(golden)} reviews")
+
+    if args.pickle:
+        with open(args.pickle, "rb") as f:
+            trained = pickle.load(f)
+        if stored_calibration(trained) != engine.calibration:
+            print("🚨 The trained pickle and the export carry different calibrations")
+            sys.exit(1)
+        max_diff, disagreements = compare_with_trained_model(engine, trained, golden)
+        summary = f"max probability difference {max_diff:.2e} (atol {args.atol:.0e}), {disagreements} labels differ"
+        if max_diff > args.atol:
+            print(f"🚨 Native engine drifts from the trained pickle: {summary}")
+            sys.exit(1)
+        print(f"✅ Native engine matches the trained pickle within tolerance: {summary}")
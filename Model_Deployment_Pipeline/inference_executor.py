@@ -0,0 +1,121 @@
+import asyncio
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Executor config (overridable per deployment)
+EXECUTOR_MODE = os.environ.get("INFERENCE_EXECUTOR", "thread")  # "thread" or "process"
+EXECUTOR_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+MAX_PENDING_BATCHES = int(os.environ.get("INFERENCE_MAX_PENDING", "32"))
+
+
+class InferenceSaturated(Exception):
+    """Raised when inference queues are full and the request should be retried later (HTTP 429)."""
+
+
+def predict_with_confidence(model, reviews):
+    """One vectorized predict_proba pass: the most probable label of each review and its probability."""
+    proba = model.predict_proba(reviews)
+    best = np.argmax(proba, axis=1)
+    return model.classes_[best], proba[np.arange(len(best)), best]
+
+
+# ========== Process-pool worker state ==========
+_worker_model = None
+
+
+def _init_worker(model, model_path=None):
+    """Preloads the model once per worker process.
+
+    Exported models arrive as their .nbm path and are reopened here, so every worker memory-maps
+    the same file (and shares its pages) instead of unpickling a private copy of the arrays.
+    """
+    global _worker_model
+    if model_path is not None:
+        from inference_engine import InferenceEngine
+        model = InferenceEngine.from_file(model_path)
+    _worker_model = model
+
+
+def _worker_initargs(model):
+    model_path = getattr(model, "path", None)
+    return (None, model_path) if model_path is not None else (model,)
+
+
+def _predict_in_worker(reviews):
+    return predict_with_confidence(_worker_model, reviews)
+
+
+class InferenceExecutor:
+    """Runs blocking model inference off the asyncio event loop with a bounded number of pending batches.
+
+    The live model can be replaced with `swap_model`; every batch is scored entirely by one
+    model version, which `predict` returns alongside the predictions and their confidences.
+    """
+
+    def __init__(self, model, version, mode=EXECUTOR_MODE, workers=EXECUTOR_WORKERS,
+                 max_pending=MAX_PENDING_BATCHES):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self._pending = 0
+        self._thread_pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        # (model, version, process pool or None) is replaced as a whole on swap
+        self._state = (model, version, self._make_process_pool(model))
+
+    def _make_process_pool(self, model):
+        if self.mode != "process":
+            return None
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=_worker_initargs(model))
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @property
+    def version(self):
+        return self._state[1]
+
+    async def predict(self, reviews):
+        """Predicts a batch of reviews in the pool, raising InferenceSaturated when too many batches are queued.
+
+        Returns (predictions, confidences, model_version).
+        """
+        if self._pending >= self.max_pending:
+            raise InferenceSaturated(f"{self._pending} inference batches already pending")
+
+        model, version, process_pool = self._state
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if process_pool is not None:
+                predictions, confidences = await loop.run_in_executor(process_pool, _predict_in_worker, reviews)
+            else:
+                predictions, confidences = await loop.run_in_executor(
+                    self._thread_pool, predict_with_confidence, model, reviews
+                )
+            return predictions, confidences, version
+        finally:
+            self._pending -= 1
+
+    def swap_model(self, model, version, warmup_reviews=None):
+        """Atomically makes `model` the live model; batches already running finish on the old one."""
+        process_pool = self._make_process_pool(model)
+        if process_pool is not None and warmup_reviews:
+            # Start the worker processes (and unpickle the model in them) before going live
+            warmups = [process_pool.submit(_predict_in_worker, warmup_reviews) for _ in range(self.workers)]
+            for warmup in warmups:
+                warmup.result()
+
+        old_pool = self._state[2]
+        self._state = (model, version, process_pool)
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def shutdown(self, wait=True):
+        self._thread_pool.shutdown(wait=wait)
+        if self._state[2] is not None:
+            self._state[2].shutdown(wait=wait)
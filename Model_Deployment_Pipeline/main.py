@@ -1,10 +1,16 @@
-from fastapi import FastAPI, Request, Form
+from fastapi import FastAPI, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
+from typing import List
 from model_loader import load_latest_model
-from gcp_logging import log_prediction
-import random
+from gcp_logging import log_prediction, close_prediction_logger
+from batching import MicroBatcher
+from inference_executor import InferenceExecutor, InferenceSaturated
+from model_watcher import ModelWatcher, SMOKE_REVIEWS
+from prediction_cache import PredictionCache
+import os
 import re  # ✅ For pattern matching
 
 app = FastAPI()
@@ -19,6 +25,94 @@ except Exception as e:
     model = None
     model_version = "Unavailable"
 
+SENTIMENT_MAP = {
+    0: "Negative",
+    1: "Neutral",
+    2: "Positive"
+}
+
+# Upper bound on reviews accepted by a single POST /v1/predict call
+MAX_REVIEWS_PER_REQUEST = int(os.environ.get("MAX_REVIEWS_PER_REQUEST", "1000"))
+
+
+def is_valid_review(review: str) -> bool:
+    """Guardrail: reject empty or non-alphabetic inputs."""
+    cleaned_review = review.strip()
+    return bool(cleaned_review) and bool(re.search(r"[a-zA-Z]", cleaned_review))
+
+
+# Blocking inference runs in a thread/process pool, never on the event loop
+executor = InferenceExecutor(model, model_version) if model else None
+
+
+def swap_model(new_model, new_version):
+    """Called from the model watcher thread once a newly published model passed validation."""
+    global model, model_version, executor
+    if executor is None:
+        executor = InferenceExecutor(new_model, new_version)
+    else:
+        executor.swap_model(new_model, new_version, warmup_reviews=SMOKE_REVIEWS)
+    model, model_version = new_model, new_version
+    prediction_cache.clear()
+
+
+watcher = ModelWatcher(model_version, swap_model)
+
+
+async def predict_batch(reviews):
+    """Runs one vectorized predict_proba over a batch; returns (sentiment, confidence, model_version) triples."""
+    predictions, confidences, version = await executor.predict(reviews)
+    return [
+        (SENTIMENT_MAP.get(int(prediction), "Unknown"), float(confidence), version)
+        for prediction, confidence in zip(predictions, confidences)
+    ]
+
+
+batcher = MicroBatcher(predict_batch)
+
+# Repeated reviews (copy-pastes, client retries) are answered without touching the model
+prediction_cache = PredictionCache()
+
+
+async def predict_reviews_cached(reviews):
+    """Like batcher.submit_many, but answers cached reviews directly and sends each distinct miss once."""
+    keys = [prediction_cache.key(review, model_version) for review in reviews]
+    results = prediction_cache.get_many(keys)
+
+    misses = {}  # key -> review, first occurrence only
+    for key, review, result in zip(keys, reviews, results):
+        if result is None:
+            misses.setdefault(key, review)
+    if misses:
+        predictions = await batcher.submit_many(list(misses.values()))
+        # Keyed by the version that actually served them, which may be newer than the one looked up
+        prediction_cache.put_many(
+            [prediction_cache.key(review, prediction[2]) for review, prediction in zip(misses.values(), predictions)],
+            predictions
+        )
+        fresh = dict(zip(misses, predictions))
+        results = [fresh[key] if result is None else result for key, result in zip(keys, results)]
+    return results
+
+
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
+    watcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    watcher.stop()
+    await batcher.stop()
+    if executor:
+        executor.shutdown()
+    close_prediction_logger()
+
+
+class PredictRequest(BaseModel):
+    reviews: List[str]
+
 # Route: GET /
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -35,10 +129,8 @@ async def index(request: Request):
 @app.post("/", response_class=HTMLResponse)
 async def get_sentiment(request: Request, review: str = Form(...)):
     try:
-        cleaned_review = review.strip()
-
         # 🚧 Guardrail: check for empty or non-alphabetic inputs
-        if not cleaned_review or not re.search(r"[a-zA-Z]", cleaned_review):
+        if not is_valid_review(review):
             return templates.TemplateResponse("index.html", {
                 "request": request,
                 "sentiment": None,
@@ -58,25 +150,27 @@ async def get_sentiment(request: Request, review: str = Form(...)):
                 "error_message": None
             })
 
-        # ✅ Make prediction
-        prediction = model.predict([review])[0]
-
-        sentiment_map = {
-            0: "Negative",
-            1: "Neutral",
-            2: "Positive"
-        }
-        sentiment = sentiment_map.get(int(prediction), "Unknown")
+        # ✅ Make prediction (cached, or coalesced with concurrent requests)
+        try:
+            sentiment, confidence, served_version = (await predict_reviews_cached([review]))[0]
+        except InferenceSaturated:
+            return templates.TemplateResponse("index.html", {
+                "request": request,
+                "sentiment": None,
+                "confidence": None,
+                "review": review,
+                "model_version": model_version,
+                "error_message": "⏳ The server is busy. Please try again in a moment."
+            }, status_code=429)
 
-        confidence = f"{random.randint(85, 99)}%"
         log_prediction(review, sentiment)
 
         return templates.TemplateResponse("index.html", {
             "request": request,
             "sentiment": sentiment,
-            "confidence": confidence,
+            "confidence": f"{confidence:.0%}",
             "review": review,
-            "model_version": model_version,
+            "model_version": served_version,
             "error_message": None
         })
 
@@ -90,3 +184,50 @@ async def get_sentiment(request: Request, review: str = Form(...)):
             "model_version": model_version,
             "error_message": None
         })
+
+# Route: POST /v1/predict (JSON batch API)
+@app.post("/v1/predict")
+async def predict_reviews(payload: PredictRequest):
+    if not payload.reviews:
+        raise HTTPException(status_code=422, detail="`reviews` must contain at least one review.")
+    if len(payload.reviews) > MAX_REVIEWS_PER_REQUEST:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_REVIEWS_PER_REQUEST} reviews are accepted per request."
+        )
+    if not model:
+        raise HTTPException(status_code=503, detail="Model not available.")
+
+    valid_reviews = [review for review in payload.reviews if is_valid_review(review)]
+    try:
+        sentiments = iter(await predict_reviews_cached(valid_reviews))
+    except InferenceSaturated:
+        raise HTTPException(status_code=429, detail="Server is busy. Retry later.")
+
+    predictions = []
+    for review in payload.reviews:
+        if is_valid_review(review):
+            sentiment, confidence, served_version = next(sentiments)
+            log_prediction(review, sentiment)
+            predictions.append({
+                "review": review,
+                "sentiment": sentiment,
+                "confidence": round(confidence, 4),
+                "model_version": served_version,
+                "error": None
+            })
+        else:
+            predictions.append({
+                "review": review,
+                "sentiment": None,
+                "confidence": None,
+                "model_version": None,
+                "error": "Please enter valid text for sentiment analysis."
+            })
+
+    return {"model_version": model_version, "predictions": predictions}
+
+# Route: GET /v1/cache/stats (prediction cache monitoring)
+@app.get("/v1/cache/stats")
+async def cache_stats():
+    return {"model_version": model_version, **prediction_cache.stats()}
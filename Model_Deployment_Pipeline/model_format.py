@@ -0,0 +1,129 @@
+import json
+import struct
+import numpy as np
+
+# Must match the writer in Model_Pipeline/model_export.py
+MAGIC = b"NBMODEL\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def apply_calibration(proba, calibration):
+    """Calibrates (n, classes) probabilities with a spec from Model_Pipeline/calibration.py; rows still sum to 1.
+
+    This is the only implementation: training, validation and every serving path call it.
+    """
+    if not calibration:
+        return proba
+    calibrated = np.empty_like(proba, dtype=np.float64)
+    for k in range(proba.shape[1]):
+        if calibration["method"] == "sigmoid":
+            z = calibration["coef"][k] * proba[:, k] + calibration["intercept"][k]
+            calibrated[:, k] = 1.0 / (1.0 + np.exp(-z))
+        else:
+            calibrated[:, k] = np.interp(proba[:, k], calibration["x"][k], calibration["y"][k])
+
+    totals = calibrated.sum(axis=1, keepdims=True)
+    uniform = np.full_like(calibrated, 1.0 / proba.shape[1])
+    return np.divide(calibrated, totals, out=uniform, where=totals > 0)
+
+
+class CalibratedModel:
+    """Wraps a classifier (or pipeline) so it serves calibrated probabilities.
+
+    Labels follow the calibrated argmax, as in the native inference engine.
+    """
+
+    def __init__(self, model, calibration):
+        self.model = model
+        self.calibration = calibration
+        self.classes_ = model.classes_
+
+    def predict_proba(self, X):
+        return apply_calibration(self.model.predict_proba(X), self.calibration)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def with_calibration(model, calibration):
+    """`model` wrapped in a CalibratedModel, or unchanged when there is no calibration."""
+    return CalibratedModel(model, calibration) if calibration else model
+
+
+def stored_calibration(model):
+    """Calibration saved with a trained pipeline (the `calibration_` attribute of the pickle), or None."""
+    return getattr(model, "calibration_", None)
+
+
+def is_exported_model(path):
+    """True if `path` is an exported .nbm model rather than a pickle."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ExportedModel:
+    """Read-only view of an exported model; arrays are memory-mapped straight from the file."""
+
+    def __init__(self, path):
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(raw[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not an exported model file")
+        (header_length,) = struct.unpack("<I", bytes(raw[len(MAGIC):len(MAGIC) + 4]))
+        header_end = len(MAGIC) + 4 + header_length
+        header = json.loads(bytes(raw[len(MAGIC) + 4:header_end]).decode("utf-8"))
+        if header["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {header['format_version']}")
+
+        data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+        self.arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            start = data_start + spec["offset"]
+            self.arrays[name] = raw[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+        self.path = path
+        self.vectorizer_spec = header["vectorizer"]
+        self.classes = np.array(header["classes"])
+        self.n_features = header["n_features"]
+        self.metadata = header.get("metadata", {})
+
+    def terms(self):
+        """Vocabulary terms in feature-index order, sliced out of the string table by `term_offsets`.
+
+        Term i is term_bytes[term_offsets[i]:term_offsets[i + 1] - 1], i.e. without its newline terminator.
+        """
+        offsets = self.arrays["term_offsets"]
+        table = self.arrays["term_bytes"].tobytes()
+        if (len(offsets) != self.n_features + 1 or offsets[0] != 0 or offsets[-1] != len(table)
+                or np.any(np.diff(offsets) < 1)):
+            raise ValueError(f"Corrupt term table in {self.path}: offsets do not match {self.n_features} terms")
+        bounds = offsets.tolist()
+        return [table[start:end - 1].decode("utf-8") for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def to_pipeline(self):
+        """Rebuilds the exported sklearn tfidf + MultinomialNB pipeline, without its calibration."""
+        # Imported here so serving with the native inference engine never loads sklearn
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.naive_bayes import MultinomialNB
+        from sklearn.pipeline import Pipeline
+
+        spec = dict(self.vectorizer_spec)
+        spec["ngram_range"] = tuple(spec["ngram_range"])
+        vectorizer = TfidfVectorizer(**spec)
+        vectorizer.vocabulary_ = dict(zip(self.terms(), range(self.n_features)))
+        vectorizer.idf_ = self.arrays["idf"]
+
+        nb = MultinomialNB()
+        nb.classes_ = self.classes
+        nb.feature_log_prob_ = self.arrays["feature_log_prob"]
+        nb.class_log_prior_ = self.arrays["class_log_prior"]
+        nb.n_features_in_ = self.n_features
+        return Pipeline([("tfidf", vectorizer), ("nb", nb)])
+
+
+def load_exported_model(path):
+    """The sklearn pipeline of an exported model, calibrated like the native engine when it has a calibration."""
+    exported = ExportedModel(path)
+    return with_calibration(exported.to_pipeline(), exported.metadata.get("calibration"))
@@ -1,39 +1,224 @@
 from google.cloud import storage
+from google.api_core.exceptions import NotFound
+import base64
+import hashlib
+import json
 import pickle
 import os
 import tempfile
 import re
+from model_format import is_exported_model, load_exported_model, stored_calibration, with_calibration
+from inference_engine import InferenceEngine
 
-def load_latest_model(bucket_name="mlops_dataset123", model_prefix="models/"):
+# ========== Artifact Cache Config ==========
+CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "model_cache"))
+CACHE_MAX_ENTRIES = int(os.environ.get("MODEL_CACHE_MAX_ENTRIES", "3"))
+OFFLINE_MODE = os.environ.get("MODEL_OFFLINE", "0") == "1"  # Boot from the cache without contacting GCS
+MANIFEST_NAME = "LATEST.json"  # Written by Model_Pipeline/model_versioning.py
+# "auto" serves the pickle-free .nbm export when the manifest lists one; "pickle" always uses the .pkl
+MODEL_FORMAT = os.environ.get("MODEL_FORMAT", "auto")
+# "native" scores exported models with the NumPy inference engine; "sklearn" rebuilds the sklearn pipeline
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "native")
+
+
+def extract_version(blob_name):
+    """Extracts the version from a model file name (e.g. model_v3.pkl → 3)."""
+    version_match = re.search(r"_v(\d+)", blob_name)
+    return version_match.group(1) if version_match else "Unknown"
+
+
+def file_md5(path, chunk_size=1 << 20):
+    """Base64 MD5 digest of a local file, in the same encoding GCS uses for `blob.md5_hash`."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode("ascii")
+
+
+def _cache_paths(blob, cache_dir):
+    """Cache entries are keyed by blob name + generation, so a re-uploaded blob never hits a stale copy."""
+    safe_name = blob.name.replace("/", "__")
+    base = os.path.join(cache_dir, f"{safe_name}-{blob.generation}")
+    return base + ".bin", base + ".json"
+
+
+def _write_json_atomic(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _cache_entries(cache_dir):
+    """Returns (metadata, artifact path, metadata path) for every complete cache entry."""
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        meta_path = os.path.join(cache_dir, name)
+        artifact_path = meta_path[:-len(".json")] + ".bin"
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if os.path.exists(artifact_path):
+            entries.append((meta, artifact_path, meta_path))
+    return entries
+
+
+def _evict(cache_dir, max_entries=CACHE_MAX_ENTRIES):
+    """Least-recently-used eviction; artifacts are touched on every cache hit."""
+    entries = sorted(_cache_entries(cache_dir), key=lambda e: os.path.getmtime(e[1]), reverse=True)
+    for meta, artifact_path, meta_path in entries[max(1, max_entries):]:
+        for path in (artifact_path, meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        print(f"🧹 Evicted cached model: {meta.get('blob_name')} (generation {meta.get('generation')})")
+
+
+def fetch_artifact(blob, cache_dir=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES):
+    """Returns a verified local copy of `blob`, downloading it only on a cache miss."""
+    os.makedirs(cache_dir, exist_ok=True)
+    artifact_path, meta_path = _cache_paths(blob, cache_dir)
+
+    if os.path.exists(artifact_path) and os.path.exists(meta_path):
+        if not blob.md5_hash or file_md5(artifact_path) == blob.md5_hash:
+            os.utime(artifact_path)  # Mark as recently used for LRU eviction
+            print(f"📦 Model cache hit: {blob.name} (generation {blob.generation})")
+            return artifact_path
+        print(f"⚠️ Cached model failed checksum, re-downloading: {blob.name}")
+
+    # Download next to the final path and rename, so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".download")
+    os.close(fd)
+    try:
+        blob.download_to_filename(tmp_path)
+        if blob.md5_hash and file_md5(tmp_path) != blob.md5_hash:
+            raise IOError(f"Checksum mismatch for downloaded model {blob.name}")
+        os.replace(tmp_path, artifact_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    _write_json_atomic(meta_path, {
+        "blob_name": blob.name,
+        "generation": blob.generation,
+        "md5_hash": blob.md5_hash,
+        "updated": blob.updated.isoformat() if blob.updated else None,
+        "version": extract_version(blob.name),
+    })
+    _evict(cache_dir, max_entries)
+    return artifact_path
+
+
+def load_model_file(path, engine=INFERENCE_ENGINE):
+    """Loads an exported (.nbm, memory-mapped) or pickled model from a local file.
+
+    Whichever form is loaded, it serves the calibrated probabilities fitted in training.
+    """
+    if is_exported_model(path):
+        return InferenceEngine.from_file(path) if engine == "native" else load_exported_model(path)
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    return with_calibration(model, stored_calibration(model))
+
+
+def load_cached_model(cache_dir=CACHE_DIR):
+    """Loads the most recently published model available in the local cache (offline boot)."""
+    entries = [
+        (meta, artifact_path, meta_path) for meta, artifact_path, meta_path in _cache_entries(cache_dir)
+        if not meta.get("md5_hash") or file_md5(artifact_path) == meta["md5_hash"]
+    ]
+    if not entries:
+        raise FileNotFoundError(f"No cached model found in {cache_dir}")
+
+    meta, artifact_path, _ = max(entries, key=lambda e: (e[0].get("updated") or "", os.path.getmtime(e[1])))
+    model = load_model_file(artifact_path)
+    os.utime(artifact_path)
+
+    print(f"✅ Loaded cached model: {meta['blob_name']} (Version: {meta['version']})")
+    return model, meta["version"]
+
+
+def read_manifest_blob(bucket, model_prefix="models/", model_format=MODEL_FORMAT):
+    """Resolves the blob named by `<model_prefix>LATEST.json`, or None if there is no usable manifest.
+
+    The manifest's pickle-free export is preferred unless `model_format` is "pickle".
+    """
     try:
-        # Init GCP Storage Client
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
+        manifest = json.loads(bucket.blob(model_prefix + MANIFEST_NAME).download_as_text())
+    except NotFound:
+        return None
+    except ValueError as e:
+        print(f"⚠️ Model manifest is not valid JSON, ignoring it: {e}")
+        return None
+
+    export = manifest.get("export")
+    if export and model_format != "pickle":
+        blob = bucket.get_blob(export["blob"])
+        if blob is not None:
+            return blob
+        print(f"⚠️ Model manifest points to a missing export, using the pickle: {export['blob']}")
+
+    blob = bucket.get_blob(manifest["blob"])
+    if blob is None:
+        print(f"⚠️ Model manifest points to a missing blob: {manifest['blob']}")
+        return None
+    if manifest.get("md5_hash") and blob.md5_hash != manifest["md5_hash"]:
+        print(f"⚠️ {blob.name} was overwritten after the manifest was published")
+    return blob
 
-        # List all model blobs in the prefix
-        blobs = list(bucket.list_blobs(prefix=model_prefix))
 
-        # Filter only .pkl files and sort by updated timestamp
-        model_blobs = [blob for blob in blobs if blob.name.endswith(".pkl")]
-        if not model_blobs:
-            raise FileNotFoundError("No model files found in GCS bucket")
+def find_latest_model_blob(bucket_name="mlops_dataset123", model_prefix="models/"):
+    """Returns the latest model blob: from the manifest in O(1), else the most recently updated .pkl."""
+    # Init GCP Storage Client
+    storage_client = storage.Client()
+    bucket = storage_client.bucket(bucket_name)
 
-        # Sort by latest update time
-        latest_blob = sorted(model_blobs, key=lambda x: x.updated, reverse=True)[0]
+    manifest_blob = read_manifest_blob(bucket, model_prefix)
+    if manifest_blob is not None:
+        return manifest_blob
 
-        # Download to temp file
-        temp_dir = tempfile.gettempdir()
-        local_path = os.path.join(temp_dir, "model.pkl")
-        latest_blob.download_to_filename(local_path)
+    # Fallback: list all model blobs in the prefix
+    blobs = list(bucket.list_blobs(prefix=model_prefix))
 
-        # Load model
-        with open(local_path, "rb") as f:
-            model = pickle.load(f)
+    # Filter only .pkl files and sort by updated timestamp
+    model_blobs = [blob for blob in blobs if blob.name.endswith(".pkl")]
+    if not model_blobs:
+        raise FileNotFoundError("No model files found in GCS bucket")
 
-        # Extract version from file name (e.g. model_v3.pkl → 3)
-        version_match = re.search(r"_v(\d+)", latest_blob.name)
-        version = version_match.group(1) if version_match else "Unknown"
+    # Sort by latest update time
+    return sorted(model_blobs, key=lambda x: x.updated, reverse=True)[0]
 
+
+def load_model_from_blob(blob, cache_dir=CACHE_DIR):
+    """Fetches `blob` through the local artifact cache and loads it."""
+    local_path = fetch_artifact(blob, cache_dir)
+    return load_model_file(local_path), extract_version(blob.name)
+
+
+def load_latest_model(bucket_name="mlops_dataset123", model_prefix="models/", cache_dir=CACHE_DIR,
+                      offline=OFFLINE_MODE):
+    if offline:
+        return load_cached_model(cache_dir)
+
+    try:
+        latest_blob = find_latest_model_blob(bucket_name, model_prefix)
+    except FileNotFoundError as e:
+        print(f"🚨 Failed to load model from GCP bucket: {e}")
+        raise
+    except Exception as e:
+        print(f"⚠️ GCS unreachable ({e}), booting from the local model cache...")
+        return load_cached_model(cache_dir)
+
+    try:
+        model, version = load_model_from_blob(latest_blob, cache_dir)
         print(f"✅ Loaded model: {latest_blob.name} (Version: {version})")
         return model, version
 
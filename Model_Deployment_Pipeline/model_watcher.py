@@ -0,0 +1,92 @@
+import os
+import threading
+import numpy as np
+from model_loader import find_latest_model_blob, load_model_from_blob, extract_version
+
+# Seconds between checks for a newly published model (0 disables hot reload)
+POLL_INTERVAL_S = float(os.environ.get("MODEL_POLL_INTERVAL_S", "60"))
+
+# Reviews used to warm up and sanity-check a candidate model before it goes live
+SMOKE_REVIEWS = [
+    "This product is amazing, I love it!",
+    "It is okay, nothing special.",
+    "Terrible quality, it broke after one day.",
+]
+VALID_LABELS = {0, 1, 2}
+
+
+def validate_model(model, reviews=SMOKE_REVIEWS):
+    """Runs a smoke batch through `model`, raising ValueError if the output is unusable."""
+    predictions = list(model.predict(reviews))
+    if len(predictions) != len(reviews):
+        raise ValueError(f"Expected {len(reviews)} predictions, got {len(predictions)}")
+    labels = {int(p) for p in predictions}
+    # Pipelines expose the full label set, which catches bad labels the smoke batch did not hit
+    labels.update(int(c) for c in getattr(model, "classes_", []))
+    unexpected = labels - VALID_LABELS
+    if unexpected:
+        raise ValueError(f"Model produced unexpected labels: {sorted(unexpected)}")
+    # Confidences are served from predict_proba, so a broken calibration must not go live either
+    proba = model.predict_proba(reviews)
+    if proba.shape != (len(reviews), len(model.classes_)) or not np.allclose(proba.sum(axis=1), 1.0):
+        raise ValueError("Model produced invalid class probabilities")
+
+
+class ModelWatcher:
+    """Polls GCS for a newly published model and hot-swaps it in without a restart.
+
+    The candidate is downloaded, unpickled and validated on the watcher thread; only a model
+    that passes the smoke batch is handed to `on_swap(model, version)`, so requests never
+    wait on a reload and a bad upload never replaces a working model.
+    """
+
+    def __init__(self, current_version, on_swap, poll_interval=POLL_INTERVAL_S,
+                 bucket_name="mlops_dataset123", model_prefix="models/"):
+        self.current_version = current_version
+        self.on_swap = on_swap
+        self.poll_interval = poll_interval
+        self.bucket_name = bucket_name
+        self.model_prefix = model_prefix
+        self._loaded_key = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def check_once(self):
+        """Swaps in the latest published model if it differs from the live one; returns True on swap."""
+        blob = find_latest_model_blob(self.bucket_name, self.model_prefix)
+        key = (blob.name, blob.generation)
+        if self._loaded_key is None and extract_version(blob.name) == self.current_version:
+            # The model loaded at startup is already the latest one
+            self._loaded_key = key
+            return False
+        if key == self._loaded_key:
+            return False
+
+        print(f"🔄 New model detected: {blob.name}, loading in the background...")
+        model, version = load_model_from_blob(blob)
+        validate_model(model)
+
+        self.on_swap(model, version)
+        self._loaded_key = key
+        self.current_version = version
+        print(f"✅ Hot-swapped to model version {version}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                print(f"🚨 Model reload check failed, keeping version {self.current_version}: {e}")
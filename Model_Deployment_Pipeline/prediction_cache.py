@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache config (overridable per deployment)
+CACHE_MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))  # 0 disables the cache
+CACHE_TTL_S = float(os.environ.get("PREDICTION_CACHE_TTL_S", "3600"))  # 0 keeps entries until evicted
+
+
+def normalize_review(review):
+    """Lowercases and collapses whitespace; the vectorizer lowercases and splits on whitespace anyway,
+    so reviews that normalize alike always get the same prediction."""
+    return " ".join(review.lower().split())
+
+
+class PredictionCache:
+    """Bounded LRU cache of predictions keyed on (normalized review hash, model version).
+
+    Entries older than `ttl_s` are dropped on lookup. Lookups and inserts take a lock, so the
+    model watcher thread can `clear` the cache while requests are being served.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_s=CACHE_TTL_S):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_s = max(0.0, float(ttl_s))
+        self._entries = OrderedDict()  # key -> (expires_at, prediction), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(review, version):
+        text = f"{version}\x00{normalize_review(review)}"
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get_many(self, keys):
+        """Cached predictions for `keys`, with None for every miss."""
+        if not self.enabled:
+            return [None] * len(keys)
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl_s and entry[0] <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[1])
+        return results
+
+    def put_many(self, keys, predictions):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_s
+        with self._lock:
+            for key, prediction in zip(keys, predictions):
+                self._entries[key] = (expires_at, prediction)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry, e.g. when a new model goes live."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
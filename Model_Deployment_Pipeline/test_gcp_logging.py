@@ -0,0 +1,83 @@
+import json
+import time
+from gcp_logging import PredictionLogger
+
+
+class FlakySink:
+    """Sink that fails while `failing` is set and otherwise records every row it receives."""
+
+    def __init__(self, failing=True):
+        self.failing = failing
+        self.attempts = 0
+        self.rows = []
+
+    def write(self, rows):
+        self.attempts += 1
+        if self.failing:
+            raise RuntimeError("insert failed")
+        self.rows.extend(rows)
+
+
+def make_logger(sink, spill_path):
+    return PredictionLogger(sink, batch_size=10, flush_interval=0.05, max_retries=1,
+                            spill_path=str(spill_path), retry_backoff=0.01)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition(), "Timed out waiting for the background logger"
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_failed_insert_is_spilled_to_file(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    sink = FlakySink(failing=True)
+    logger = make_logger(sink, spill_path).start()
+    logger.log("great product", "Positive")
+    logger.log("awful", "Negative")
+    logger.close()
+
+    assert sink.attempts >= 2, "The insert should be retried before spilling"
+    assert logger.spilled == 2 and logger.dropped == 0
+    rows = read_rows(spill_path)
+    assert [(row["review"], row["sentiment"]) for row in rows] == [("great product", "Positive"), ("awful", "Negative")]
+
+
+def test_spilled_rows_are_replayed_after_next_successful_insert(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    sink = FlakySink(failing=True)
+    logger = make_logger(sink, spill_path).start()
+    logger.log("great product", "Positive")
+    wait_for(lambda: logger.spilled == 1)
+
+    sink.failing = False
+    logger.log("awful", "Negative")
+    logger.close()
+
+    assert [row["review"] for row in sink.rows] == ["awful", "great product"], "Spilled row should be replayed"
+    assert not spill_path.exists(), "The spill file should be gone once replayed"
+    assert not (tmp_path / "spill.jsonl.replay").exists()
+
+
+def test_rows_that_fail_again_on_replay_stay_spilled(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    spill_path.write_text(json.dumps({"review": "old", "sentiment": "Neutral", "timestamp": "t"}) + "\n")
+
+    class FailsOnReplay(FlakySink):
+        def write(self, rows):
+            self.failing = any(row["review"] == "old" for row in rows)
+            super().write(rows)
+
+    sink = FailsOnReplay(failing=False)
+    logger = make_logger(sink, spill_path).start()
+    logger.log("new", "Positive")
+    logger.close()
+
+    assert [row["review"] for row in sink.rows] == ["new"]
+    assert [row["review"] for row in read_rows(spill_path)] == ["old"], "Unreplayed rows must not be lost"
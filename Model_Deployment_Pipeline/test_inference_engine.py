@@ -0,0 +1,119 @@
+import os
+import pickle
+import numpy as np
+import pytest
+from conftest import train_pipeline
+from inference_engine import InferenceEngine, compare_with_trained_model, verify_against_pipeline
+from model_export import export_model
+from model_format import CalibratedModel, ExportedModel, apply_calibration
+from model_loader import load_model_file
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_reviews.txt")
+
+VECTORIZER_SETTINGS = [
+    {},
+    {"stop_words": "english"},
+    {"ngram_range": (1, 3), "sublinear_tf": True},
+    {"ngram_range": (2, 2), "token_pattern": r"(?u)\b\w+\b"},
+    {"lowercase": False, "strip_accents": "unicode", "norm": "l1"},
+    {"strip_accents": "ascii", "binary": True, "norm": None},
+    {"stop_words": ["great", "product"], "ngram_range": (1, 2), "smooth_idf": False},
+]
+
+# Float32 export vs the float64 trained model; observed differences are around 1e-7
+TRAINED_MODEL_ATOL = 1e-6
+
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def export_and_load(pipeline, tmp_path, metadata=None):
+    path = str(tmp_path / "model.nbm")
+    export_model(pipeline, path, metadata=metadata)
+    exported = ExportedModel(path)
+    return InferenceEngine(exported), exported
+
+
+@pytest.mark.parametrize("settings", VECTORIZER_SETTINGS)
+def test_analyzer_matches_sklearn(settings, tmp_path):
+    pipeline = train_pipeline(**settings)
+    engine, _ = export_and_load(pipeline, tmp_path)
+    analyzer = pipeline.named_steps["tfidf"].build_analyzer()
+    for review in load_golden():
+        assert engine.analyze(review) == analyzer(review), f"Terms differ from sklearn for {review!r}"
+
+
+@pytest.mark.parametrize("settings", VECTORIZER_SETTINGS)
+def test_golden_set_matches_exported_pipeline_bit_for_bit(settings, tmp_path):
+    engine, exported = export_and_load(train_pipeline(**settings), tmp_path)
+    golden = load_golden()
+    mismatches = verify_against_pipeline(engine, exported.to_pipeline(), golden)
+    assert not mismatches, f"Joint log-likelihoods differ on {[golden[i] for i in mismatches]}"
+
+    # Labels follow the (bit-exact) joint log-likelihoods; the softmax may differ from scipy's logsumexp by an ulp
+    assert np.array_equal(engine.predict(golden), exported.to_pipeline().predict(golden))
+    np.testing.assert_allclose(engine.predict_proba(golden), exported.to_pipeline().predict_proba(golden),
+                               rtol=1e-12, atol=0)
+
+
+@pytest.mark.parametrize("settings", VECTORIZER_SETTINGS)
+def test_golden_set_matches_trained_pipeline_within_tolerance(settings, tmp_path):
+    pipeline = train_pipeline(**settings)
+    engine, _ = export_and_load(pipeline, tmp_path)
+    max_diff, disagreements = compare_with_trained_model(engine, pipeline, load_golden())
+    assert max_diff <= TRAINED_MODEL_ATOL, f"Probabilities drift {max_diff:.2e} from the trained pipeline"
+    assert disagreements == 0, f"{disagreements} golden reviews changed label after export"
+
+
+CALIBRATIONS = [
+    {"method": "sigmoid", "classes": [0, 1, 2], "coef": [4.0, 2.5, 3.0], "intercept": [-2.0, -1.0, -1.5]},
+    {"method": "isotonic", "classes": [0, 1, 2], "x": [[0.0, 0.3, 1.0]] * 3,
+     "y": [[0.0, 0.5, 1.0], [0.1, 0.2, 0.9], [0.0, 0.6, 1.0]]},
+]
+
+
+@pytest.mark.parametrize("calibration", CALIBRATIONS)
+def test_calibrated_probabilities_match_training(calibration, tmp_path):
+    engine, exported = export_and_load(train_pipeline(), tmp_path, metadata={"calibration": calibration})
+    golden = load_golden()
+    expected = apply_calibration(exported.to_pipeline().predict_proba(golden), calibration)
+    np.testing.assert_allclose(engine.predict_proba(golden), expected, rtol=0, atol=1e-12)
+    assert np.array_equal(engine.predict(golden), exported.classes[expected.argmax(axis=1)])
+
+
+@pytest.mark.parametrize("calibration", CALIBRATIONS)
+def test_every_serving_path_applies_the_calibration(calibration, tmp_path):
+    golden = load_golden()
+    pipeline = train_pipeline()
+    export_path = str(tmp_path / "model.nbm")
+    export_model(pipeline, export_path, metadata={"calibration": calibration})
+    # Model_training.py pickles the calibration with the pipeline
+    pipeline.calibration_ = calibration
+    pickle_path = tmp_path / "model.pkl"
+    pickle_path.write_bytes(pickle.dumps(pipeline))
+
+    native = load_model_file(export_path, engine="native")
+    rebuilt = load_model_file(export_path, engine="sklearn")
+    unpickled = load_model_file(str(pickle_path))
+    assert isinstance(rebuilt, CalibratedModel) and isinstance(unpickled, CalibratedModel)
+
+    expected = native.predict_proba(golden)
+    np.testing.assert_allclose(rebuilt.predict_proba(golden), expected, rtol=0, atol=1e-12)
+    assert np.array_equal(rebuilt.predict(golden), native.predict(golden))
+    # The pickle keeps float64 arrays; steep isotonic steps can magnify the export's float32 rounding
+    calibrated = apply_calibration(pipeline.predict_proba(golden), calibration)
+    assert np.array_equal(unpickled.predict_proba(golden), calibrated)
+    np.testing.assert_allclose(calibrated, expected, rtol=0, atol=1e-3)
+    assert np.array_equal(unpickled.predict(golden), native.predict(golden))
+
+
+def test_uncalibrated_models_are_served_unwrapped(tmp_path):
+    pipeline = train_pipeline()
+    pickle_path = tmp_path / "model.pkl"
+    pickle_path.write_bytes(pickle.dumps(pipeline))
+    export_path = str(tmp_path / "model.nbm")
+    export_model(pipeline, export_path)
+    assert not isinstance(load_model_file(str(pickle_path)), CalibratedModel)
+    assert not isinstance(load_model_file(export_path, engine="sklearn"), CalibratedModel)
@@ -0,0 +1,76 @@
+import asyncio
+import numpy as np
+import pytest
+from batching import MicroBatcher
+from conftest import StubModel
+from inference_engine import InferenceEngine
+from inference_executor import InferenceExecutor, InferenceSaturated, predict_with_confidence, _worker_initargs
+
+REVIEWS = ["This product is amazing, I love it!", "Terrible quality, it broke after one day.", "meh"]
+
+
+def test_executor_rejects_batches_beyond_max_pending():
+    model = StubModel(block=True)
+    executor = InferenceExecutor(model, "1", mode="thread", workers=1, max_pending=1)
+
+    async def scenario():
+        first = asyncio.create_task(executor.predict(["first"]))
+        await asyncio.get_running_loop().run_in_executor(None, model.started.wait, 5)
+        with pytest.raises(InferenceSaturated):
+            await executor.predict(["second"])
+        model.release.set()
+        return await first
+
+    try:
+        predictions, confidences, version = asyncio.run(scenario())
+    finally:
+        model.release.set()
+        executor.shutdown()
+    assert list(predictions) == [2] and version == "1", "The batch already running should still complete"
+    assert executor.pending == 0, "Pending count should drop back to zero"
+
+
+def test_batcher_rejects_reviews_beyond_queue():
+    async def scenario():
+        batcher = MicroBatcher(lambda reviews: reviews, max_wait_ms=0, max_queue=2)
+        batcher.start()
+        try:
+            with pytest.raises(InferenceSaturated):
+                await batcher.submit_many(["a", "b", "c"])
+            assert batcher._queue.empty(), "A rejected request must not leave reviews queued"
+            return await batcher.submit_many(["a", "b"])
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+
+
+def test_predict_route_returns_429_when_batcher_queue_is_full(app_main, app_client, monkeypatch):
+    monkeypatch.setattr(app_main.batcher, "max_queue", 2)
+    response = app_client.post("/v1/predict", json={"reviews": ["good one", "bad one", "okay one"]})
+    assert response.status_code == 429, f"Expected 429, got {response.status_code}: {response.text}"
+
+
+def test_predict_route_returns_429_when_executor_is_full(app_main, app_client, monkeypatch):
+    monkeypatch.setattr(app_main.executor, "max_pending", 0)
+    response = app_client.post("/v1/predict", json={"reviews": ["never seen before"]})
+    assert response.status_code == 429, f"Expected 429, got {response.status_code}: {response.text}"
+
+    monkeypatch.undo()
+    response = app_client.post("/v1/predict", json={"reviews": ["never seen before"]})
+    assert response.status_code == 200, "Requests should succeed again once the executor has room"
+
+
+def test_process_workers_reopen_exported_model(exported_model_path):
+    engine = InferenceEngine.from_file(exported_model_path)
+    assert _worker_initargs(engine) == (None, exported_model_path), "Workers should get the path, not the arrays"
+    assert _worker_initargs(StubModel())[0] is not None, "Models without a file are still passed by value"
+
+    executor = InferenceExecutor(engine, "1", mode="process", workers=1)
+    try:
+        predictions, confidences, _ = asyncio.run(executor.predict(REVIEWS))
+    finally:
+        executor.shutdown()
+    expected_predictions, expected_confidences = predict_with_confidence(engine, REVIEWS)
+    assert np.array_equal(predictions, expected_predictions)
+    assert np.array_equal(confidences, expected_confidences), "Worker predictions should match in-process ones"
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from conftest import train_pipeline
+from model_export import export_model
+from model_format import ExportedModel
+
+
+def test_terms_are_read_through_offsets(tmp_path):
+    pipeline = train_pipeline(ngram_range=(1, 2), token_pattern=r"(?u)\b\w+\b")
+    path = str(tmp_path / "model.nbm")
+    export_model(pipeline, path)
+
+    vocabulary = pipeline.named_steps["tfidf"].vocabulary_
+    terms = ExportedModel(path).terms()
+    assert terms == sorted(vocabulary, key=vocabulary.get), "Terms should come back in feature-index order"
+    assert "très bien" in terms and "café" in terms, "Non-ASCII terms should round-trip"
+
+
+def test_inconsistent_term_offsets_are_rejected(tmp_path):
+    path = str(tmp_path / "model.nbm")
+    export_model(train_pipeline(), path)
+
+    exported = ExportedModel(path)
+    offsets = np.array(exported.arrays["term_offsets"])
+    empty_term = offsets.copy()
+    empty_term[1] = 0
+    for corrupt in (offsets[:-1], offsets + 1, empty_term):
+        exported.arrays["term_offsets"] = corrupt
+        with pytest.raises(ValueError, match="Corrupt term table"):
+            exported.terms()
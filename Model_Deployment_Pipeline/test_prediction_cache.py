@@ -0,0 +1,81 @@
+import prediction_cache
+from conftest import StubModel
+from prediction_cache import PredictionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prediction_cache.time, "monotonic", clock)
+    cache = PredictionCache(max_entries=10, ttl_s=60)
+    key = cache.key("great product", "1")
+    cache.put_many([key], ["Positive"])
+
+    clock.now += 59
+    assert cache.get_many([key]) == ["Positive"]
+    clock.now += 1
+    assert cache.get_many([key]) == [None], "Entries should expire once their TTL has elapsed"
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_zero_ttl_keeps_entries_until_evicted(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prediction_cache.time, "monotonic", clock)
+    cache = PredictionCache(max_entries=10, ttl_s=0)
+    key = cache.key("great product", "1")
+    cache.put_many([key], ["Positive"])
+    clock.now += 10 ** 9
+    assert cache.get_many([key]) == ["Positive"]
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2, ttl_s=0)
+    a, b, c = (cache.key(review, "1") for review in ("a review", "b review", "c review"))
+    cache.put_many([a, b], ["A", "B"])
+    assert cache.get_many([a]) == ["A"]  # a is now more recent than b
+
+    cache.put_many([c], ["C"])
+    assert cache.get_many([a, b, c]) == ["A", None, "C"], "The least recently used entry should be evicted"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_keys_normalize_reviews_and_include_the_model_version():
+    assert PredictionCache.key("Great  product\n", "1") == PredictionCache.key("great product", "1")
+    assert PredictionCache.key("great product", "1") != PredictionCache.key("great product", "2")
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(max_entries=0)
+    key = cache.key("great product", "1")
+    cache.put_many([key], ["Positive"])
+    assert cache.get_many([key]) == [None] and cache.stats()["entries"] == 0
+
+
+def test_model_swap_invalidates_cached_predictions(app_main, app_client, monkeypatch):
+    # swap_model replaces these globals; monkeypatch restores them for the other app tests
+    monkeypatch.setattr(app_main, "model", app_main.model)
+    monkeypatch.setattr(app_main, "model_version", app_main.model_version)
+    monkeypatch.setattr(app_main, "executor", None)  # So swap_model builds a fresh executor
+    review = {"reviews": ["Cached until the model changes"]}
+    first_model = StubModel()
+    app_main.swap_model(first_model, "10")
+    assert app_client.post("/v1/predict", json=review).json()["model_version"] == "10"
+    app_client.post("/v1/predict", json=review)
+    assert first_model.calls == 1, "The repeated review should have been answered from the cache"
+
+    invalidations = app_main.prediction_cache.stats()["invalidations"]
+    second_model = StubModel()
+    app_main.swap_model(second_model, "11")
+    assert app_main.prediction_cache.stats()["invalidations"] == invalidations + 1
+    assert app_main.prediction_cache.stats()["entries"] == 0, "Swapping the model should drop every entry"
+
+    prediction = app_client.post("/v1/predict", json=review).json()["predictions"][0]
+    assert prediction["model_version"] == "11" and second_model.calls == 1, "The new model should be asked again"
+    app_main.executor.shutdown()
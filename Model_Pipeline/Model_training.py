@@ -1,12 +1,15 @@
-import pandas as pd
 import logging
 import pickle
+import json
 import os
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.metrics import accuracy_score
 from sklearn.pipeline import Pipeline
+from feature_store import VECTORIZER_PARAMS, load_features
+from streaming_training import train_streaming
+from prepared_data import sample_weights
+from model_export import export_model
+from calibration import CALIBRATION_METHOD, fit_calibration, with_calibration
 
 # ========== Logging ==========
 logging.basicConfig(
@@ -20,57 +23,56 @@ logging.info("Starting Sentiment Analysis Training with Naïve Bayes...")
 DATA_PATH = "Data/Data.csv"
 MODEL_DIR = "models"
 MODEL_FILE = os.path.join(MODEL_DIR, "sentiment_analyzer_model.pkl")
+EXPORT_FILE = os.path.join(MODEL_DIR, "sentiment_analyzer_model.nbm")  # Pickle-free copy for serving
+METRICS_FILE = os.path.join(MODEL_DIR, "metrics.json")
+TRAINING_MODE = os.environ.get("TRAINING_MODE", "batch")  # "batch" or "streaming" (out-of-core)
 
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-# ========== Load Data ==========
-df = pd.read_csv(DATA_PATH)
+if TRAINING_MODE == "streaming":
+    # ========== Out-of-Core Training ==========
+    logging.info("Training pipeline in streaming mode...")
+    pipeline, accuracy = train_streaming(DATA_PATH)
+    calibration = None
+    if CALIBRATION_METHOD != "none":
+        logging.info("Skipping probability calibration: it needs the training features in memory")
+else:
+    # ========== Load Cached TF-IDF Features ==========
+    vectorizer, X_train, X_test, y_train, y_test = load_features(DATA_PATH, VECTORIZER_PARAMS)
 
-def map_sentiment(rating):
-    if rating <= 2:
-        return "Negative"
-    elif rating == 3:
-        return "Neutral"
-    else:
-        return "Positive"
+    # ========== Pipeline ==========
+    logging.info("Training pipeline...")
+    nb = MultinomialNB()
+    nb.fit(X_train, y_train, sample_weight=sample_weights(y_train))
+    pipeline = Pipeline([
+        ("tfidf", vectorizer),
+        ("nb", nb)
+    ])
 
-df["label"] = df["star_rating"].apply(map_sentiment)
-df = df.dropna(subset=["review_body"])
-df["review_body"] = df["review_body"].astype(str)
+    # ========== Evaluation ==========
+    y_pred = nb.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred, sample_weight=sample_weights(y_test))
 
-label_mapping = {"Negative": 0, "Neutral": 1, "Positive": 2}
-df["label"] = df["label"].map(label_mapping)
-
-# ========== Balance the Data ==========
-logging.info("Balancing dataset...")
-positive = df[df["label"] == 2]
-negative = df[df["label"] == 0]
-neutral = df[df["label"] == 1]
-negative_upsampled = negative.sample(len(positive), replace=True, random_state=42)
-neutral_upsampled = neutral.sample(len(positive), replace=True, random_state=42)
-balanced_df = pd.concat([positive, negative_upsampled, neutral_upsampled])
-balanced_df = balanced_df.sample(frac=1, random_state=42).reset_index(drop=True)
-
-# ========== Train/Test Split ==========
-X_train, X_test, y_train, y_test = train_test_split(
-    balanced_df["review_body"], balanced_df["label"], test_size=0.2, random_state=42
-)
-
-# ========== Pipeline ==========
-pipeline = Pipeline([
-    ("tfidf", TfidfVectorizer(max_features=5000, stop_words="english")),
-    ("nb", MultinomialNB())
-])
-
-logging.info("Training pipeline...")
-pipeline.fit(X_train, y_train)
-
-# ========== Evaluation ==========
-y_pred = pipeline.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
+    # ========== Probability Calibration ==========
+    # Served predictions and confidences both come from the calibrated probabilities
+    calibration = fit_calibration(X_train, y_train, sample_weight=sample_weights(y_train), alpha=nb.alpha)
+    if calibration:
+        logging.info(f"Uncalibrated Validation Accuracy: {accuracy:.4f}")
+        # The served model predicts from the calibrated probabilities, so that accuracy is the one recorded below
+        calibrated_pred = with_calibration(nb, calibration).predict(X_test)
+        accuracy = accuracy_score(y_test, calibrated_pred, sample_weight=sample_weights(y_test))
+        # Pickled with the pipeline, so every consumer of the .pkl serves and evaluates the calibrated model
+        pipeline.calibration_ = calibration
 logging.info(f"Validation Accuracy: {accuracy:.4f}")
 
+# Recorded in the model manifest when this model is versioned
+with open(METRICS_FILE, "w") as f:
+    json.dump({"accuracy": round(float(accuracy), 4)}, f)
+
 # ========== Save Pipeline using Pickle ==========
 with open(MODEL_FILE, "wb") as f:
     pickle.dump(pipeline, f)
 logging.info(f"Pipeline model saved at {MODEL_FILE}")
+
+# ========== Export Pickle-Free Model ==========
+export_model(pipeline, EXPORT_FILE, metadata={"calibration": calibration} if calibration else None)
@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.metrics import accuracy_score
+from feature_store import VECTORIZER_PARAMS
+from prepared_data import DATA_PATH, BALANCE_STRATEGIES, prepare_dataset, sample_weights
+
+# ========== Logging ==========
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[logging.FileHandler("benchmark_balancing.log"), logging.StreamHandler()]
+)
+logging.info("Benchmarking class balancing strategies...")
+
+RESULTS_FILE = os.path.join("artifacts", "balancing_benchmark.json")
+
+
+def benchmark(balance, data_path=DATA_PATH):
+    """Prepares, vectorizes and fits one strategy from scratch; returns memory, time and accuracy figures."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    train, test = prepare_dataset(data_path, balance=balance)
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    X_train = vectorizer.fit_transform(train["review_body"])
+    X_test = vectorizer.transform(test["review_body"])
+    prepare_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    nb = MultinomialNB()
+    nb.fit(X_train, train["label"], sample_weight=sample_weights(train["label"], balance))
+    fit_seconds = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Both strategies are scored as class-balanced accuracy, so the numbers are comparable
+    y_pred = nb.predict(X_test)
+    return {
+        "train_rows": X_train.shape[0],
+        "train_matrix_mb": round((X_train.data.nbytes + X_train.indices.nbytes + X_train.indptr.nbytes) / 2**20, 2),
+        "peak_memory_mb": round(peak_bytes / 2**20, 2),
+        "prepare_seconds": round(prepare_seconds, 3),
+        "fit_seconds": round(fit_seconds, 3),
+        "balanced_accuracy": round(accuracy_score(test["label"], y_pred, sample_weight=sample_weights(test["label"], "weights")), 4),
+    }
+
+
+results = {balance: benchmark(balance) for balance in BALANCE_STRATEGIES}
+for balance, result in results.items():
+    logging.info(f"{balance}: {result}")
+
+os.makedirs("artifacts", exist_ok=True)
+with open(RESULTS_FILE, "w") as f:
+    json.dump(results, f, indent=2)
+logging.info(f"Benchmark results saved at {RESULTS_FILE}")
@@ -0,0 +1,54 @@
+import logging
+import os
+import sys
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_predict
+from sklearn.naive_bayes import MultinomialNB
+
+# Applying a calibration is owned by the serving code, so training, validation and every serving
+# path run the exact same transform
+SERVING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Model_Deployment_Pipeline")
+if SERVING_DIR not in sys.path:
+    sys.path.append(SERVING_DIR)
+from model_format import stored_calibration, with_calibration
+
+# "none", "sigmoid" or "isotonic"; applied to every served probability, whatever the model format
+CALIBRATION_METHOD = os.environ.get("CALIBRATION", "none")
+CALIBRATION_FOLDS = 5
+
+
+def fit_calibration(X, y, method=CALIBRATION_METHOD, sample_weight=None, alpha=1.0, cv=CALIBRATION_FOLDS):
+    """Fits one-vs-rest probability calibrators on out-of-fold Naive Bayes probabilities.
+
+    Returns a JSON-serializable spec, or None when calibration is disabled. It is stored in the
+    exported model's metadata and as the pickled pipeline's `calibration_`. The deployed model
+    itself is still trained on all of X.
+    """
+    if method == "none":
+        return None
+    if method not in ("sigmoid", "isotonic"):
+        raise ValueError(f"Unknown calibration method: {method}")
+
+    y = np.asarray(y)
+    params = None if sample_weight is None else {"sample_weight": sample_weight}
+    proba = cross_val_predict(MultinomialNB(alpha=alpha), X, y, cv=cv, method="predict_proba", params=params)
+    classes = np.unique(y)
+
+    spec = {"method": method, "classes": classes.tolist()}
+    if method == "sigmoid":
+        spec["coef"], spec["intercept"] = [], []
+        for k, label in enumerate(classes):
+            platt = LogisticRegression(C=1e6).fit(proba[:, [k]], y == label, sample_weight=sample_weight)
+            spec["coef"].append(float(platt.coef_[0, 0]))
+            spec["intercept"].append(float(platt.intercept_[0]))
+    else:
+        spec["x"], spec["y"] = [], []
+        for k, label in enumerate(classes):
+            isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+            isotonic.fit(proba[:, k], y == label, sample_weight=sample_weight)
+            spec["x"].append(isotonic.X_thresholds_.tolist())
+            spec["y"].append(isotonic.y_thresholds_.tolist())
+    logging.info(f"Fitted {method} calibration on {len(y)} out-of-fold predictions")
+    return spec
@@ -0,0 +1,203 @@
+import itertools
+import logging
+import math
+import time
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.model_selection import StratifiedKFold
+from parallel_tfidf import select_features
+
+ALPHA_BLOCK_SIZE = 64  # Alphas scored per matrix product; bounds the (alphas x classes x features) buffer
+
+
+class FoldCounts:
+    """Term counts of one CV fold, fitted on the fold's training rows only.
+
+    Counting uses the widest n-gram range of the grid; every candidate vectorizer is a column
+    subset of these counts, so no candidate re-tokenizes the reviews.
+    """
+
+    def __init__(self, texts, labels, sample_weight, train_idx, val_idx, max_ngram, stop_words):
+        counter = CountVectorizer(ngram_range=(1, max_ngram), stop_words=stop_words)
+        self.X_train = counter.fit_transform([texts[i] for i in train_idx])
+        self.X_val = counter.transform([texts[i] for i in val_idx])
+        self.y_train, self.y_val = labels[train_idx], labels[val_idx]
+        self.w_train = None if sample_weight is None else sample_weight[train_idx]
+        self.w_val = None if sample_weight is None else sample_weight[val_idx]
+
+        terms = counter.get_feature_names_out()
+        self.ngram_order = np.fromiter((term.count(" ") + 1 for term in terms), dtype=np.int64, count=len(terms))
+        self.doc_freq = np.bincount(self.X_train.indices, minlength=len(terms)).astype(np.int64)
+        self.term_freq = np.asarray(self.X_train.sum(axis=0), dtype=np.int64).ravel()
+
+    def columns(self, max_features, ngram_range):
+        """Columns a TfidfVectorizer(max_features, ngram_range) fitted on this fold would keep."""
+        min_n, max_n = ngram_range
+        in_range = np.where((self.ngram_order >= min_n) & (self.ngram_order <= max_n))[0]
+        kept = select_features(self.doc_freq[in_range], self.term_freq[in_range], self.X_train.shape[0],
+                               max_features=max_features)
+        return in_range[kept]
+
+    def tfidf(self, max_features, ngram_range):
+        """(train, validation) TF-IDF matrices for one vectorizer configuration."""
+        columns = self.columns(max_features, ngram_range)
+        transformer = TfidfTransformer().fit(self.X_train[:, columns])
+        return transformer.transform(self.X_train[:, columns]), transformer.transform(self.X_val[:, columns])
+
+
+def build_folds(texts, labels, sample_weight=None, n_splits=5, max_ngram=1, stop_words="english", random_state=42):
+    texts = list(texts)
+    labels = np.asarray(labels)
+    sample_weight = None if sample_weight is None else np.asarray(sample_weight)
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return [
+        FoldCounts(texts, labels, sample_weight, train_idx, val_idx, max_ngram, stop_words)
+        for train_idx, val_idx in splitter.split(np.zeros(len(labels)), labels)
+    ]
+
+
+def naive_bayes_counts(X, y, sample_weight=None):
+    """Sufficient statistics of MultinomialNB: (classes, per-class feature counts, class counts)."""
+    classes, y_index = np.unique(y, return_inverse=True)
+    weight = np.ones(len(y_index)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    Y = np.zeros((len(y_index), len(classes)))
+    Y[np.arange(len(y_index)), y_index] = weight
+    feature_count = np.asarray((X.T @ Y).T)
+    return classes, feature_count, Y.sum(axis=0)
+
+
+def alpha_sweep(X_train, y_train, X_val, y_val, alphas, w_train=None, w_val=None, block_size=ALPHA_BLOCK_SIZE):
+    """Validation accuracy of MultinomialNB for every alpha, from one pass of count statistics.
+
+    Only the smoothed log-probabilities depend on alpha:
+        jll = X @ log(fc + a).T - rowsum(X) * log(fc.sum(1) + a * n_features) + class_log_prior
+    so all alphas are scored with one matrix product per block instead of one fit per alpha.
+    """
+    classes, feature_count, class_count = naive_bayes_counts(X_train, y_train, w_train)
+    class_log_prior = np.log(class_count) - np.log(class_count.sum())
+    n_features = feature_count.shape[1]
+    row_sums = np.asarray(X_val.sum(axis=1)).ravel()
+    y_val = np.asarray(y_val)
+    w_val = np.ones(len(y_val)) if w_val is None else np.asarray(w_val, dtype=np.float64)
+
+    alphas = np.asarray(alphas, dtype=np.float64)
+    scores = np.empty(len(alphas))
+    for start in range(0, len(alphas), block_size):
+        block = alphas[start:start + block_size]
+        log_counts = np.log(feature_count[None, :, :] + block[:, None, None])  # (alphas, classes, features)
+        log_totals = np.log(feature_count.sum(axis=1)[None, :] + block[:, None] * n_features)
+        jll = np.asarray(X_val @ log_counts.reshape(-1, n_features).T).reshape(len(y_val), len(block), len(classes))
+        jll -= row_sums[:, None, None] * log_totals[None, :, :]
+        jll += class_log_prior
+        correct = classes[jll.argmax(axis=2)] == y_val[:, None]
+        scores[start:start + len(block)] = (w_val[:, None] * correct).sum(axis=0) / w_val.sum()
+    return scores
+
+
+def cv_alpha_sweep(X, y, alphas, sample_weight=None, n_splits=5):
+    """Mean CV accuracy per alpha on fixed features, using the same folds as GridSearchCV(cv=n_splits)."""
+    y = np.asarray(y)
+    sample_weight = None if sample_weight is None else np.asarray(sample_weight)
+    fold_scores = []
+    for train_idx, val_idx in StratifiedKFold(n_splits=n_splits).split(np.zeros(len(y)), y):
+        fold_scores.append(alpha_sweep(
+            X[train_idx], y[train_idx], X[val_idx], y[val_idx], alphas,
+            None if sample_weight is None else sample_weight[train_idx],
+            None if sample_weight is None else sample_weight[val_idx],
+        ))
+    return np.mean(fold_scores, axis=0)
+
+
+def halving_schedule(n_candidates, n_rows, factor=3):
+    """Successive-halving rounds as (training rows per fold, candidates kept for the round)."""
+    n_rounds = max(1, math.ceil(math.log(n_candidates, factor))) if n_candidates > 1 else 1
+    schedule, keep = [], n_candidates
+    for round_index in range(n_rounds):
+        rows = max(1, n_rows // factor ** (n_rounds - 1 - round_index))
+        schedule.append((rows, keep))
+        keep = max(1, math.ceil(keep / factor))
+    return schedule
+
+
+def evaluate_candidates(folds, candidates, n_rows=None):
+    """Mean validation accuracy and wall time of each candidate over the folds.
+
+    Candidates sharing a vectorizer configuration share its TF-IDF matrices and one alpha sweep;
+    that time is split evenly between them. `n_rows` limits the training rows used to fit the model;
+    None fits on every training row of each fold, as GridSearchCV would.
+    """
+    scores = {index: [] for index in range(len(candidates))}
+    seconds = {index: 0.0 for index in range(len(candidates))}
+
+    def vectorizer_config(index):
+        return candidates[index]["max_features"] or 0, candidates[index]["ngram_range"]
+
+    for config, group in itertools.groupby(sorted(scores, key=vectorizer_config), key=vectorizer_config):
+        group = list(group)
+        max_features, ngram_range = candidates[group[0]]["max_features"], tuple(config[1])
+        for fold in folds:
+            start = time.perf_counter()
+            X_train, X_val = fold.tfidf(max_features, ngram_range)
+            shared = (time.perf_counter() - start) / len(group)
+
+            # One closed-form sweep scores every alpha of this vectorizer configuration
+            start = time.perf_counter()
+            rows = slice(None) if n_rows is None else slice(0, n_rows)
+            fold_scores = alpha_sweep(
+                X_train[rows], fold.y_train[rows], X_val, fold.y_val,
+                [candidates[index]["alpha"] for index in group],
+                None if fold.w_train is None else fold.w_train[rows], fold.w_val,
+            )
+            shared += (time.perf_counter() - start) / len(group)
+            for index, score in zip(group, fold_scores):
+                scores[index].append(score)
+                seconds[index] += shared
+
+    return {index: float(np.mean(scores[index])) for index in scores}, seconds
+
+
+def search(texts, labels, vectorizer_grid, alphas, sample_weight=None, n_splits=5, stop_words="english",
+           halving=False, factor=3, random_state=42):
+    """Cross-validated search over vectorizer parameters and alpha, vectorizing each fold once.
+
+    Returns (best candidate, results), where every result records the candidate, its score in
+    the last round it took part in, the training rows per fold it was scored on (None for every
+    row of each fold, i.e. without halving) and its total wall time.
+    """
+    candidates = [
+        {"max_features": max_features, "ngram_range": tuple(ngram_range), "alpha": alpha}
+        for max_features, ngram_range, alpha in itertools.product(
+            vectorizer_grid["max_features"], vectorizer_grid["ngram_range"], alphas
+        )
+    ]
+    max_ngram = max(ngram_range[1] for ngram_range in vectorizer_grid["ngram_range"])
+
+    start = time.perf_counter()
+    folds = build_folds(texts, labels, sample_weight, n_splits, max_ngram, stop_words, random_state)
+    logging.info(f"Vectorized {n_splits} folds in {time.perf_counter() - start:.1f}s")
+
+    if halving:
+        # Every fold trains on the same number of rows in a round, so rounds compare like with like
+        schedule = halving_schedule(len(candidates), min(fold.X_train.shape[0] for fold in folds), factor)
+    else:
+        schedule = [(None, len(candidates))]
+    results = [dict(candidate, score=None, rows=0, seconds=0.0) for candidate in candidates]
+    alive = list(range(len(candidates)))
+
+    for round_index, (rows, keep) in enumerate(schedule):
+        alive = sorted(alive, key=lambda i: -results[i]["score"])[:keep] if round_index else alive
+        scores, seconds = evaluate_candidates(folds, [candidates[i] for i in alive], rows)
+        for position, index in enumerate(alive):
+            results[index].update(score=scores[position], rows=rows)
+            results[index]["seconds"] += seconds[position]
+        logging.info(
+            f"Round {round_index + 1}/{len(schedule)}: {len(alive)} candidates on {rows or 'all'} rows per fold"
+        )
+
+    best = max(alive, key=lambda i: results[i]["score"])
+    for result in sorted(results, key=lambda r: (-(r["rows"] or math.inf), -r["score"])):
+        logging.info(
+            f"max_features={result['max_features']} ngram_range={result['ngram_range']} alpha={result['alpha']}: "
+            f"accuracy={result['score']:.4f} rows={result['rows'] or 'all'} time={result['seconds']:.2f}s"
+        )
+    return candidates[best], results
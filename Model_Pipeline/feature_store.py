@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from calibration import stored_calibration, with_calibration
+from parallel_tfidf import parallel_fit_transform, parallel_transform
+from prepared_data import DATA_PATH, TEST_SIZE, RANDOM_STATE, BALANCE_STRATEGY, dataset_key, load_prepared_dataset
+
+# ========== Config ==========
+FEATURE_DIR = os.path.join("Data", "features")
+VECTORIZER_PARAMS = {"max_features": 5000, "stop_words": "english"}
+VECTORIZER_FILE = "vectorizer.pkl"
+TFIDF_N_JOBS = int(os.environ.get("TFIDF_N_JOBS", "1"))  # >1 shards vectorization over processes, 0 = all cores
+
+
+def vectorizer_fingerprint(vectorizer):
+    """Hash of every vectorizer parameter, so stores built with different settings never collide."""
+    params = json.dumps(vectorizer.get_params(), sort_keys=True, default=str)
+    return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+
+def feature_key(vectorizer, data_path=DATA_PATH, test_size=TEST_SIZE, random_state=RANDOM_STATE,
+                balance=BALANCE_STRATEGY):
+    return f"{dataset_key(data_path, test_size, random_state, balance)}-{vectorizer_fingerprint(vectorizer)}"
+
+
+def save_csr(directory, name, matrix):
+    """Stores a CSR matrix as plain .npy arrays, which (unlike .npz) can be memory-mapped on load."""
+    matrix = sparse.csr_matrix(matrix)
+    np.save(os.path.join(directory, f"{name}.data.npy"), matrix.data)
+    np.save(os.path.join(directory, f"{name}.indices.npy"), matrix.indices)
+    np.save(os.path.join(directory, f"{name}.indptr.npy"), matrix.indptr)
+    np.save(os.path.join(directory, f"{name}.shape.npy"), np.array(matrix.shape, dtype=np.int64))
+
+
+def load_csr(directory, name, mmap_mode="r"):
+    def part(suffix):
+        return np.load(os.path.join(directory, f"{name}.{suffix}.npy"), mmap_mode=mmap_mode)
+
+    shape = tuple(int(n) for n in np.load(os.path.join(directory, f"{name}.shape.npy")))
+    return sparse.csr_matrix((part("data"), part("indices"), part("indptr")), shape=shape, copy=False)
+
+
+def load_features(data_path=DATA_PATH, vectorizer_params=VECTORIZER_PARAMS, test_size=TEST_SIZE,
+                  random_state=RANDOM_STATE, cache_dir=FEATURE_DIR, n_jobs=TFIDF_N_JOBS,
+                  balance=BALANCE_STRATEGY):
+    """Returns (vectorizer, X_train, X_test, y_train, y_test) with TF-IDF CSR matrices.
+
+    The vectorizer is fitted on the prepared train split once per dataset and parameter set;
+    later calls load the fitted vectorizer and memory-map the stored matrices instead of re-tokenizing.
+    """
+    vectorizer = TfidfVectorizer(**vectorizer_params)
+    cached_dir = os.path.join(cache_dir, feature_key(vectorizer, data_path, test_size, random_state, balance))
+
+    if not os.path.isdir(cached_dir):
+        X_train_text, X_test_text, y_train, y_test = load_prepared_dataset(
+            data_path, test_size, random_state, balance=balance
+        )
+        logging.info(f"Fitting TF-IDF features with {vectorizer_params}...")
+        if n_jobs == 1:
+            X_train = vectorizer.fit_transform(X_train_text)
+            X_test = vectorizer.transform(X_test_text)
+        else:
+            X_train = parallel_fit_transform(vectorizer, X_train_text, n_jobs or None)
+            X_test = parallel_transform(vectorizer, X_test_text, n_jobs or None)
+
+        # Write into a temp dir and rename it, so readers never see a half-written store entry
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=cache_dir)
+        with open(os.path.join(temp_dir, VECTORIZER_FILE), "wb") as f:
+            pickle.dump(vectorizer, f)
+        save_csr(temp_dir, "X_train", X_train)
+        save_csr(temp_dir, "X_test", X_test)
+        np.save(os.path.join(temp_dir, "y_train.npy"), y_train.to_numpy())
+        np.save(os.path.join(temp_dir, "y_test.npy"), y_test.to_numpy())
+        try:
+            os.rename(temp_dir, cached_dir)
+            logging.info(f"TF-IDF features cached at {cached_dir}")
+        except OSError:
+            shutil.rmtree(temp_dir)  # Another process cached the same features first
+        return vectorizer, X_train, X_test, y_train.to_numpy(), y_test.to_numpy()
+
+    logging.info(f"Loading TF-IDF features from cache: {cached_dir}")
+    with open(os.path.join(cached_dir, VECTORIZER_FILE), "rb") as f:
+        vectorizer = pickle.load(f)
+    return (
+        vectorizer,
+        load_csr(cached_dir, "X_train"),
+        load_csr(cached_dir, "X_test"),
+        np.load(os.path.join(cached_dir, "y_train.npy")),
+        np.load(os.path.join(cached_dir, "y_test.npy")),
+    )
+
+
+def load_cached_test_features(vectorizer, data_path=DATA_PATH, test_size=TEST_SIZE,
+                              random_state=RANDOM_STATE, cache_dir=FEATURE_DIR, balance=BALANCE_STRATEGY):
+    """Returns the stored test matrix if it was produced by an identical fitted vectorizer, else None."""
+    cached_dir = os.path.join(cache_dir, feature_key(vectorizer, data_path, test_size, random_state, balance))
+    if not os.path.isdir(cached_dir):
+        return None
+
+    with open(os.path.join(cached_dir, VECTORIZER_FILE), "rb") as f:
+        cached = pickle.load(f)
+    if cached.vocabulary_ != vectorizer.vocabulary_ or not np.array_equal(cached.idf_, vectorizer.idf_):
+        return None
+    return load_csr(cached_dir, "X_test")
+
+
+def predict_test_split(model_pipeline, X_test, data_path=DATA_PATH):
+    """Predicts the prepared test split, skipping tokenization when its TF-IDF matrix is already stored.
+
+    Labels follow the calibration saved with the pipeline, as in serving.
+    """
+    calibration = stored_calibration(model_pipeline)
+    steps = getattr(model_pipeline, "named_steps", {})
+    if "tfidf" in steps and "nb" in steps:
+        X_test_features = load_cached_test_features(steps["tfidf"], data_path)
+        if X_test_features is not None and X_test_features.shape[0] == len(X_test):
+            logging.info("Using cached TF-IDF test features.")
+            return with_calibration(steps["nb"], calibration).predict(X_test_features)
+    return with_calibration(model_pipeline, calibration).predict(X_test)
@@ -1,10 +1,13 @@
-import pandas as pd
 import logging
 import os
+import json
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+import numpy as np
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import GridSearchCV
+from feature_store import VECTORIZER_PARAMS, load_features
+from prepared_data import BALANCE_STRATEGY, load_prepared_dataset, sample_weights
+import cv_search
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,48 +16,53 @@ logging.basicConfig(
 )
 logging.info("Starting Hyperparameter Tuning...")
 
-# Load dataset
-data_path = os.path.join("Data", "Data.csv")
-df = pd.read_csv(data_path)
-
-def map_sentiment(rating):
-    if rating <= 2:
-        return "Negative"
-    elif rating == 3:
-        return "Neutral"
-    else:
-        return "Positive"
-
-df["label"] = df["star_rating"].apply(map_sentiment)
-df = df.dropna(subset=["review_body"])
-df["review_body"] = df["review_body"].astype(str)
-label_mapping = {"Negative": 0, "Neutral": 1, "Positive": 2}
-df["label"] = df["label"].map(label_mapping)
-
-# Balance the dataset
-positive = df[df["label"] == 2]
-negative = df[df["label"] == 0]
-neutral = df[df["label"] == 1]
-negative_upsampled = negative.sample(len(positive), replace=True, random_state=42)
-neutral_upsampled = neutral.sample(len(positive), replace=True, random_state=42)
-balanced_df = pd.concat([positive, negative_upsampled, neutral_upsampled]).sample(frac=1, random_state=42)
-
-X_train, _, y_train, _ = train_test_split(
-    balanced_df["review_body"], balanced_df["label"], test_size=0.2, random_state=42
-)
-
-vectorizer = TfidfVectorizer(max_features=5000, stop_words="english")
-X_train_tfidf = vectorizer.fit_transform(X_train)
+# "grid": alpha only, on the shared TF-IDF features
+# "cached": vectorizer parameters + alpha, vectorizing each CV fold once
+# "halving": like "cached", with successive halving over training rows
+# "alpha_sweep": a dense alpha grid on the shared TF-IDF features, scored in closed form
+TUNING_MODE = os.environ.get("TUNING_MODE", "grid")
+DATA_PATH = os.path.join("Data", "Data.csv")
 
 param_grid = {'alpha': [0.1, 0.5, 1.0, 2.0]}
-model = MultinomialNB()
+vectorizer_grid = {'max_features': [2000, 5000, 10000], 'ngram_range': [(1, 1), (1, 2)]}
+alpha_sweep_grid = np.logspace(-3, 1, 200)
 
-grid_search = GridSearchCV(model, param_grid, cv=5, scoring='accuracy', n_jobs=-1)
-grid_search.fit(X_train_tfidf, y_train)
+os.makedirs("artifacts", exist_ok=True)
 
-logging.info(f"Best Parameters: {grid_search.best_params_}")
-logging.info(f"Best CV Accuracy: {grid_search.best_score_:.4f}")
+if TUNING_MODE in ("cached", "halving"):
+    X_train, _, y_train, _ = load_prepared_dataset(DATA_PATH)
+    best_params, results = cv_search.search(
+        X_train, y_train, vectorizer_grid, param_grid['alpha'],
+        sample_weight=sample_weights(y_train),
+        stop_words=VECTORIZER_PARAMS["stop_words"],
+        halving=TUNING_MODE == "halving",
+    )
+    best_score = next(r["score"] for r in results if all(r[k] == v for k, v in best_params.items()))
+
+    with open(os.path.join("artifacts", "cv_search_results.json"), "w") as f:
+        json.dump(results, f, indent=2)
+elif TUNING_MODE == "alpha_sweep":
+    _, X_train_tfidf, _, y_train, _ = load_features(DATA_PATH, VECTORIZER_PARAMS)
+    scores = cv_search.cv_alpha_sweep(X_train_tfidf, y_train, alpha_sweep_grid, sample_weights(y_train))
+    best_params = {'alpha': float(alpha_sweep_grid[scores.argmax()])}
+    best_score = scores.max()
+
+    with open(os.path.join("artifacts", "alpha_sweep.json"), "w") as f:
+        json.dump({"alpha": alpha_sweep_grid.tolist(), "accuracy": scores.tolist()}, f)
+else:
+    # Reuse the TF-IDF train features shared with training
+    _, X_train_tfidf, _, y_train, _ = load_features(DATA_PATH, VECTORIZER_PARAMS)
+
+    model = MultinomialNB()
+
+    # Balanced accuracy is accuracy under per-class weights, matching BALANCE_STRATEGY=weights
+    scoring = 'balanced_accuracy' if BALANCE_STRATEGY == "weights" else 'accuracy'
+    grid_search = GridSearchCV(model, param_grid, cv=5, scoring=scoring, n_jobs=-1)
+    grid_search.fit(X_train_tfidf, y_train, sample_weight=sample_weights(y_train))
+    best_params, best_score = grid_search.best_params_, grid_search.best_score_
+
+logging.info(f"Best Parameters: {best_params}")
+logging.info(f"Best CV Accuracy: {best_score:.4f}")
 
-os.makedirs("artifacts", exist_ok=True)
 with open(os.path.join("artifacts", "best_params.txt"), "w") as f:
-    f.write(str(grid_search.best_params_))
+    f.write(str(best_params))
@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+import struct
+import tempfile
+import numpy as np
+
+# ========== Format ==========
+# Layout (read by Model_Deployment_Pipeline/model_format.py):
+#   MAGIC | uint32 header length | JSON header | zero padding | arrays, each 64-byte aligned
+# Array offsets in the header are relative to the first aligned byte after the header, so the
+# serving side can np.memmap the file and share the pages between worker processes.
+MAGIC = b"NBMODEL\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+EXPORT_SUFFIX = ".nbm"
+
+# Vectorizer settings that change how text is turned into features at prediction time
+_VECTORIZER_KEYS = ("lowercase", "strip_accents", "token_pattern", "ngram_range", "binary", "norm",
+                    "use_idf", "sublinear_tf")
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def vectorizer_spec(vectorizer):
+    """Transform-time settings of a fitted TfidfVectorizer, with stop words resolved to an explicit list."""
+    params = vectorizer.get_params()
+    if params["analyzer"] != "word" or params["preprocessor"] is not None or params["tokenizer"] is not None:
+        raise ValueError("Only word analyzers without custom preprocessors or tokenizers can be exported")
+    if callable(params["strip_accents"]):
+        raise ValueError("Custom strip_accents functions cannot be exported")
+    if not params["use_idf"]:
+        raise ValueError("Only idf-weighted vectorizers (use_idf=True) can be exported")
+
+    spec = {key: params[key] for key in _VECTORIZER_KEYS}
+    spec["ngram_range"] = list(spec["ngram_range"])
+    stop_words = vectorizer.get_stop_words()
+    spec["stop_words"] = sorted(stop_words) if stop_words else None
+    return spec
+
+
+def export_model(pipeline, path, metadata=None):
+    """Writes a fitted tfidf + MultinomialNB pipeline as a pickle-free, memory-mappable model file."""
+    vectorizer, nb = pipeline.named_steps["tfidf"], pipeline.named_steps["nb"]
+    spec = vectorizer_spec(vectorizer)
+
+    # Terms in feature-index order (alphabetical for a learned vocabulary) as one UTF-8 string table,
+    # each term followed by "\n"; term i is term_bytes[term_offsets[i]:term_offsets[i + 1] - 1]
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    if any("\n" in term for term in terms):
+        raise ValueError("Vocabulary terms containing newlines cannot be exported")
+    encoded = [term.encode("utf-8") + b"\n" for term in terms]
+    term_offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    term_offsets[1:] = np.cumsum([len(term) for term in encoded])
+
+    arrays = {
+        "term_offsets": term_offsets,
+        "term_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "feature_log_prob": np.ascontiguousarray(nb.feature_log_prob_, dtype="<f4"),
+        "class_log_prior": np.ascontiguousarray(nb.class_log_prior_, dtype="<f4"),
+        "idf": np.ascontiguousarray(vectorizer.idf_, dtype="<f4"),
+    }
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        "format_version": FORMAT_VERSION,
+        "vectorizer": spec,
+        "classes": [int(c) for c in nb.classes_],
+        "n_features": len(terms),
+        "arrays": layout,
+        "metadata": metadata or {},
+    }).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+    # Write to a temp file and rename, so a crash never leaves a truncated model behind
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=EXPORT_SUFFIX + ".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(temp_path, path)
+    logging.info(f"Exported model to {path} ({os.path.getsize(path) / 2**20:.2f} MB)")
+    return path
@@ -0,0 +1,98 @@
+import argparse
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from google.cloud import storage
+from google.api_core.exceptions import NotFound
+
+# ====================== Manifest CONFIG ======================
+BUCKET_NAME = "mlops_dataset123"
+GCS_MODEL_FOLDER = "models/"
+MANIFEST_BLOB = "models/LATEST.json"
+VERSION_PATTERN = re.compile(r"sentiment_analyzer_model_v(\d+)\.pkl$")
+
+
+def build_manifest(version, blob_name, md5_hash, metrics=None, created=None, export_blob=None):
+    """Manifest describing the latest published model version.
+
+    `export_blob` is the pickle-free (.nbm) copy of the model, which serving prefers when present.
+    """
+    manifest = {
+        "version": int(version),
+        "blob": blob_name,
+        "md5_hash": md5_hash,
+        "metrics": metrics or {},
+        "created": created or datetime.now(timezone.utc).isoformat(),
+    }
+    if export_blob is not None:
+        manifest["export"] = {"blob": export_blob.name, "md5_hash": export_blob.md5_hash}
+    return manifest
+
+
+def read_manifest(bucket, manifest_blob=MANIFEST_BLOB):
+    """Returns (manifest, generation) or (None, 0) when no manifest has been published yet."""
+    blob = bucket.blob(manifest_blob)
+    try:
+        manifest = json.loads(blob.download_as_text())
+    except NotFound:
+        return None, 0
+    return manifest, blob.generation
+
+
+def write_manifest(bucket, manifest, manifest_blob=MANIFEST_BLOB, if_generation_match=None):
+    """Publishes the manifest in a single object write, so readers see either the old or the new one.
+
+    Pass the generation returned by `read_manifest` to fail instead of overwriting a manifest
+    another publisher wrote in the meantime (0 means "only if it does not exist yet").
+    """
+    blob = bucket.blob(manifest_blob)
+    blob.cache_control = "no-cache"
+    blob.upload_from_string(
+        json.dumps(manifest, indent=2),
+        content_type="application/json",
+        if_generation_match=if_generation_match,
+    )
+    logging.info(f"Published manifest gs://{bucket.name}/{manifest_blob} -> v{manifest['version']}")
+
+
+def scan_latest_version(bucket, prefix=GCS_MODEL_FOLDER):
+    """Fallback O(n) scan of every model blob; returns (version, blob) or (0, None)."""
+    latest_version, latest_blob = 0, None
+    for blob in bucket.list_blobs(prefix=prefix):
+        match = VERSION_PATTERN.search(blob.name)
+        if match and int(match.group(1)) > latest_version:
+            latest_version, latest_blob = int(match.group(1)), blob
+    return latest_version, latest_blob
+
+
+def repair_manifest(bucket_name=BUCKET_NAME, prefix=GCS_MODEL_FOLDER):
+    """Rebuilds LATEST.json from a full listing of the model folder."""
+    bucket = storage.Client().bucket(bucket_name)
+    version, blob = scan_latest_version(bucket, prefix)
+    if blob is None:
+        raise FileNotFoundError(f"No versioned models found in gs://{bucket_name}/{prefix}")
+
+    previous, _ = read_manifest(bucket)
+    metrics = previous.get("metrics", {}) if previous and previous.get("version") == version else {}
+    created = blob.time_created.isoformat() if blob.time_created else None
+    export_blob = bucket.get_blob(blob.name[:-len(".pkl")] + ".nbm")
+    manifest = build_manifest(version, blob.name, blob.md5_hash, metrics=metrics, created=created,
+                              export_blob=export_blob)
+    write_manifest(bucket, manifest)
+    return manifest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Manage the models/LATEST.json manifest.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    repair = subparsers.add_parser("repair", help="Rebuild the manifest from a listing of the model folder")
+    repair.add_argument("--bucket", default=BUCKET_NAME)
+    repair.add_argument("--prefix", default=GCS_MODEL_FOLDER)
+    args = parser.parse_args()
+
+    if args.command == "repair":
+        manifest = repair_manifest(args.bucket, args.prefix)
+        logging.info(f"Manifest repaired: {json.dumps(manifest)}")
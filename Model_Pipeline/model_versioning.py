@@ -1,8 +1,10 @@
 import os
+import json
 import logging
 import shutil
-import re
 from google.cloud import storage
+from google.api_core.exceptions import PreconditionFailed
+from model_manifest import build_manifest, read_manifest, write_manifest, scan_latest_version
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,25 +18,22 @@ logging.info("Starting Model Versioning...")
 BUCKET_NAME = "mlops_dataset123"
 GCS_MODEL_FOLDER = "models/"
 LOCAL_MODEL_PATH = "models/sentiment_analyzer_model.pkl"
+LOCAL_EXPORT_PATH = "models/sentiment_analyzer_model.nbm"
+LOCAL_METRICS_PATH = "models/metrics.json"
 
 # ====================== GCS Setup ======================
 client = storage.Client()
 bucket = client.bucket(BUCKET_NAME)
 
-# List existing model versions in GCS
-blobs = list(bucket.list_blobs(prefix=GCS_MODEL_FOLDER))
-
-# Extract version numbers from filenames
-version_pattern = re.compile(r"sentiment_analyzer_model_v(\d+)\.pkl")
-existing_versions = []
-
-for blob in blobs:
-    match = version_pattern.search(blob.name)
-    if match:
-        existing_versions.append(int(match.group(1)))
+# Read the current version from the manifest (O(1)); scan the folder only if it is missing
+manifest, manifest_generation = read_manifest(bucket)
+if manifest is not None:
+    current_version = int(manifest["version"])
+else:
+    logging.warning("No model manifest found, scanning existing model versions...")
+    current_version, _ = scan_latest_version(bucket, GCS_MODEL_FOLDER)
 
 # Determine next version
-current_version = max(existing_versions) if existing_versions else 0
 new_version = current_version + 1
 
 # Create new versioned filename
@@ -50,6 +49,32 @@ blob = bucket.blob(os.path.join(GCS_MODEL_FOLDER, versioned_filename))
 blob.upload_from_filename(versioned_local_path)
 logging.info(f"Uploaded {versioned_filename} to GCS: gs://{BUCKET_NAME}/{GCS_MODEL_FOLDER}{versioned_filename}")
 
+# Upload the pickle-free export alongside it, under the same version
+export_blob = None
+if os.path.exists(LOCAL_EXPORT_PATH):
+    export_filename = f"sentiment_analyzer_model_v{new_version}.nbm"
+    export_blob = bucket.blob(os.path.join(GCS_MODEL_FOLDER, export_filename))
+    export_blob.upload_from_filename(LOCAL_EXPORT_PATH)
+    logging.info(f"Uploaded {export_filename} to GCS: gs://{BUCKET_NAME}/{GCS_MODEL_FOLDER}{export_filename}")
+else:
+    logging.warning(f"No exported model at {LOCAL_EXPORT_PATH}, serving will fall back to the pickle")
+
+# Publish the manifest last, so readers only ever see fully uploaded versions
+metrics = {}
+if os.path.exists(LOCAL_METRICS_PATH):
+    with open(LOCAL_METRICS_PATH, "r") as f:
+        metrics = json.load(f)
+
+try:
+    write_manifest(
+        bucket,
+        build_manifest(new_version, blob.name, blob.md5_hash, metrics=metrics, export_blob=export_blob),
+        if_generation_match=manifest_generation,
+    )
+except PreconditionFailed:
+    logging.error("Model manifest was updated by another run; run `python model_manifest.py repair`.")
+    raise
+
 # Update version tracker (optional)
 version_file = os.path.join("ML_OPS_Sentiment_Analyser", "models", "model_version.txt")
 with open(version_file, "w") as f:
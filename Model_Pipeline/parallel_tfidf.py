@@ -0,0 +1,144 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Integral
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+# Parameters that only affect vocabulary pruning or idf weighting, applied once after merging shards
+_MERGE_ONLY_PARAMS = ("max_df", "min_df", "max_features", "vocabulary", "norm", "use_idf",
+                      "smooth_idf", "sublinear_tf", "dtype")
+
+
+def shard_documents(documents, n_shards):
+    """Splits documents into at most `n_shards` contiguous, order-preserving shards."""
+    documents = list(documents)
+    bounds = np.linspace(0, len(documents), n_shards + 1).astype(int)
+    return [documents[start:end] for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def term_stats(params, documents):
+    """Vocabulary of one shard with document and term frequencies (terms sorted, as numpy arrays)."""
+    counter = CountVectorizer(**params)
+    try:
+        counts = counter.fit_transform(documents)
+    except ValueError:
+        # Shard contains only stop words / empty documents; other shards may still have terms
+        return np.array([], dtype=object), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), len(documents)
+
+    terms = counter.get_feature_names_out().astype(object)
+    counts = counts.tocsc()
+    doc_freq = np.diff(counts.indptr).astype(np.int64)
+    term_freq = np.asarray(counts.sum(axis=0), dtype=np.int64).ravel()
+    return terms, doc_freq, term_freq, len(documents)
+
+
+def analyzer_params(vectorizer):
+    """Tokenization parameters of `vectorizer`, for counting shards with a plain CountVectorizer."""
+    return {name: value for name, value in vectorizer.get_params().items() if name not in _MERGE_ONLY_PARAMS}
+
+
+def merge_term_stats(shard_stats):
+    """Merges per-shard statistics into global sorted terms, document and term frequencies.
+
+    The merged vocabulary is sorted by term, so the result does not depend on shard order.
+    """
+    all_terms = np.concatenate([stats[0] for stats in shard_stats])
+    terms, inverse = np.unique(all_terms, return_inverse=True)
+    doc_freq = np.bincount(inverse, weights=np.concatenate([stats[1] for stats in shard_stats]),
+                           minlength=len(terms)).astype(np.int64)
+    term_freq = np.bincount(inverse, weights=np.concatenate([stats[2] for stats in shard_stats]),
+                            minlength=len(terms)).astype(np.int64)
+    n_docs = sum(stats[3] for stats in shard_stats)
+    return terms, doc_freq, term_freq, n_docs
+
+
+def select_features(doc_freq, term_freq, n_docs, max_df=1.0, min_df=1, max_features=None):
+    """Indices of the terms CountVectorizer keeps for these max_df / min_df / max_features settings.
+
+    Terms must be in alphabetical order, as CountVectorizer sorts them before limiting.
+    """
+    high = max_df if isinstance(max_df, Integral) else max_df * n_docs
+    low = min_df if isinstance(min_df, Integral) else min_df * n_docs
+    if high < low:
+        raise ValueError("max_df corresponds to < documents than min_df")
+
+    mask = (doc_freq <= high) & (doc_freq >= low)
+    if max_features is not None and mask.sum() > max_features:
+        # Same arg-sort over the same alphabetically ordered frequencies, so ties break identically
+        mask_inds = (-term_freq[mask]).argsort()[:max_features]
+        limited = np.zeros(len(doc_freq), dtype=bool)
+        limited[np.where(mask)[0][mask_inds]] = True
+        mask = limited
+
+    kept = np.where(mask)[0]
+    if len(kept) == 0:
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+    return kept
+
+
+def select_vocabulary(vectorizer, terms, doc_freq, term_freq, n_docs):
+    """Applies max_df / min_df / max_features exactly like CountVectorizer does on a single-process fit.
+
+    Returns (vocabulary dict, kept document frequencies).
+    """
+    kept = select_features(doc_freq, term_freq, n_docs, vectorizer.max_df, vectorizer.min_df,
+                           vectorizer.max_features)
+    vocabulary = {term: index for index, term in enumerate(terms[kept])}
+    return vocabulary, doc_freq[kept]
+
+
+def inverse_document_frequency(doc_freq, n_docs, smooth_idf=True):
+    """idf = ln((1 + n) / (1 + df)) + 1, computed as TfidfTransformer does (float64)."""
+    df = doc_freq.astype(np.float64) + float(smooth_idf)
+    idf = np.full_like(df, fill_value=n_docs + int(smooth_idf), dtype=np.float64)
+    idf /= df
+    np.log(idf, out=idf)
+    idf += 1.0
+    return idf
+
+
+def apply_term_stats(vectorizer, terms, doc_freq, term_freq, n_docs):
+    """Makes `vectorizer` fitted from merged statistics: pruned vocabulary_ plus idf_."""
+    vectorizer.vocabulary_, kept_doc_freq = select_vocabulary(vectorizer, terms, doc_freq, term_freq, n_docs)
+    vectorizer.fixed_vocabulary_ = False
+    vectorizer.idf_ = inverse_document_frequency(kept_doc_freq, n_docs, vectorizer.smooth_idf)
+    return vectorizer
+
+
+def _transform_shard(vectorizer, documents):
+    return vectorizer.transform(documents)
+
+
+def parallel_fit_transform(vectorizer, documents, n_jobs=None, shards_per_job=4):
+    """Fits a TfidfVectorizer over a process pool and returns the TF-IDF matrix of `documents`.
+
+    Each shard is tokenized and counted in its own process; the vocabularies and counts are
+    merged deterministically, so `vectorizer` ends up with the same vocabulary_ and idf_ as a
+    single-process fit, and the returned matrix equals `vectorizer.transform(documents)`.
+    """
+    if vectorizer.vocabulary is not None or not vectorizer.use_idf:
+        raise ValueError("Parallel fitting requires a learned vocabulary and use_idf=True")
+    n_jobs = n_jobs or os.cpu_count() or 1
+    shards = shard_documents(documents, n_jobs * shards_per_job)
+    if not shards:
+        raise ValueError("empty vocabulary; no documents to vectorize")
+    params = analyzer_params(vectorizer)
+
+    logging.info(f"Vectorizing {sum(len(s) for s in shards)} documents in {len(shards)} shards on {n_jobs} processes...")
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        shard_stats = list(pool.map(term_stats, [params] * len(shards), shards))
+        apply_term_stats(vectorizer, *merge_term_stats(shard_stats))
+
+        matrices = list(pool.map(_transform_shard, [vectorizer] * len(shards), shards))
+    return sparse.vstack(matrices, format="csr")
+
+
+def parallel_transform(vectorizer, documents, n_jobs=None, shards_per_job=4):
+    """Transforms `documents` with an already fitted vectorizer over a process pool."""
+    n_jobs = n_jobs or os.cpu_count() or 1
+    shards = shard_documents(documents, n_jobs * shards_per_job)
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        matrices = list(pool.map(_transform_shard, [vectorizer] * len(shards), shards))
+    return sparse.vstack(matrices, format="csr")
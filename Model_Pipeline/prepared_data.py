@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+# ========== Config ==========
+DATA_PATH = os.path.join("Data", "Data.csv")
+CACHE_DIR = os.path.join("Data", "prepared")
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+PREP_VERSION = 1  # Bump when the preparation logic changes, to invalidate existing caches
+# "upsample" duplicates minority-class rows; "weights" keeps every row once and balances with sample weights
+BALANCE_STRATEGY = os.environ.get("BALANCE_STRATEGY", "upsample")
+BALANCE_STRATEGIES = ("upsample", "weights")
+
+label_mapping = {"Negative": 0, "Neutral": 1, "Positive": 2}
+
+
+_sha256_memo = {}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file, memoized per (path, size, mtime) so stages sharing a process hash it once."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _sha256_memo:
+        return _sha256_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    _sha256_memo[memo_key] = digest.hexdigest()
+    return _sha256_memo[memo_key]
+
+
+def map_sentiment_labels(star_rating):
+    """Vectorized rating → label: ≤2 Negative (0), 3 Neutral (1), anything else Positive (2)."""
+    star_rating = np.asarray(star_rating, dtype=np.float64)
+    return np.select(
+        [star_rating <= 2, star_rating == 3],
+        [label_mapping["Negative"], label_mapping["Neutral"]],
+        default=label_mapping["Positive"],
+    ).astype(np.int64)
+
+
+def load_reviews(data_path=DATA_PATH):
+    """Reads the review dump with integer labels, dropping rows without a review body."""
+    df = pd.read_csv(data_path, usecols=["star_rating", "review_body"])
+    df["label"] = map_sentiment_labels(df["star_rating"])
+    df = df.dropna(subset=["review_body"])
+    df["review_body"] = df["review_body"].astype(str)
+    return df
+
+
+def balance_by_upsampling(df, random_state=RANDOM_STATE):
+    """Upsamples the negative and neutral classes to the size of the positive class."""
+    positive = df[df["label"] == 2]
+    negative = df[df["label"] == 0]
+    neutral = df[df["label"] == 1]
+    negative_upsampled = negative.sample(len(positive), replace=True, random_state=random_state)
+    neutral_upsampled = neutral.sample(len(positive), replace=True, random_state=random_state)
+    balanced_df = pd.concat([positive, negative_upsampled, neutral_upsampled])
+    return balanced_df.sample(frac=1, random_state=random_state).reset_index(drop=True)
+
+
+def balanced_class_weights(class_counts):
+    """Per-class sample weights n_largest / n_class, i.e. the weight upsampling to the largest class implies."""
+    largest = max(class_counts.values())
+    return {label: largest / count for label, count in class_counts.items() if count > 0}
+
+
+def class_weights(labels):
+    """Per-row weights that give every class the same total weight (n_largest / n_class)."""
+    labels = np.asarray(labels)
+    values, counts = np.unique(labels, return_counts=True)
+    weights = balanced_class_weights(dict(zip(values.tolist(), counts.tolist())))
+    return np.array([weights[label] for label in labels.tolist()], dtype=np.float64)
+
+
+def sample_weights(labels, balance=BALANCE_STRATEGY):
+    """Sample weights for fitting and scoring under `balance`; None when rows are already upsampled."""
+    return class_weights(labels) if balance == "weights" else None
+
+
+def prepare_dataset(data_path=DATA_PATH, test_size=TEST_SIZE, random_state=RANDOM_STATE,
+                    balance=BALANCE_STRATEGY):
+    """Builds the train/test split shared by every Model_Pipeline script.
+
+    With balance="weights" the split keeps the original class mix; callers balance it with `sample_weights`.
+    """
+    if balance not in BALANCE_STRATEGIES:
+        raise ValueError(f"Unknown balance strategy: {balance}")
+    df = load_reviews(data_path)
+    if balance == "upsample":
+        df = balance_by_upsampling(df, random_state)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["review_body"], df["label"], test_size=test_size, random_state=random_state
+    )
+    train = pd.DataFrame({"review_body": X_train, "label": y_train})
+    test = pd.DataFrame({"review_body": X_test, "label": y_test})
+    return train, test
+
+
+def dataset_key(data_path=DATA_PATH, test_size=TEST_SIZE, random_state=RANDOM_STATE, balance=BALANCE_STRATEGY):
+    """Cache key: input file contents + split parameters + preparation logic version."""
+    params = {
+        "data_sha256": file_sha256(data_path),
+        "test_size": test_size,
+        "random_state": random_state,
+        "balance": balance,
+        "prep_version": PREP_VERSION,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_prepared_dataset(data_path=DATA_PATH, test_size=TEST_SIZE, random_state=RANDOM_STATE,
+                          cache_dir=CACHE_DIR, balance=BALANCE_STRATEGY):
+    """Returns (X_train, X_test, y_train, y_test), preparing and caching them as Parquet on first use."""
+    key = dataset_key(data_path, test_size, random_state, balance)
+    cached_dir = os.path.join(cache_dir, key)
+
+    if os.path.isdir(cached_dir):
+        logging.info(f"Loading prepared dataset from cache: {cached_dir}")
+        train = pd.read_parquet(os.path.join(cached_dir, "train.parquet"))
+        test = pd.read_parquet(os.path.join(cached_dir, "test.parquet"))
+    else:
+        logging.info(f"Preparing train/test split (balance={balance})...")
+        train, test = prepare_dataset(data_path, test_size, random_state, balance)
+
+        # Write into a temp dir and rename it, so readers never see a half-written cache entry
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=cache_dir)
+        train.to_parquet(os.path.join(temp_dir, "train.parquet"))
+        test.to_parquet(os.path.join(temp_dir, "test.parquet"))
+        try:
+            os.rename(temp_dir, cached_dir)
+            logging.info(f"Prepared dataset cached at {cached_dir}")
+        except OSError:
+            shutil.rmtree(temp_dir)  # Another process cached the same dataset first
+
+    return train["review_body"], test["review_body"], train["label"], test["label"]
@@ -1,9 +1,10 @@
-import pandas as pd
 import logging
 import os
 import pickle
 import shap
 import matplotlib.pyplot as plt
+from prepared_data import load_prepared_dataset
+from calibration import stored_calibration, with_calibration
 
 # ========== Logging ==========
 logging.basicConfig(
@@ -30,31 +31,19 @@ with open(MODEL_FILE, "rb") as f:
 vectorizer = model_pipeline.named_steps["tfidf"]
 model = model_pipeline.named_steps["nb"]
 
-# ========== Load and Prepare Data ==========
-df = pd.read_csv("Data/Data.csv")
-
-def map_sentiment(rating):
-    if rating <= 2:
-        return "Negative"
-    elif rating == 3:
-        return "Neutral"
-    else:
-        return "Positive"
-
-df["label"] = df["star_rating"].apply(map_sentiment)
-df = df.dropna(subset=["review_body"])
-df["review_body"] = df["review_body"].astype(str)
-
 # ========== Sample Data ==========
-sample_df = df.sample(n=5, random_state=42)
-texts = sample_df["review_body"].tolist()
+# Explain a few held-out reviews from the shared prepared test split
+_, X_test, _, _ = load_prepared_dataset("Data/Data.csv")
+texts = X_test.sample(n=5, random_state=42).tolist()
 X_sample = vectorizer.transform(texts)
 
 # ========== SHAP Explanation ==========
 shap.initjs()
 
 # KernelExplainer for scikit-learn Naive Bayes
-explainer = shap.Explainer(model.predict_proba, X_sample.toarray())
+# Explain the served (calibrated, if the model has a calibration) probabilities
+served_model = with_calibration(model, stored_calibration(model_pipeline))
+explainer = shap.Explainer(served_model.predict_proba, X_sample.toarray())
 shap_values = explainer(X_sample.toarray())
 
 # ========== Save SHAP Summary Plot ==========
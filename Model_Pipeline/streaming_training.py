@@ -0,0 +1,89 @@
+import logging
+import os
+from collections import Counter
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from feature_store import VECTORIZER_PARAMS
+from parallel_tfidf import analyzer_params, apply_term_stats, merge_term_stats, term_stats
+from prepared_data import DATA_PATH, TEST_SIZE, label_mapping, map_sentiment_labels, balanced_class_weights
+
+# ========== Config ==========
+CHUNK_SIZE = int(os.environ.get("STREAMING_CHUNK_SIZE", "100000"))
+CLASSES = np.array(sorted(label_mapping.values()))
+
+
+def iter_labelled_chunks(data_path=DATA_PATH, chunksize=CHUNK_SIZE, test_size=TEST_SIZE):
+    """Yields (texts, labels, is_test) per CSV chunk.
+
+    Every n-th review (n = 1 / test_size) is held out for evaluation, by position in the file,
+    so every pass over the CSV sees the same split without keeping it in memory.
+    """
+    holdout_every = int(round(1 / test_size))
+    position = 0
+    for chunk in pd.read_csv(data_path, usecols=["star_rating", "review_body"], chunksize=chunksize):
+        chunk = chunk.dropna(subset=["review_body"])
+        texts = chunk["review_body"].astype(str).tolist()
+        labels = map_sentiment_labels(chunk["star_rating"])
+        is_test = (np.arange(position, position + len(texts)) % holdout_every) == 0
+        position += len(texts)
+        yield texts, labels, is_test
+
+
+def fit_streaming_vectorizer(vectorizer, data_path=DATA_PATH, chunksize=CHUNK_SIZE, test_size=TEST_SIZE):
+    """First pass: learns vocabulary and idf from the training rows chunk by chunk; returns class counts."""
+    params = analyzer_params(vectorizer)
+    merged = None
+    class_counts = Counter()
+    for texts, labels, is_test in iter_labelled_chunks(data_path, chunksize, test_size):
+        train_texts = [text for text, held_out in zip(texts, is_test) if not held_out]
+        chunk_stats = term_stats(params, train_texts)
+        merged = chunk_stats if merged is None else merge_term_stats([merged, chunk_stats])
+        class_counts.update(labels[~is_test].tolist())
+
+    if merged is None:
+        raise ValueError(f"No reviews found in {data_path}")
+    apply_term_stats(vectorizer, *merged)
+    logging.info(f"Streaming vocabulary: {len(vectorizer.vocabulary_)} terms from {merged[3]} training reviews")
+    return dict(class_counts)
+
+
+def train_streaming(data_path=DATA_PATH, vectorizer_params=VECTORIZER_PARAMS, chunksize=CHUNK_SIZE, test_size=TEST_SIZE):
+    """Trains the tfidf + Naive Bayes pipeline without loading the whole CSV into memory.
+
+    Classes are balanced with sample weights instead of upsampled rows, and accuracy on the
+    held-out rows is weighted the same way. Returns (pipeline, accuracy).
+    """
+    vectorizer = TfidfVectorizer(**vectorizer_params)
+    class_counts = fit_streaming_vectorizer(vectorizer, data_path, chunksize, test_size)
+    weights = balanced_class_weights(class_counts)
+    logging.info(f"Class counts: {class_counts}, balancing weights: {weights}")
+
+    # Second pass: fit Naive Bayes incrementally on the fixed vocabulary
+    nb = MultinomialNB()
+    for texts, labels, is_test in iter_labelled_chunks(data_path, chunksize, test_size):
+        train = ~is_test
+        if not train.any():
+            continue
+        X = vectorizer.transform([text for text, keep in zip(texts, train) if keep])
+        y = labels[train]
+        nb.partial_fit(X, y, classes=CLASSES, sample_weight=np.array([weights[label] for label in y]))
+
+    # Third pass: class-weighted accuracy on the held-out rows
+    correct, total = 0.0, 0.0
+    for texts, labels, is_test in iter_labelled_chunks(data_path, chunksize, test_size):
+        if not is_test.any():
+            continue
+        X = vectorizer.transform([text for text, held_out in zip(texts, is_test) if held_out])
+        y = labels[is_test]
+        sample_weight = np.array([weights.get(label, 1.0) for label in y])
+        correct += sample_weight[nb.predict(X) == y].sum()
+        total += sample_weight.sum()
+
+    pipeline = Pipeline([
+        ("tfidf", vectorizer),
+        ("nb", nb)
+    ])
+    return pipeline, (correct / total if total else 0.0)
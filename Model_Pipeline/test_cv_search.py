@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, make_scorer
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.naive_bayes import MultinomialNB
+import cv_search
+from cv_search import alpha_sweep, build_folds, cv_alpha_sweep, halving_schedule, search
+
+ALPHAS = np.logspace(-3, 1, 25)
+CLASS_WORDS = {
+    0: ["awful", "broke", "refund", "worst", "poor"],
+    1: ["okay", "average", "fine", "decent", "meh"],
+    2: ["great", "love", "perfect", "excellent", "best"],
+}
+SHARED_WORDS = ["product", "price", "delivery", "box", "quality", "seller", "time", "use", "the", "it", "was"]
+VECTORIZER_GRID = {"max_features": [None, 6, 15], "ngram_range": [(1, 1), (1, 2), (2, 2)]}
+SEARCH_ALPHAS = [0.05, 0.3, 1.0, 4.0]
+
+
+def make_reviews(n_rows=300, seed=0):
+    """Noisy reviews for three imbalanced classes, with per-class balancing weights."""
+    rng = np.random.default_rng(seed)
+    labels = rng.choice([0, 1, 2], size=n_rows, p=[0.2, 0.3, 0.5])
+    reviews = []
+    for label in labels:
+        # Words of other classes leak in, so accuracy varies with alpha
+        own = rng.choice(CLASS_WORDS[label], size=rng.integers(0, 3))
+        noise = rng.choice(sum(CLASS_WORDS.values(), []), size=rng.integers(1, 4))
+        shared = rng.choice(SHARED_WORDS, size=rng.integers(1, 6))
+        reviews.append(" ".join(np.concatenate([own, noise, shared])))
+    classes, counts = np.unique(labels, return_counts=True)
+    weights = (len(labels) / (len(classes) * counts))[np.searchsorted(classes, labels)]
+    return reviews, labels, weights
+
+
+def make_dataset(n_rows=300, seed=0):
+    """Noisy TF-IDF features for three imbalanced classes, with per-class balancing weights."""
+    reviews, labels, weights = make_reviews(n_rows, seed)
+    return TfidfVectorizer().fit_transform(reviews), labels, weights
+
+
+def fitted_fold_score(reviews, labels, weights, train, val, max_features, ngram_range, alpha):
+    """Validation accuracy of a TfidfVectorizer + MultinomialNB fitted on one fold's training rows."""
+    vectorizer = TfidfVectorizer(max_features=max_features, ngram_range=ngram_range, stop_words="english")
+    X_train = vectorizer.fit_transform([reviews[i] for i in train])
+    X_val = vectorizer.transform([reviews[i] for i in val])
+    w_train, w_val = (None, None) if weights is None else (weights[train], weights[val])
+    nb = MultinomialNB(alpha=alpha).fit(X_train, labels[train], sample_weight=w_train)
+    return nb.score(X_val, labels[val], sample_weight=w_val)
+
+
+def grid_search_scores(X, y, sample_weight=None):
+    """Mean test accuracy per alpha from GridSearchCV(cv=5), weighting fit and score alike."""
+    with sklearn.config_context(enable_metadata_routing=True):
+        estimator = MultinomialNB().set_fit_request(sample_weight=True)
+        scorer = make_scorer(accuracy_score).set_score_request(sample_weight=True)
+        grid = GridSearchCV(estimator, {"alpha": ALPHAS}, cv=5, scoring=scorer)
+        if sample_weight is None:
+            grid.fit(X, y)
+        else:
+            grid.fit(X, y, sample_weight=sample_weight)
+    return grid.cv_results_["mean_test_score"]
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_cv_alpha_sweep_matches_grid_search(weighted):
+    X, y, weights = make_dataset()
+    sample_weight = weights if weighted else None
+
+    expected = grid_search_scores(X, y, sample_weight)
+    scores = cv_alpha_sweep(X, y, ALPHAS, sample_weight)
+    assert np.ptp(expected) > 0, "The dataset should make accuracy depend on alpha"
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-12)
+    assert scores.argmax() == expected.argmax(), "Both should pick the same alpha"
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+@pytest.mark.parametrize("block_size", [1, 7, 64])
+def test_alpha_sweep_matches_fitting_each_alpha(weighted, block_size):
+    X, y, weights = make_dataset(seed=1)
+    train, val = slice(0, 200), slice(200, None)
+    w_train, w_val = (weights[train], weights[val]) if weighted else (None, None)
+
+    scores = alpha_sweep(X[train], y[train], X[val], y[val], ALPHAS, w_train, w_val, block_size=block_size)
+    expected = [
+        MultinomialNB(alpha=alpha).fit(X[train], y[train], sample_weight=w_train).score(X[val], y[val], w_val)
+        for alpha in ALPHAS
+    ]
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_fold_counts_match_fitting_each_fold(weighted):
+    reviews, labels, weights = make_reviews(n_rows=203, seed=2)
+    weights = weights if weighted else None
+    folds = build_folds(reviews, labels, weights, n_splits=5, max_ngram=2)
+    splits = StratifiedKFold(n_splits=5, shuffle=True, random_state=42).split(np.zeros(len(labels)), labels)
+
+    for fold, (train, val) in zip(folds, splits):
+        for max_features in VECTORIZER_GRID["max_features"]:
+            for ngram_range in VECTORIZER_GRID["ngram_range"]:
+                X_train, X_val = fold.tfidf(max_features, ngram_range)
+                scores = alpha_sweep(X_train, fold.y_train, X_val, fold.y_val, SEARCH_ALPHAS, fold.w_train, fold.w_val)
+                expected = [
+                    fitted_fold_score(reviews, labels, weights, train, val, max_features, ngram_range, alpha)
+                    for alpha in SEARCH_ALPHAS
+                ]
+                np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-12,
+                                           err_msg=f"max_features={max_features} ngram_range={ngram_range}")
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_search_without_halving_scores_every_training_row(weighted):
+    # 203 rows do not split evenly, so some folds have more training rows than others
+    reviews, labels, weights = make_reviews(n_rows=203, seed=3)
+    weights = weights if weighted else None
+    splits = list(StratifiedKFold(n_splits=5, shuffle=True, random_state=42).split(np.zeros(len(labels)), labels))
+    assert len({len(train) for train, _ in splits}) > 1
+
+    best, results = search(reviews, labels, VECTORIZER_GRID, SEARCH_ALPHAS, weights, n_splits=5)
+    assert len(results) == 9 * len(SEARCH_ALPHAS)
+    for result in results:
+        expected = np.mean([
+            fitted_fold_score(reviews, labels, weights, train, val, result["max_features"], result["ngram_range"],
+                              result["alpha"])
+            for train, val in splits
+        ])
+        np.testing.assert_allclose(result["score"], expected, rtol=0, atol=1e-12, err_msg=str(result))
+        assert result["rows"] is None
+    best_result = next(result for result in results if all(result[key] == best[key] for key in best))
+    assert best_result["score"] == max(result["score"] for result in results)
+
+
+@pytest.mark.parametrize("n_candidates, n_rows, factor, expected", [
+    (1, 500, 3, [(500, 1)]),
+    (3, 500, 3, [(500, 3)]),
+    (4, 500, 3, [(166, 4), (500, 2)]),
+    (36, 900, 3, [(33, 36), (100, 12), (300, 4), (900, 2)]),
+    (10, 80, 2, [(10, 10), (20, 5), (40, 3), (80, 2)]),
+])
+def test_halving_schedule(n_candidates, n_rows, factor, expected):
+    assert halving_schedule(n_candidates, n_rows, factor) == expected
+
+
+def test_halving_keeps_the_best_candidates_on_more_rows_each_round(monkeypatch):
+    reviews, labels, weights = make_reviews(n_rows=400, seed=4)
+    rounds = []
+    evaluate_candidates = cv_search.evaluate_candidates
+
+    def record_round(folds, candidates, n_rows=None):
+        scores, seconds = evaluate_candidates(folds, candidates, n_rows)
+        rounds.append((candidates, n_rows, scores))
+        return scores, seconds
+
+    monkeypatch.setattr(cv_search, "evaluate_candidates", record_round)
+    best, results = search(reviews, labels, VECTORIZER_GRID, SEARCH_ALPHAS, weights, halving=True, factor=3)
+
+    n_rows = min(fold.X_train.shape[0] for fold in build_folds(reviews, labels, weights, max_ngram=2))
+    schedule = halving_schedule(len(results), n_rows, factor=3)
+    assert [(n_rows, len(candidates)) for candidates, n_rows, _ in rounds] == schedule
+    for (candidates, _, scores), (next_candidates, _, _) in zip(rounds, rounds[1:]):
+        # Survivors are the top candidates of the previous round
+        ranked = sorted(range(len(candidates)), key=lambda i: -scores[i])
+        assert next_candidates == [candidates[i] for i in ranked[:len(next_candidates)]]
+
+    last_candidates, last_rows, last_scores = rounds[-1]
+    assert best == last_candidates[max(range(len(last_candidates)), key=lambda i: last_scores[i])]
+    for rows, keep in schedule:
+        assert sum(result["rows"] >= rows for result in results) == keep, f"{keep} candidates should reach {rows} rows"
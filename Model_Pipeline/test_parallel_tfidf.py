@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from parallel_tfidf import parallel_fit_transform, parallel_transform
+
+WORDS = ["good", "great", "bad", "awful", "okay", "fine", "love", "hate", "cheap", "broke",
+         "café", "naïve", "fast", "slow", "the", "and", "it", "was", "not", "very"]
+
+
+def make_documents(n_documents=120, seed=0):
+    """Reviews drawn from a skewed word distribution, plus a few empty and stop-word-only ones."""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(WORDS) + 1)
+    documents = [
+        " ".join(rng.choice(WORDS, size=rng.integers(1, 15), p=weights / weights.sum()))
+        for _ in range(n_documents)
+    ]
+    return documents + ["", "the and it", "!!!"]
+
+
+# Every term below occurs exactly twice, so max_features has to break a many-way tie
+TIED_DOCUMENTS = ["alpha bravo charlie", "delta echo foxtrot", "alpha bravo charlie delta echo foxtrot",
+                  "golf hotel", "golf hotel", "india"]
+
+SETTINGS = [
+    {},
+    {"min_df": 2},
+    {"min_df": 0.05, "max_df": 0.5},
+    {"max_df": 30, "min_df": 3},
+    {"max_features": 7},
+    {"max_features": 12, "ngram_range": (1, 2), "sublinear_tf": True},
+    {"stop_words": "english", "max_df": 0.9, "smooth_idf": False, "norm": "l1"},
+]
+
+# (processes, shards per process): 1, 5, 2 and 6 shards
+SHARDINGS = [(1, 1), (1, 5), (2, 1), (2, 3)]
+
+
+def assert_same_fit(parallel, serial, matrix, documents):
+    assert parallel.vocabulary_ == serial.vocabulary_, "Merged vocabulary differs from a serial fit"
+    assert parallel.idf_.dtype == serial.idf_.dtype
+    assert np.array_equal(parallel.idf_, serial.idf_), "idf_ differs from a serial fit"
+
+    expected = serial.transform(documents)
+    assert matrix.shape == expected.shape
+    assert np.array_equal(matrix.toarray(), expected.toarray()), "Matrix differs from transform() of a serial fit"
+
+
+@pytest.mark.parametrize("settings", SETTINGS)
+@pytest.mark.parametrize("n_jobs, shards_per_job", SHARDINGS)
+def test_parallel_fit_matches_serial_fit(settings, n_jobs, shards_per_job):
+    documents = make_documents()
+    serial = TfidfVectorizer(**settings).fit(documents)
+    parallel = TfidfVectorizer(**settings)
+    matrix = parallel_fit_transform(parallel, documents, n_jobs=n_jobs, shards_per_job=shards_per_job)
+    assert_same_fit(parallel, serial, matrix, documents)
+
+
+@pytest.mark.parametrize("max_features", [1, 3, 4, 8])
+@pytest.mark.parametrize("n_jobs, shards_per_job", SHARDINGS)
+def test_max_features_ties_break_like_serial_fit(max_features, n_jobs, shards_per_job):
+    serial = TfidfVectorizer(max_features=max_features).fit(TIED_DOCUMENTS)
+    parallel = TfidfVectorizer(max_features=max_features)
+    matrix = parallel_fit_transform(parallel, TIED_DOCUMENTS, n_jobs=n_jobs, shards_per_job=shards_per_job)
+    assert_same_fit(parallel, serial, matrix, TIED_DOCUMENTS)
+
+
+def test_parallel_transform_matches_transform():
+    documents = make_documents()
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2)).fit(documents)
+    unseen = make_documents(n_documents=40, seed=1)
+    matrix = parallel_transform(vectorizer, unseen, n_jobs=2, shards_per_job=3)
+    assert np.array_equal(matrix.toarray(), vectorizer.transform(unseen).toarray())
+
+
+def test_pruning_everything_raises_like_serial_fit():
+    with pytest.raises(ValueError):
+        TfidfVectorizer(min_df=1000).fit(TIED_DOCUMENTS)
+    with pytest.raises(ValueError):
+        parallel_fit_transform(TfidfVectorizer(min_df=1000), TIED_DOCUMENTS, n_jobs=1)
@@ -8,6 +8,7 @@ from airflow.operators.email import EmailOperator
 # Importing functions from scripts
 from mlops_core.data_ingestion import download_data
 from mlops_core.data_preprocessing import preprocess_data
+from mlops_core.dataset_statistics import generate_statistics
 from mlops_core.schema_validator import validate_schema
 from mlops_core.anomalies import detect_anomalies
 from mlops_core.bias_detector import detect_bias
@@ -27,7 +28,7 @@ default_args = {
 with DAG(
     dag_id='mlops_pipeline',
     default_args=default_args,
-    description='MLOps pipeline with schema validation, anomaly detection, and bias detection',
+    description='MLOps pipeline with statistics generation, schema validation, anomaly detection, and bias detection',
     schedule_interval=None,  # Manual trigger only
     start_date=days_ago(1),
     catchup=False,
@@ -45,19 +46,25 @@ with DAG(
         python_callable=preprocess_data,
     )
 
-    # Task 3: Schema Validation
+    # Task 3: Statistics Generation (computed once, reused by the validation tasks below)
+    statistics_task = PythonOperator(
+        task_id='statistics_generation',
+        python_callable=generate_statistics,
+    )
+
+    # Task 4: Schema Validation
     schema_validation_task = PythonOperator(
         task_id='schema_validation',
         python_callable=validate_schema,
     )
 
-    # Task 4: Anomaly Detection
+    # Task 5: Anomaly Detection
     anomaly_detection_task = PythonOperator(
         task_id='anomaly_detection',
         python_callable=detect_anomalies,
     )
 
-    # Task 5: Bias Detection
+    # Task 6: Bias Detection
     bias_detection_task = PythonOperator(
         task_id='bias_detection',
         python_callable=detect_bias,
@@ -71,4 +78,4 @@ with DAG(
         dag=dag
     )
     # Define dependencies (linear pipeline)
-    ingestion_task >> preprocessing_task >> schema_validation_task >> anomaly_detection_task >> bias_detection_task>>success_email
+    ingestion_task >> preprocessing_task >> statistics_task >> schema_validation_task >> anomaly_detection_task >> bias_detection_task>>success_email
@@ -1,8 +1,8 @@
 import tensorflow_data_validation as tfdv
-import pandas as pd
 import os
 import logging
 import sys
+from mlops_core.dataset_statistics import load_dataset_statistics
 
 # Setup logging
 LOG_DIR = "logs"
@@ -21,7 +21,6 @@ logging.basicConfig(
 
 PROCESSED_DATA_PATH = "data/processed/reviews.parquet"
 SCHEMA_PATH = "validation/schema.pbtxt"
-NEW_STATS_PATH = "validation/new_stats.tfrecord"
 
 def detect_anomalies(input_path=PROCESSED_DATA_PATH, schema_path=SCHEMA_PATH):
     """Detects data anomalies using TensorFlow Data Validation (TFDV) and returns JSON-serializable results."""
@@ -37,14 +36,8 @@ def detect_anomalies(input_path=PROCESSED_DATA_PATH, schema_path=SCHEMA_PATH):
             logging.error(f"❌ Processed dataset not found: {input_path}")
             return {"error": "Processed dataset not found"}
 
-        logging.info("🔹 Loading new dataset...")
-        df = pd.read_parquet(input_path)
-
-        logging.info("🔹 Generating statistics for new dataset...")
-        new_stats = tfdv.generate_statistics_from_dataframe(df)
-
-        os.makedirs(os.path.dirname(NEW_STATS_PATH), exist_ok=True)
-        tfdv.write_stats_text(new_stats, NEW_STATS_PATH)
+        logging.info("🔹 Loading statistics for new dataset...")
+        new_stats = load_dataset_statistics(input_path)
 
         logging.info("🔹 Running anomaly detection...")
         anomalies = tfdv.validate_statistics(new_stats, schema)
@@ -1,10 +1,12 @@
 import tensorflow_data_validation as tfdv
-import tensorflow as tf
-import pandas as pd
+import numpy as np
 import os
 import logging
 import sys
-from tensorflow_metadata.proto.v0 import statistics_pb2  # ✅ Correct import
+from tensorflow_metadata.proto.v0 import statistics_pb2
+from mlops_core.dataset_statistics import (
+    load_dataset_statistics, load_statistics_from_tfrecord, save_statistics_as_tfrecord
+)
 
 # Setup logging
 LOG_DIR = "logs"
@@ -25,22 +27,162 @@ logging.basicConfig(
 PROCESSED_DATA_PATH = "data/processed/reviews.parquet"
 SCHEMA_PATH = "validation/schema.pbtxt"
 REFERENCE_STATS_PATH = "validation/reference_stats.tfrecord"
-NEW_STATS_PATH = "validation/new_stats.tfrecord"
 BIAS_REPORT_PATH = "validation/bias_report.txt"
 
-def load_statistics_from_tfrecord(path):
-    """Load dataset statistics from TFRecord binary file."""
-    dataset = tf.data.TFRecordDataset([path])
-    for record in dataset:
-        stats = statistics_pb2.DatasetFeatureStatisticsList()  # ✅ Corrected
-        stats.ParseFromString(record.numpy())
-        return stats
-    return None
-
-def save_statistics_as_tfrecord(stats, path):
-    """Save dataset statistics as TFRecord binary file."""
-    with tf.io.TFRecordWriter(path) as writer:
-        writer.write(stats.SerializeToString())
+# Distribution distances above these are flagged in the report
+JS_DIVERGENCE_THRESHOLD = 0.1
+L_INFINITY_THRESHOLD = 0.1
+CDF_SHIFT_THRESHOLD = 0.1
+
+def feature_name(feature):
+    """Feature name from either the `path` or the legacy `name` field."""
+    return ".".join(feature.path.step) if feature.path.step else feature.name
+
+def index_features(stats):
+    """Maps feature name -> FeatureNameStatistics of the first dataset in `stats`."""
+    return {feature_name(feature): feature for feature in stats.datasets[0].features}
+
+def find_histogram(num_stats, histogram_type):
+    return next((h for h in num_stats.histograms if h.type == histogram_type), None)
+
+def histogram_arrays(histogram):
+    """(low edges, high edges, counts) of a histogram's buckets."""
+    buckets = histogram.buckets
+    return (np.array([b.low_value for b in buckets]), np.array([b.high_value for b in buckets]),
+            np.array([b.sample_count for b in buckets]))
+
+def rebin_histogram(histogram, ref_low, ref_high):
+    """Redistributes a histogram's counts onto reference buckets, assuming counts are uniform within
+    each bucket. Two extra bins hold the mass below and above the reference range."""
+    low, high, counts = histogram_arrays(histogram)
+    width = high - low
+    point = width <= 0
+    overlap = np.clip(np.minimum(high[:, None], ref_high[None, :]) - np.maximum(low[:, None], ref_low[None, :]), 0, None)
+    share = np.divide(overlap, width[:, None], out=np.zeros_like(overlap), where=~point[:, None])
+    # Zero-width buckets (constant values) go entirely to the reference bucket that contains them
+    inside = (low[:, None] >= ref_low[None, :]) & (low[:, None] <= ref_high[None, :])
+    first_inside = inside & (np.cumsum(inside, axis=1) == 1)
+    share[point] = first_inside[point]
+
+    rebinned = counts @ share
+    below = np.sum(counts * np.clip(np.minimum(high, ref_low[0]) - low, 0, None) / np.where(point, 1, width))
+    below += counts[point & (low < ref_low[0])].sum()
+    above = np.sum(counts * np.clip(high - np.maximum(low, ref_high[-1]), 0, None) / np.where(point, 1, width))
+    above += counts[point & (low > ref_high[-1])].sum()
+    return np.concatenate([[below], rebinned, [above]])
+
+def jensen_shannon_divergence(p, q):
+    """Jensen-Shannon divergence (base 2, between 0 and 1) of two unnormalized distributions."""
+    p, q = p / p.sum(), q / q.sum()
+    m = (p + q) / 2
+    def kl(a):
+        nonzero = a > 0
+        return np.sum(a[nonzero] * np.log2(a[nonzero] / m[nonzero]))
+    return (kl(p) + kl(q)) / 2
+
+def cumulative_distribution(histogram, points):
+    """Mid-distribution function (share below each point plus half the share at it) of a histogram,
+    assuming counts are uniform within each bucket; zero-width buckets are point masses. For discrete
+    features this splits ties evenly instead of putting them all below. None if the histogram is empty."""
+    low, high, counts = histogram_arrays(histogram)
+    if counts.sum() <= 0:
+        return None
+    width = high - low
+    covered = np.clip((points[:, None] - low[None, :]) / np.where(width > 0, width, 1)[None, :], 0, 1)
+    point_mass = (points[:, None] > low[None, :]) + 0.5 * (points[:, None] == low[None, :])
+    covered = np.where(width[None, :] > 0, covered, point_mass)
+    return covered @ counts / counts.sum()
+
+def compare_numeric(feature, ref_feature):
+    """Mean drift, histogram Jensen-Shannon divergence and largest quantile-histogram CDF difference of a numeric feature."""
+    old_mean, new_mean = ref_feature.num_stats.mean, feature.num_stats.mean
+    result = {
+        "old_mean": old_mean,
+        "new_mean": new_mean,
+        "percent_drift": ((new_mean - old_mean) / old_mean) * 100 if old_mean != 0 else 0,
+    }
+
+    new_hist = find_histogram(feature.num_stats, statistics_pb2.Histogram.STANDARD)
+    ref_hist = find_histogram(ref_feature.num_stats, statistics_pb2.Histogram.STANDARD)
+    if new_hist and ref_hist and ref_hist.buckets and new_hist.buckets:
+        ref_low, ref_high, ref_counts = histogram_arrays(ref_hist)
+        reference = np.concatenate([[0.0], ref_counts, [0.0]])
+        current = rebin_histogram(new_hist, ref_low, ref_high)
+        if reference.sum() > 0 and current.sum() > 0:
+            result["js_divergence"] = jensen_shannon_divergence(current, reference)
+
+    new_quantiles = find_histogram(feature.num_stats, statistics_pb2.Histogram.QUANTILES)
+    ref_quantiles = find_histogram(ref_feature.num_stats, statistics_pb2.Histogram.QUANTILES)
+    if new_quantiles and ref_quantiles and ref_quantiles.buckets and new_quantiles.buckets:
+        # Compared as probabilities, not values: a discrete feature (e.g. star ratings) whose median moves
+        # by one value because a few percent of the mass moved should not count as a large shift
+        low, high, _ = histogram_arrays(new_quantiles)
+        ref_low, ref_high, _ = histogram_arrays(ref_quantiles)
+        points = np.unique(np.concatenate([low, high, ref_low, ref_high]))
+        new_cdf, ref_cdf = cumulative_distribution(new_quantiles, points), cumulative_distribution(ref_quantiles, points)
+        if new_cdf is not None and ref_cdf is not None:
+            result["cdf_shift"] = np.max(np.abs(new_cdf - ref_cdf))
+    return result
+
+def value_counts(string_stats):
+    """Value -> count from the rank histogram (or top values), with uncovered values under one bucket."""
+    if string_stats.rank_histogram.buckets:
+        counts = {b.label: b.sample_count for b in string_stats.rank_histogram.buckets}
+    else:
+        counts = {v.value: v.frequency for v in string_stats.top_values}
+    other = string_stats.common_stats.num_non_missing - sum(counts.values())
+    if other > 0:
+        counts[None] = counts.get(None, 0) + other
+    return counts
+
+def compare_categorical(feature, ref_feature):
+    """L-infinity distance and Jensen-Shannon divergence between two categorical value distributions."""
+    new_counts, ref_counts = value_counts(feature.string_stats), value_counts(ref_feature.string_stats)
+    values = list(set(new_counts) | set(ref_counts))
+    current = np.array([new_counts.get(v, 0) for v in values], dtype=float)
+    reference = np.array([ref_counts.get(v, 0) for v in values], dtype=float)
+    if current.sum() == 0 or reference.sum() == 0:
+        return {}
+    return {
+        "l_infinity": np.max(np.abs(current / current.sum() - reference / reference.sum())),
+        "js_divergence": jensen_shannon_divergence(current, reference),
+    }
+
+def compare_statistics(new_stats, reference_stats):
+    """Drift report lines for every feature, looking each reference feature up by name once."""
+    reference = index_features(reference_stats)
+    drift_results = []
+    seen = set()
+    for feature in new_stats.datasets[0].features:
+        name = feature_name(feature)
+        seen.add(name)
+        ref_feature = reference.get(name)
+        if ref_feature is None:
+            drift_results.append(f"{name}: New feature, not in reference dataset")
+        elif feature.HasField("num_stats") and ref_feature.HasField("num_stats"):
+            result = compare_numeric(feature, ref_feature)
+            entry = (f"{name}: Old Mean = {result['old_mean']:.3f}, New Mean = {result['new_mean']:.3f}, "
+                     f"Drift = {result['percent_drift']:.2f}%")
+            if "js_divergence" in result:
+                entry += f", Histogram JS = {result['js_divergence']:.4f}"
+            if "cdf_shift" in result:
+                entry += f", CDF Shift = {result['cdf_shift']:.4f}"
+            if (result.get("js_divergence", 0) > JS_DIVERGENCE_THRESHOLD
+                    or result.get("cdf_shift", 0) > CDF_SHIFT_THRESHOLD):
+                entry += " ⚠️"
+            drift_results.append(entry)
+        elif feature.HasField("string_stats") and ref_feature.HasField("string_stats"):
+            result = compare_categorical(feature, ref_feature)
+            if result:
+                entry = f"{name}: L-infinity = {result['l_infinity']:.4f}, JS = {result['js_divergence']:.4f}"
+                if result["l_infinity"] > L_INFINITY_THRESHOLD or result["js_divergence"] > JS_DIVERGENCE_THRESHOLD:
+                    entry += " ⚠️"
+                drift_results.append(entry)
+
+    for name in reference:
+        if name not in seen:
+            drift_results.append(f"{name}: Missing from new dataset")
+    return drift_results
 
 def detect_bias(input_path=PROCESSED_DATA_PATH, schema_path=SCHEMA_PATH, reference_stats_path=REFERENCE_STATS_PATH):
     """Detects potential bias in the dataset by comparing it with a reference dataset."""
@@ -55,10 +197,9 @@ def detect_bias(input_path=PROCESSED_DATA_PATH, schema_path=SCHEMA_PATH, referen
         if not os.path.exists(input_path):
             logging.error(f"❌ Processed dataset not found: {input_path}")
             return None
-        df = pd.read_parquet(input_path)
 
-        logging.info("📊 Generating statistics for bias detection...")
-        new_stats = tfdv.generate_statistics_from_dataframe(df)
+        logging.info("📊 Loading statistics for bias detection...")
+        new_stats = load_dataset_statistics(input_path)
 
         os.makedirs(os.path.dirname(BIAS_REPORT_PATH), exist_ok=True)
 
@@ -66,20 +207,8 @@ def detect_bias(input_path=PROCESSED_DATA_PATH, schema_path=SCHEMA_PATH, referen
             logging.info("🔄 Comparing with reference dataset...")
             reference_stats = load_statistics_from_tfrecord(reference_stats_path)
 
-            # Compute drift manually
-            drift_results = []
-            for feature in new_stats.datasets[0].features:
-                feature_name = feature.path.step[0]
-                ref_feature = next(
-                    (f for f in reference_stats.datasets[0].features if f.path.step[0] == feature_name), None
-                )
-
-                if ref_feature and feature.HasField("num_stats") and ref_feature.HasField("num_stats"):
-                    old_mean = ref_feature.num_stats.mean
-                    new_mean = feature.num_stats.mean
-                    percent_drift = ((new_mean - old_mean) / old_mean) * 100 if old_mean != 0 else 0
-
-                    drift_results.append(f"{feature_name}: Old Mean = {old_mean:.3f}, New Mean = {new_mean:.3f}, Drift = {percent_drift:.2f}%")
+            # Compare means, numeric histograms/quantiles and categorical distributions per feature
+            drift_results = compare_statistics(new_stats, reference_stats)
 
             # Save bias report with structured format
             with open(BIAS_REPORT_PATH, "w", encoding="utf-8") as f:
@@ -93,8 +222,6 @@ def detect_bias(input_path=PROCESSED_DATA_PATH, schema_path=SCHEMA_PATH, referen
             logging.warning("⚠️ No reference dataset found. Saving current stats as reference for future bias detection.")
             save_statistics_as_tfrecord(new_stats, reference_stats_path)
 
-        save_statistics_as_tfrecord(new_stats, NEW_STATS_PATH)
-
         logging.info("✅ Bias detection complete.")
         return BIAS_REPORT_PATH
     except Exception as e:
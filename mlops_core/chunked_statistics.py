@@ -0,0 +1,259 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pads
+import pyarrow.parquet as pq
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from tensorflow_metadata.proto.v0 import statistics_pb2
+
+# Chunked statistics config (overridable per deployment)
+STATS_WORKERS = int(os.environ.get("STATS_WORKERS", "0")) or os.cpu_count()
+QUANTILE_POINTS = 101      # Per-chunk quantile summary resolution
+KMV_SIZE = 4096            # Hashes kept by the unique-count sketch
+TOP_VALUE_CANDIDATES = 1000  # Distinct values per string column carried between chunks
+NUM_HISTOGRAM_BUCKETS = 10
+NUM_TOP_VALUES = 20
+
+
+def quantile_sketch(values, discrete=False):
+    """Quantile points of a chunk with their levels; repeated points keep their highest level, so
+    interpolating through them gives a right-continuous CDF even for discrete columns."""
+    method = "inverted_cdf" if discrete else "linear"  # Discrete columns only use observed values
+    points = np.quantile(values, np.linspace(0, 1, QUANTILE_POINTS), method=method)
+    distinct, last_reversed = np.unique(points[::-1], return_index=True)
+    levels = np.linspace(0, 1, QUANTILE_POINTS)[len(points) - 1 - last_reversed]
+    return distinct, levels, len(values)
+
+
+class ColumnStats:
+    """Mergeable summary of one column: counts, moments, quantile sketch, unique sketch and top values.
+
+    Each chunk of rows is summarized independently and the summaries are merged, so statistics of
+    a dataset larger than memory can be computed chunk by chunk and in parallel.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind  # "int", "float" or "string"
+        self.count = 0
+        self.num_missing = 0
+        # Numeric: Chan et al. parallel mean/variance, extremes, zeros and per-chunk quantiles
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.num_zeros = 0
+        self.quantile_sketches = []  # (distinct quantile points, their levels, number of values) per chunk
+        # String: total length, k smallest value hashes and candidate top values
+        self.total_length = 0
+        self.kmv = np.empty(0, dtype=np.uint64)
+        self.top_values = {}
+
+    @classmethod
+    def from_array(cls, kind, array):
+        stats = cls(kind)
+        stats.num_missing = array.null_count
+        values = array.drop_null()
+        if kind == "string":
+            stats._add_strings(values)
+        else:
+            stats._add_numbers(values.to_numpy(zero_copy_only=False).astype(np.float64))
+        return stats
+
+    def _add_numbers(self, values):
+        nan = np.isnan(values)
+        self.num_missing += int(nan.sum())
+        values = values[~nan]
+        self.count = len(values)
+        if self.count:
+            self.mean = float(values.mean())
+            self.m2 = float(((values - self.mean) ** 2).sum())
+            self.min, self.max = float(values.min()), float(values.max())
+            self.num_zeros = int((values == 0).sum())
+            self.quantile_sketches = [quantile_sketch(values, discrete=self.kind == "int")]
+
+    def _add_strings(self, values):
+        self.count = len(values)
+        if self.count:
+            self.total_length = int(pc.sum(pc.utf8_length(values)).as_py())
+            hashes = pd.util.hash_array(values.to_numpy(zero_copy_only=False))
+            self.kmv = np.unique(hashes)[:KMV_SIZE]
+            counts = pc.value_counts(values)
+            frequencies = counts.field("counts").to_numpy()
+            keep = np.argsort(-frequencies, kind="stable")[:TOP_VALUE_CANDIDATES]
+            labels = counts.field("values").take(pa.array(keep)).to_pylist()
+            self.top_values = dict(zip(labels, frequencies[keep].tolist()))
+
+    def merge(self, other):
+        """Folds another chunk's summary of the same column into this one."""
+        self.num_missing += other.num_missing
+        if other.count == 0:
+            return self
+        if self.kind == "string":
+            self.total_length += other.total_length
+            self.kmv = np.unique(np.concatenate([self.kmv, other.kmv]))[:KMV_SIZE]
+            for value, frequency in other.top_values.items():
+                self.top_values[value] = self.top_values.get(value, 0) + frequency
+            if len(self.top_values) > TOP_VALUE_CANDIDATES:
+                kept = sorted(self.top_values.items(), key=lambda item: -item[1])[:TOP_VALUE_CANDIDATES]
+                self.top_values = dict(kept)
+        else:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.mean += delta * other.count / total
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self.num_zeros += other.num_zeros
+            self.quantile_sketches += other.quantile_sketches
+        self.count += other.count
+        return self
+
+    def unique_estimate(self):
+        """KMV estimate of distinct values: exact below KMV_SIZE distinct values."""
+        if len(self.kmv) < KMV_SIZE:
+            return len(self.kmv)
+        return int((KMV_SIZE - 1) / ((float(self.kmv[-1]) + 1.0) / 2.0 ** 64))
+
+    def cdf(self, x):
+        """Fraction of values <= x under the mixture of the per-chunk quantile sketches."""
+        if self.kind == "int":
+            x = np.floor(x)  # Integer columns have a step CDF
+        return sum(n * np.interp(x, points, levels, left=0.0, right=1.0)
+                   for points, levels, n in self.quantile_sketches) / self.count
+
+    def quantiles(self, probabilities):
+        grid = np.unique(np.concatenate([points for points, _, _ in self.quantile_sketches]))
+        if self.kind == "int":
+            # Smallest observed value whose CDF reaches each probability
+            index = np.searchsorted(self.cdf(grid), probabilities, side="left")
+            return grid[np.minimum(index, len(grid) - 1)]
+        return np.interp(probabilities, self.cdf(grid), grid)
+
+
+def _summarize_row_group(task):
+    """Worker: summarizes every column of one Parquet row group."""
+    path, row_group, kinds = task
+    table = pq.ParquetFile(path).read_row_group(row_group, columns=list(kinds))
+    return table.num_rows, {
+        name: ColumnStats.from_array(kind, table.column(name).combine_chunks())
+        for name, kind in kinds.items()
+    }
+
+
+def column_kind(arrow_type):
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return "int"
+    if pa.types.is_floating(arrow_type):
+        return "float"
+    return "string"
+
+
+def compute_column_statistics(input_path, workers=STATS_WORKERS):
+    """Summarizes a Parquet file or directory row group by row group in a process pool.
+
+    Returns (number of rows, {column: ColumnStats}); only one row group per worker is in memory.
+    """
+    dataset = pads.dataset(input_path, format="parquet")
+    kinds = {}
+    for field in dataset.schema:
+        kind = column_kind(field.type)
+        if kind == "string" and not (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            logging.warning(f"⚠️ Skipping column '{field.name}' of unsupported type {field.type}")
+            continue
+        kinds[field.name] = kind
+
+    tasks = [
+        (fragment.path, row_group.id, kinds)
+        for fragment in dataset.get_fragments()
+        for row_group in fragment.row_groups
+    ]
+    logging.info(f"🔹 Summarizing {len(tasks)} row groups with {workers} workers...")
+
+    num_rows, columns = 0, {name: ColumnStats(kind) for name, kind in kinds.items()}
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(tasks) or 1))) as pool:
+        for chunk_rows, chunk_columns in pool.map(_summarize_row_group, tasks):
+            num_rows += chunk_rows
+            for name, stats in chunk_columns.items():
+                columns[name].merge(stats)
+    return num_rows, columns
+
+
+def _fill_common_stats(common_stats, stats):
+    common_stats.num_non_missing = stats.count
+    common_stats.num_missing = stats.num_missing
+    common_stats.tot_num_values = stats.count
+    if stats.count:
+        common_stats.min_num_values = 1
+        common_stats.max_num_values = 1
+        common_stats.avg_num_values = 1.0
+
+
+def _add_numeric_stats(feature, stats):
+    num_stats = feature.num_stats
+    _fill_common_stats(num_stats.common_stats, stats)
+    if not stats.count:
+        return
+    num_stats.mean = stats.mean
+    num_stats.std_dev = float(np.sqrt(stats.m2 / stats.count))
+    num_stats.num_zeros = stats.num_zeros
+    num_stats.min = stats.min
+    num_stats.max = stats.max
+    num_stats.median = float(stats.quantiles(0.5))
+
+    edges = np.linspace(stats.min, stats.max, NUM_HISTOGRAM_BUCKETS + 1)
+    counts = np.diff(stats.cdf(edges)) * stats.count
+    counts[0] += stats.cdf(edges[0]) * stats.count  # Values equal to the minimum
+    standard = num_stats.histograms.add()
+    standard.type = statistics_pb2.Histogram.STANDARD
+    for low, high, count in zip(edges[:-1], edges[1:], counts):
+        standard.buckets.add(low_value=low, high_value=high, sample_count=count)
+
+    boundaries = stats.quantiles(np.linspace(0, 1, NUM_HISTOGRAM_BUCKETS + 1))
+    quantiles = num_stats.histograms.add()
+    quantiles.type = statistics_pb2.Histogram.QUANTILES
+    for low, high in zip(boundaries[:-1], boundaries[1:]):
+        quantiles.buckets.add(low_value=low, high_value=high, sample_count=stats.count / NUM_HISTOGRAM_BUCKETS)
+
+
+def _add_string_stats(feature, stats):
+    string_stats = feature.string_stats
+    _fill_common_stats(string_stats.common_stats, stats)
+    if not stats.count:
+        return
+    string_stats.unique = stats.unique_estimate()
+    string_stats.avg_length = stats.total_length / stats.count
+    top = sorted(stats.top_values.items(), key=lambda item: -item[1])[:NUM_TOP_VALUES]
+    for rank, (value, frequency) in enumerate(top):
+        string_stats.top_values.add(value=value, frequency=frequency)
+        string_stats.rank_histogram.buckets.add(low_rank=rank, high_rank=rank, label=value, sample_count=frequency)
+
+
+def to_statistics_proto(num_rows, columns):
+    """Converts merged column summaries into a TFDV-compatible DatasetFeatureStatisticsList."""
+    stats = statistics_pb2.DatasetFeatureStatisticsList()
+    dataset = stats.datasets.add()
+    dataset.num_examples = num_rows
+    feature_types = {"int": statistics_pb2.FeatureNameStatistics.INT,
+                     "float": statistics_pb2.FeatureNameStatistics.FLOAT,
+                     "string": statistics_pb2.FeatureNameStatistics.STRING}
+    for name, column in columns.items():
+        feature = dataset.features.add()
+        feature.path.step.append(name)
+        feature.type = feature_types[column.kind]
+        if column.kind == "string":
+            _add_string_stats(feature, column)
+        else:
+            _add_numeric_stats(feature, column)
+    return stats
+
+
+def generate_chunked_statistics(input_path, workers=STATS_WORKERS):
+    """Statistics proto of a Parquet dataset without loading it into memory or running TFDV.
+
+    Counts, missing values, min/max, mean and standard deviation are exact; quantiles, histograms,
+    unique counts and top values come from mergeable sketches and are approximate.
+    """
+    num_rows, columns = compute_column_statistics(input_path, workers)
+    return to_statistics_proto(num_rows, columns)
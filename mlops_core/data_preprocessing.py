@@ -1,5 +1,12 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import os
+import re
+import shutil
+import tempfile
 import logging
 from collections import Counter
 from imblearn.over_sampling import SMOTE
@@ -24,75 +31,243 @@ logging.basicConfig(
 
 # File paths
 RAW_DATA_PATH = "data/raw/reviews.csv"
-PROCESSED_PARQUET_PATH = "data/processed/reviews.parquet"
+PROCESSED_PARQUET_PATH = "data/processed/reviews.parquet"  # A directory of part files in chunked mode
 PROCESSED_CSV_PATH = PROCESSED_PARQUET_PATH.replace(".parquet", ".csv")
 
-def preprocess_data(input_path=RAW_DATA_PATH, parquet_path=PROCESSED_PARQUET_PATH, csv_path=PROCESSED_CSV_PATH):
-    """Cleans, scales star ratings, encodes, balances (SMOTE), and adds sentiment analysis."""
-    try:
-        logging.info("🔹 Loading raw data...")
-        df = pd.read_csv(input_path)
+# Raw rows per chunk; 0 (the default) loads the whole file at once and balances it with SMOTE.
+# Chunked runs keep memory bounded for files that do not fit, but skip SMOTE.
+PREPROCESS_CHUNKSIZE = int(os.environ.get("PREPROCESS_CHUNKSIZE", "0"))
 
-        logging.info("🔹 Dropping duplicates & handling missing values...")
-        df = df.drop_duplicates()
-        df = df.dropna(subset=["star_rating", "review_body", "product_category"])
+REQUIRED_COLUMNS = ["star_rating", "review_body", "product_category"]
+PUNCTUATION = re.compile(r"[^\w\s]")
+# PUNCTUATION for ASCII text in RE2 syntax; unlike Python's, RE2's \s lacks \v and \x1c-\x1f
+ASCII_PUNCTUATION = r"[^0-9A-Za-z_\s\x0b\x1c-\x1f]"
 
-        # ✅ Scale `star_rating` to range 1-5 if it's outside the bounds
-        if df["star_rating"].min() < 1 or df["star_rating"].max() > 5:
-            logging.warning(f"⚠️ Star ratings out of range! Scaling to 1-5...")
-            scaler = MinMaxScaler(feature_range=(1, 5))
-            df["star_rating"] = scaler.fit_transform(df[["star_rating"]]).round().astype(int)
+def read_chunks(input_path, chunksize, dtype=None):
+    """Yields the raw CSV in chunks of `chunksize` rows (the whole file if chunksize is 0)."""
+    if not chunksize:
+        yield pd.read_csv(input_path, dtype=dtype)
+        return
+    yield from pd.read_csv(input_path, chunksize=chunksize, dtype=dtype)
 
-        logging.info("🔹 Standardizing text data...")
-        df["review_body"] = df["review_body"].str.lower().str.replace(r"[^\w\s]", "", regex=True)
+def merge_dtypes(left, right):
+    """Column dtype covering two chunks, as pandas would infer it for the whole file."""
+    if left == right:
+        return left
+    if pd.api.types.is_bool_dtype(left) or pd.api.types.is_bool_dtype(right):
+        return np.dtype(object)
+    if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+        return np.result_type(left, right)
+    return np.dtype(object)
 
-        logging.info("🔹 Encoding categorical columns...")
-        df["product_category_encoded"] = df["product_category"].astype("category").cat.codes
+def summarize_raw_data(chunks):
+    """Column dtypes, star rating range and product categories of the raw chunks taken together."""
+    dtypes, low, high, categories = {}, np.inf, -np.inf, set()
+    for chunk in chunks:
+        for column, dtype in chunk.dtypes.items():
+            dtypes[column] = merge_dtypes(dtypes.get(column, dtype), dtype)
+        chunk = chunk.dropna(subset=REQUIRED_COLUMNS)
+        if len(chunk):
+            low = min(low, chunk["star_rating"].min())
+            high = max(high, chunk["star_rating"].max())
+            categories.update(chunk["product_category"].unique())
+    return dtypes, low, high, sorted(categories)
 
-        logging.info("🔹 Creating sentiment labels...")
-        df["review_sentiment"] = df["star_rating"].apply(
-            lambda x: "negative" if x in [1, 2] else "neutral" if x == 3 else "positive"
-        )
+def scan_raw_data(input_path, chunksize):
+    """First pass of a chunked run: column dtypes, star rating range and product categories of the whole file."""
+    return summarize_raw_data(read_chunks(input_path, chunksize))
 
-        # Check class distribution
-        sentiment_counts = Counter(df["review_sentiment"])
-        logging.info(f"🔹 Initial Sentiment Distribution: {sentiment_counts}")
+class RowDeduplicator:
+    """Remembers 64-bit hashes of every row seen so far, in a few sorted runs merged as they grow.
 
-        # ✅ Apply SMOTE only if dataset has multiple sentiment classes and imbalance is significant
-        target_column = "review_sentiment"
-        min_count = min(sentiment_counts.values())
-        max_count = max(sentiment_counts.values())
+    Memory is 8 bytes per distinct row, and lookups are binary searches over the runs.
+    """
 
-        if len(sentiment_counts) > 2 and max_count / min_count > 1.5:  # Apply SMOTE only if needed
-            logging.info("🔹 Applying SMOTE Oversampling...")
-            smote = SMOTE(sampling_strategy="auto", random_state=42)
-            X = df.drop(columns=[target_column])
-            y = df[target_column]
+    def __init__(self):
+        self.runs = []
 
-            # SMOTE works only on numerical features, drop text columns before applying
-            X_numeric = X.select_dtypes(include=["number"])
+    def first_occurrences(self, chunk):
+        """Boolean mask of rows not seen in this or any earlier chunk."""
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            keep &= run[positions] != hashes
 
-            X_resampled, y_resampled = smote.fit_resample(X_numeric, y)
+        if keep.any():
+            self.runs.append(np.sort(hashes[keep]))
+        while len(self.runs) > 1 and len(self.runs[-1]) >= len(self.runs[-2]):
+            merged = np.concatenate([self.runs.pop(), self.runs.pop()])
+            merged.sort(kind="mergesort")
+            self.runs.append(merged)
+        return keep
 
-            # Reconstruct the DataFrame
-            df_resampled = pd.DataFrame(X_resampled, columns=X_numeric.columns)
-            df_resampled[target_column] = y_resampled
+def normalize_text(reviews):
+    r"""Lowercases and strips punctuation with Python semantics: `PUNCTUATION.sub("", review.lower())`.
 
-            # Merge back non-numeric columns
-            df_non_numeric = X.drop(columns=X_numeric.columns)
-            df_non_numeric_resampled = df_non_numeric.iloc[:len(df_resampled)].reset_index(drop=True)
-            df = pd.concat([df_resampled, df_non_numeric_resampled], axis=1)
+    That is what `.str.lower().str.replace(r"[^\w\s]", "", regex=True)` does on object-dtype
+    columns (pandas 1.5.3, as pinned in the Dockerfile). Pandas versions that default to Arrow
+    strings run that regex with RE2 instead, which drops e.g. "\x0b" and "é"; this function does not.
+    ASCII reviews (nearly all of them) are handled by Arrow kernels with an equivalent pattern; the
+    rest fall back to Python's Unicode-aware regex.
+    """
+    array = pa.array(reviews, type=pa.string(), from_pandas=True)
+    cleaned = pc.replace_substring_regex(pc.ascii_lower(array), pattern=ASCII_PUNCTUATION, replacement="")
+    result = pd.Series(cleaned.to_numpy(zero_copy_only=False), index=reviews.index, dtype=object)
+
+    non_ascii = ~pc.fill_null(pc.string_is_ascii(array), True).to_numpy(zero_copy_only=False)
+    if non_ascii.any():
+        result[non_ascii] = [PUNCTUATION.sub("", review.lower()) for review in reviews[non_ascii]]
+    return result
+
+def label_sentiment(ratings):
+    """negative for 1-2 stars, neutral for 3, positive otherwise."""
+    return np.select(
+        [ratings.isin([1, 2]).to_numpy(), (ratings == 3).to_numpy()],
+        ["negative", "neutral"],
+        default="positive"
+    )
+
+def preprocess_chunk(chunk, deduplicator, scaler, categories):
+    """Cleans, scales, encodes and labels one chunk of raw rows."""
+    chunk = chunk[deduplicator.first_occurrences(chunk)]
+    chunk = chunk.dropna(subset=REQUIRED_COLUMNS)
+
+    if scaler is not None:
+        # A chunk can be left empty by deduplication; the scaler rejects empty input
+        scaled = scaler.transform(chunk[["star_rating"]]) if len(chunk) else np.empty((0, 1))
+        chunk["star_rating"] = scaled.round().astype(int)
+
+    chunk["review_body"] = normalize_text(chunk["review_body"])
+    chunk["product_category_encoded"] = pd.Categorical(chunk["product_category"], categories=categories).codes
+    chunk["review_sentiment"] = label_sentiment(chunk["star_rating"])
+    return chunk
+
+def balance_with_smote(df):
+    """Oversamples minority sentiments with SMOTE on the numeric columns (needs the whole dataset)."""
+    target_column = "review_sentiment"
+    smote = SMOTE(sampling_strategy="auto", random_state=42)
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+
+    # SMOTE works only on numerical features, drop text columns before applying
+    X_numeric = X.select_dtypes(include=["number"])
+
+    X_resampled, y_resampled = smote.fit_resample(X_numeric, y)
+
+    # Reconstruct the DataFrame
+    df_resampled = pd.DataFrame(X_resampled, columns=X_numeric.columns)
+    df_resampled[target_column] = y_resampled
+
+    # Merge back non-numeric columns
+    df_non_numeric = X.drop(columns=X_numeric.columns)
+    df_non_numeric_resampled = df_non_numeric.iloc[:len(df_resampled)].reset_index(drop=True)
+    return pd.concat([df_resampled, df_non_numeric_resampled], axis=1)
+
+def arrow_schema(df):
+    """Parquet schema for every part file; all-null text columns are typed as strings, not null."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, pa.field(field.name, pa.string()))
+    return schema
+
+def replace_path(temp_path, path):
+    """Moves a finished output into place, replacing a previous file or directory."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+    os.replace(temp_path, path)
+
+def preprocess_data(input_path=RAW_DATA_PATH, parquet_path=PROCESSED_PARQUET_PATH, csv_path=PROCESSED_CSV_PATH,
+                    chunksize=PREPROCESS_CHUNKSIZE):
+    """Cleans, scales star ratings, encodes, adds sentiment labels and, in whole-file mode, balances (SMOTE).
+
+    With chunksize 0 the whole file is read once, processed in memory and written as a single Parquet file.
+    Otherwise the raw CSV is streamed in chunks: a first pass finds the column types, star rating
+    range and product categories of the whole file, and the second pass processes each chunk and
+    appends it to a Parquet dataset directory (one part file per chunk) and the CSV, so memory
+    stays bounded. SMOTE needs every row at once and is skipped in chunked mode.
+    """
+    parquet_temp = csv_temp = None
+    try:
+        if chunksize:
+            logging.info("🔹 Scanning raw data (types, rating range, categories)...")
+            dtypes, low, high, categories = scan_raw_data(input_path, chunksize)
+            chunks = read_chunks(input_path, chunksize, dtype=dtypes)
+        else:
+            logging.info("🔹 Loading raw data...")
+            raw = pd.read_csv(input_path)
+            _, low, high, categories = summarize_raw_data([raw])
+            chunks = [raw]
+
+        # ✅ Scale `star_rating` to range 1-5 if it's outside the bounds
+        scaler = None
+        if low < 1 or high > 5:
+            logging.warning(f"⚠️ Star ratings out of range! Scaling to 1-5...")
+            scaler = MinMaxScaler(feature_range=(1, 5)).fit(pd.DataFrame({"star_rating": [low, high]}))
 
-        # ✅ Save processed data in both Parquet and CSV formats
         os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
-        df.to_parquet(parquet_path)
-        df.to_csv(csv_path, index=False)
+        # Outputs are built next to their destination and moved into place once complete
+        if chunksize:
+            parquet_temp = tempfile.mkdtemp(dir=os.path.dirname(parquet_path), prefix=".reviews-")
+        else:
+            parquet_fd, parquet_temp = tempfile.mkstemp(dir=os.path.dirname(parquet_path), suffix=".parquet.tmp")
+            os.close(parquet_fd)
+        csv_fd, csv_temp = tempfile.mkstemp(dir=os.path.dirname(csv_path) or ".", suffix=".csv.tmp")
+        os.close(csv_fd)
+
+        logging.info("🔹 Dropping duplicates, standardizing text, encoding and labelling in chunks...")
+        deduplicator = RowDeduplicator()
+        sentiment_counts = Counter()
+        schema, part = None, 0
+        processed = []
+        for chunk in chunks:
+            chunk = preprocess_chunk(chunk, deduplicator, scaler, categories)
+            sentiment_counts.update(chunk["review_sentiment"].value_counts().to_dict())
+            if not chunksize:
+                processed.append(chunk)
+                continue
+
+            schema = schema or arrow_schema(chunk)
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            pq.write_table(table, os.path.join(parquet_temp, f"part-{part:05d}.parquet"))
+            chunk.to_csv(csv_temp, mode="a", header=part == 0, index=False)
+            part += 1
+
+        # Check class distribution
+        logging.info(f"🔹 Initial Sentiment Distribution: {sentiment_counts}")
+
+        if not chunksize:
+            df = processed[0]
+            # ✅ Apply SMOTE only if dataset has multiple sentiment classes and imbalance is significant
+            min_count = min(sentiment_counts.values())
+            max_count = max(sentiment_counts.values())
+            if len(sentiment_counts) > 2 and max_count / min_count > 1.5:  # Apply SMOTE only if needed
+                logging.info("🔹 Applying SMOTE Oversampling...")
+                df = balance_with_smote(df)
+            df.to_parquet(parquet_temp, index=False)
+            df.to_csv(csv_temp, index=False)
+            sentiment_counts = Counter(df["review_sentiment"])
+        else:
+            logging.info("🔹 Skipping SMOTE in chunked mode (it needs the whole dataset in memory); "
+                         "set PREPROCESS_CHUNKSIZE=0 to balance here.")
+
+        # ✅ Save processed data in both Parquet and CSV formats
+        replace_path(parquet_temp, parquet_path)
+        replace_path(csv_temp, csv_path)
 
         logging.info(f"✅ Data preprocessing completed. Saved to {parquet_path} & {csv_path}")
-        logging.info(f"🔹 Balanced Sentiment Distribution: {Counter(df['review_sentiment'])}")
+        logging.info(f"🔹 Balanced Sentiment Distribution: {sentiment_counts}")
         return parquet_path, csv_path
     except Exception as e:
         logging.error(f"❌ Error during preprocessing: {e}")
+        for temp_path in (parquet_temp, csv_temp):
+            if temp_path and os.path.isdir(temp_path):
+                shutil.rmtree(temp_path)
+            elif temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
         return None, None
 
 # Run the function
@@ -0,0 +1,124 @@
+import tensorflow_data_validation as tfdv
+import tensorflow as tf
+import pandas as pd
+import hashlib
+import os
+import logging
+import sys
+from tensorflow_metadata.proto.v0 import statistics_pb2
+from mlops_core.chunked_statistics import generate_chunked_statistics
+
+# Setup logging
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "mlops_statistics_pipeline.log")
+
+os.makedirs(LOG_DIR, exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler(LOG_FILE, encoding="utf-8"),
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+
+# File paths
+PROCESSED_DATA_PATH = "data/processed/reviews.parquet"
+NEW_STATS_PATH = "validation/new_stats.tfrecord"
+
+# "tfdv": TFDV on the whole dataset in memory
+# "chunked": mergeable per-row-group summaries in a process pool, for datasets larger than RAM
+STATS_MODE = os.environ.get("STATS_MODE", "tfdv")
+
+
+def stats_hash_path(stats_path):
+    """Sidecar file recording the hash of the dataset `stats_path` was computed from."""
+    return stats_path + ".sha256"
+
+
+def dataset_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a dataset file's contents, or of every file (names and contents) in a dataset directory."""
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.relpath(os.path.join(root, name), path)
+            for root, _, names in os.walk(path) for name in names
+        )
+    else:
+        files = [""]
+
+    digest = hashlib.sha256()
+    for name in files:
+        if name:
+            digest.update(name.encode("utf-8") + b"\0")
+        with open(os.path.join(path, name) if name else path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_statistics_as_tfrecord(stats, path):
+    """Save dataset statistics as TFRecord binary file."""
+    with tf.io.TFRecordWriter(path) as writer:
+        writer.write(stats.SerializeToString())
+
+
+def load_statistics_from_tfrecord(path):
+    """Load dataset statistics from TFRecord binary file."""
+    dataset = tf.data.TFRecordDataset([path])
+    for record in dataset:
+        stats = statistics_pb2.DatasetFeatureStatisticsList()
+        stats.ParseFromString(record.numpy())
+        return stats
+    return None
+
+
+def generate_statistics(input_path=PROCESSED_DATA_PATH, stats_path=NEW_STATS_PATH):
+    """Computes TFDV statistics for the processed dataset once per dataset version.
+
+    The statistics are written to `stats_path` together with the dataset hash; if the dataset
+    has not changed since, the saved statistics are kept and nothing is recomputed.
+    """
+    try:
+        # Statistics from the two modes differ slightly, so the mode is part of the key
+        current_hash = f"{dataset_hash(input_path)} {STATS_MODE}"
+        hash_path = stats_hash_path(stats_path)
+        if os.path.exists(stats_path) and os.path.exists(hash_path):
+            with open(hash_path, encoding="utf-8") as f:
+                if f.read().strip() == current_hash:
+                    logging.info(f"✅ Statistics for this dataset already at {stats_path}, reusing them.")
+                    return stats_path
+
+        if STATS_MODE == "chunked":
+            logging.info("🔹 Generating dataset statistics row group by row group...")
+            stats = generate_chunked_statistics(input_path)
+        else:
+            logging.info("🔹 Loading processed data for statistics generation...")
+            df = pd.read_parquet(input_path)
+
+            logging.info("🔹 Generating dataset statistics...")
+            stats = tfdv.generate_statistics_from_dataframe(df)
+
+        os.makedirs(os.path.dirname(stats_path), exist_ok=True)
+        save_statistics_as_tfrecord(stats, stats_path)
+        # Hash written last, so interrupted runs never mark stale statistics as current
+        with open(hash_path, "w", encoding="utf-8") as f:
+            f.write(current_hash)
+
+        logging.info(f"✅ Statistics saved at {stats_path}")
+        return stats_path
+    except Exception as e:
+        logging.error(f"❌ Error during statistics generation: {e}")
+        return None
+
+
+def load_dataset_statistics(input_path=PROCESSED_DATA_PATH, stats_path=NEW_STATS_PATH):
+    """Statistics of the processed dataset, generated only if the saved ones are missing or stale."""
+    if generate_statistics(input_path, stats_path) is None:
+        raise RuntimeError(f"Could not generate statistics for {input_path}")
+    return load_statistics_from_tfrecord(stats_path)
+
+
+# Run the function
+if __name__ == "__main__":
+    generate_statistics()
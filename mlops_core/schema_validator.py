@@ -1,10 +1,9 @@
 import tensorflow_data_validation as tfdv
-import tensorflow as tf
-import pandas as pd
 import os
 import logging
 import sys
 from tensorflow_data_validation.utils import schema_util
+from mlops_core.dataset_statistics import load_dataset_statistics, save_statistics_as_tfrecord
 
 # Setup logging
 LOG_DIR = "logs"
@@ -26,19 +25,11 @@ PROCESSED_DATA_PATH = "data/processed/reviews.parquet"
 SCHEMA_PATH = "validation/schema.pbtxt"
 REFERENCE_STATS_PATH = "validation/reference_stats.tfrecord"  # ✅ Stores reference statistics
 
-def save_statistics_as_tfrecord(stats, path):
-    """Save dataset statistics as TFRecord binary file."""
-    with tf.io.TFRecordWriter(path) as writer:
-        writer.write(stats.SerializeToString())
-
 def validate_schema(input_path=PROCESSED_DATA_PATH, schema_path=SCHEMA_PATH, stats_path=REFERENCE_STATS_PATH):
     """Validates dataset schema using TensorFlow Data Validation (TFDV)."""
     try:
-        logging.info("🔹 Loading processed data for schema validation...")
-        df = pd.read_parquet(input_path)
-        
-        logging.info("🔹 Generating statistics for schema validation...")
-        stats = tfdv.generate_statistics_from_dataframe(df)
+        logging.info("🔹 Loading dataset statistics for schema validation...")
+        stats = load_dataset_statistics(input_path)
 
         # ✅ Check if schema already exists
         if os.path.exists(schema_path):
@@ -0,0 +1,168 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("tensorflow_data_validation")
+from tensorflow_metadata.proto.v0 import statistics_pb2
+
+# Star ratings 1-5 of a reference dataset
+RATINGS = {1: 10, 2: 10, 3: 20, 4: 25, 5: 35}
+
+
+@pytest.fixture(scope="module")
+def bias_detector(tmp_path_factory):
+    """bias_detector, imported from a scratch directory since it creates logs/ in the working directory."""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("bias"))
+    try:
+        from mlops_core import bias_detector
+    finally:
+        os.chdir(cwd)
+    return bias_detector
+
+
+def histogram(buckets, histogram_type=statistics_pb2.Histogram.STANDARD):
+    """Histogram proto from (low, high, count) triples."""
+    hist = statistics_pb2.Histogram(type=histogram_type)
+    for low, high, count in buckets:
+        hist.buckets.add(low_value=low, high_value=high, sample_count=count)
+    return hist
+
+
+def quantile_buckets(values, n_buckets=10):
+    """Equal-count quantile buckets of `values`, as TFDV builds them."""
+    edges = np.quantile(np.asarray(values, dtype=float), np.linspace(0, 1, n_buckets + 1), method="inverted_cdf")
+    return [(low, high, len(values) / n_buckets) for low, high in zip(edges[:-1], edges[1:])]
+
+
+def numeric_feature(name, values, standard_buckets, feature_type=statistics_pb2.FeatureNameStatistics.INT):
+    feature = statistics_pb2.FeatureNameStatistics(type=feature_type)
+    feature.path.step.append(name)
+    feature.num_stats.mean = float(np.mean(values))
+    feature.num_stats.min, feature.num_stats.max = float(np.min(values)), float(np.max(values))
+    feature.num_stats.histograms.append(histogram(standard_buckets))
+    feature.num_stats.histograms.append(histogram(quantile_buckets(values), statistics_pb2.Histogram.QUANTILES))
+    return feature
+
+
+def rating_feature(counts):
+    values = np.repeat(list(counts), list(counts.values()))
+    # TFDV's standard histogram of star ratings: 10 equal-width buckets from 1 to 5
+    edges = np.linspace(1, 5, 11)
+    standard = [(low, high, int(np.sum((values >= low) & ((values < high) | (high == 5)))))
+                for low, high in zip(edges[:-1], edges[1:])]
+    return numeric_feature("star_rating", values, standard)
+
+
+def continuous_feature(values):
+    counts, edges = np.histogram(values, bins=10)
+    return numeric_feature("helpful_votes", values, list(zip(edges[:-1], edges[1:], counts)),
+                           statistics_pb2.FeatureNameStatistics.FLOAT)
+
+
+def categorical_feature(name, counts, num_non_missing=None, rank_histogram=True):
+    feature = statistics_pb2.FeatureNameStatistics(type=statistics_pb2.FeatureNameStatistics.STRING)
+    feature.path.step.append(name)
+    string_stats = feature.string_stats
+    string_stats.common_stats.num_non_missing = sum(counts.values()) if num_non_missing is None else num_non_missing
+    for rank, (value, count) in enumerate(counts.items()):
+        if rank_histogram:
+            string_stats.rank_histogram.buckets.add(low_rank=rank, high_rank=rank, label=value, sample_count=count)
+        else:
+            string_stats.top_values.add(value=value, frequency=count)
+    return feature
+
+
+def statistics(features):
+    stats = statistics_pb2.DatasetFeatureStatisticsList()
+    stats.datasets.add().features.extend(features)
+    return stats
+
+
+def test_rebin_histogram_onto_identical_buckets_keeps_counts(bias_detector):
+    buckets = [(0.0, 1.0, 3), (1.0, 2.0, 5), (2.0, 4.0, 2)]
+    low, high, _ = bias_detector.histogram_arrays(histogram(buckets))
+    rebinned = bias_detector.rebin_histogram(histogram(buckets), low, high)
+    assert rebinned.tolist() == [0, 3, 5, 2, 0]
+
+
+def test_rebin_histogram_splits_buckets_by_overlap(bias_detector):
+    ref_low, ref_high = np.array([0.0, 1.0, 2.0]), np.array([1.0, 2.0, 3.0])
+    rebinned = bias_detector.rebin_histogram(histogram([(-1.0, 1.0, 4), (1.5, 4.5, 6)]), ref_low, ref_high)
+    # Half of [-1, 1) is below the reference range; [1.5, 4.5) puts a sixth in [1.5, 2), a third in [2, 3)
+    assert np.allclose(rebinned, [2, 2, 1, 2, 3])
+    assert np.isclose(rebinned.sum(), 10)
+
+
+def test_rebin_histogram_puts_point_buckets_in_one_reference_bucket(bias_detector):
+    ref_low, ref_high = np.array([0.0, 1.0, 2.0]), np.array([1.0, 2.0, 3.0])
+    points = histogram([(-2.0, -2.0, 1), (1.0, 1.0, 4), (2.5, 2.5, 2), (7.0, 7.0, 3)])
+    # A value on a shared edge belongs to the first bucket that contains it, not to both
+    assert bias_detector.rebin_histogram(points, ref_low, ref_high).tolist() == [1, 4, 0, 2, 3]
+
+
+def test_identical_numeric_features_do_not_drift(bias_detector):
+    result = bias_detector.compare_numeric(rating_feature(RATINGS), rating_feature(RATINGS))
+    assert result["percent_drift"] == 0
+    assert result["js_divergence"] == pytest.approx(0, abs=1e-12)
+    assert result["cdf_shift"] == 0
+
+
+def test_small_moves_of_a_discrete_feature_are_not_flagged(bias_detector):
+    # 6% of the reviews move from 5 to 4 stars, which moves the 70th percentile from 5 to 4 stars
+    moved = {**RATINGS, 4: 31, 5: 29}
+    new, reference = rating_feature(moved), rating_feature(RATINGS)
+    new_edges = [b.high_value for b in new.num_stats.histograms[1].buckets]
+    ref_edges = [b.high_value for b in reference.num_stats.histograms[1].buckets]
+    assert new_edges[6] == 4 and ref_edges[6] == 5
+
+    result = bias_detector.compare_numeric(new, reference)
+    assert result["cdf_shift"] < bias_detector.CDF_SHIFT_THRESHOLD, \
+        "A quantile edge moving a whole star is not a large distribution shift"
+    assert result["js_divergence"] < bias_detector.JS_DIVERGENCE_THRESHOLD
+    report = bias_detector.compare_statistics(statistics([new]), statistics([reference]))
+    assert "⚠️" not in report[0]
+
+
+def test_large_moves_of_a_discrete_feature_are_flagged(bias_detector):
+    polarized = {1: 40, 2: 5, 3: 5, 4: 10, 5: 40}
+    result = bias_detector.compare_numeric(rating_feature(polarized), rating_feature(RATINGS))
+    assert result["cdf_shift"] > bias_detector.CDF_SHIFT_THRESHOLD
+    report = bias_detector.compare_statistics(statistics([rating_feature(polarized)]),
+                                              statistics([rating_feature(RATINGS)]))
+    assert report[0].endswith("⚠️")
+
+
+def test_continuous_shift_is_measured_as_a_cdf_difference(bias_detector):
+    rng = np.random.default_rng(3)
+    reference = rng.normal(size=20000)
+    result = bias_detector.compare_numeric(continuous_feature(reference + 1.0), continuous_feature(reference))
+    # Shifting a normal by one standard deviation moves its CDF by at most 2 * Phi(0.5) - 1 ~= 0.38
+    assert result["cdf_shift"] == pytest.approx(0.38, abs=0.05)
+    assert result["js_divergence"] > bias_detector.JS_DIVERGENCE_THRESHOLD
+
+
+def test_compare_categorical_distances(bias_detector):
+    new = categorical_feature("product_category", {"Books": 50, "Toys": 30, "Home": 20})
+    reference = categorical_feature("product_category", {"Books": 50, "Toys": 50})
+    result = bias_detector.compare_categorical(new, reference)
+    assert result["l_infinity"] == pytest.approx(0.2)
+    p, q = np.array([0.5, 0.3, 0.2]), np.array([0.5, 0.5, 0.0])
+    m = (p + q) / 2
+    expected = (np.sum(p * np.log2(p / m)) + np.sum(q[q > 0] * np.log2(q[q > 0] / m[q > 0]))) / 2
+    assert result["js_divergence"] == pytest.approx(expected)
+
+
+def test_compare_categorical_counts_values_beyond_the_histogram_as_one_bucket(bias_detector):
+    # 40 of 100 reviews have values outside the top values, in both datasets
+    new = categorical_feature("product_category", {"Books": 60}, num_non_missing=100, rank_histogram=False)
+    reference = categorical_feature("product_category", {"Books": 30, "Toys": 30}, num_non_missing=100)
+    assert bias_detector.value_counts(new.string_stats) == {"Books": 60, None: 40}
+    result = bias_detector.compare_categorical(new, reference)
+    assert result["l_infinity"] == pytest.approx(0.3)
+
+
+def test_compare_categorical_without_values(bias_detector):
+    empty = categorical_feature("product_category", {})
+    assert bias_detector.compare_categorical(empty, categorical_feature("product_category", {"Books": 1})) == {}
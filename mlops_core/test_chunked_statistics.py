@@ -0,0 +1,121 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from mlops_core.chunked_statistics import KMV_SIZE, QUANTILE_POINTS, compute_column_statistics, to_statistics_proto
+
+N_ROWS = 12000
+
+
+@pytest.fixture(scope="module")
+def table():
+    """Reviews-like columns with missing values, a discrete rating and a high-cardinality string."""
+    rng = np.random.default_rng(7)
+    rating = rng.choice([1, 2, 3, 4, 5], size=N_ROWS, p=[0.1, 0.1, 0.2, 0.25, 0.35])
+    helpful = rng.lognormal(mean=1.0, sigma=1.5, size=N_ROWS) * 1e3
+    helpful[rng.random(N_ROWS) < 0.05] = np.nan
+    helpful[rng.random(N_ROWS) < 0.05] = 0.0
+    category = rng.choice(["Books", "Toys", "Home", "Électronique"], size=N_ROWS).astype(object)
+    category[rng.random(N_ROWS) < 0.03] = None
+    review_id = np.array([f"R{i:07d}" for i in rng.permutation(N_ROWS)], dtype=object)
+    return pa.table({
+        "star_rating": pa.array(rating, mask=rng.random(N_ROWS) < 0.02),
+        "helpful_votes": pa.array(helpful),  # NaN stays a value in Arrow but counts as missing
+        "product_category": pa.array(category, type=pa.string()),
+        "review_id": pa.array(review_id, type=pa.string()),
+    })
+
+
+def column_statistics(table, tmp_path, row_group_size, files=1):
+    """compute_column_statistics over `files` Parquet files split into row groups of `row_group_size`."""
+    path = tmp_path / f"dataset-{row_group_size}-{files}"
+    path.mkdir()
+    bounds = np.linspace(0, table.num_rows, files + 1).astype(int)
+    for part, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        pq.write_table(table.slice(start, end - start), path / f"part-{part:05d}.parquet", row_group_size=row_group_size)
+    return compute_column_statistics(str(path), workers=2)
+
+
+def numeric_values(table, name):
+    values = table.column(name).to_pandas().to_numpy(dtype=np.float64)
+    return values[~np.isnan(values)]
+
+
+# One row group, many row groups of one file, and row groups spread over several part files
+@pytest.fixture(scope="module", params=[(N_ROWS, 1), (1000, 1), (777, 3)], ids=["1 chunk", "12 chunks", "3 files"])
+def merged(request, table, tmp_path_factory):
+    row_group_size, files = request.param
+    return column_statistics(table, tmp_path_factory.mktemp("stats"), row_group_size, files)
+
+
+def test_counts_and_missing_values_are_exact(table, merged):
+    num_rows, columns = merged
+    assert num_rows == N_ROWS
+    for name, stats in columns.items():
+        values = table.column(name).to_pandas()
+        assert stats.num_missing == int(values.isna().sum()), f"Missing count of {name}"
+        assert stats.count == int(values.notna().sum()), f"Non-missing count of {name}"
+
+
+@pytest.mark.parametrize("name", ["star_rating", "helpful_votes"])
+def test_merged_moments_and_extremes_match_whole_table(table, merged, name):
+    stats = merged[1][name]
+    values = numeric_values(table, name)
+    assert stats.min == values.min() and stats.max == values.max()
+    assert stats.num_zeros == int((values == 0).sum())
+    np.testing.assert_allclose(stats.mean, values.mean(), rtol=1e-12)
+    np.testing.assert_allclose(stats.m2 / stats.count, values.var(), rtol=1e-10)
+
+
+@pytest.mark.parametrize("name", ["star_rating", "helpful_votes"])
+def test_quantiles_are_within_sketch_resolution_in_rank(table, merged, name):
+    stats = merged[1][name]
+    values = np.sort(numeric_values(table, name))
+    probabilities = np.linspace(0, 1, 101)
+    quantiles = stats.quantiles(probabilities)
+    # q is a p-quantile if F(q-) <= p <= F(q); each chunk's sketch is 1/(QUANTILE_POINTS - 1) coarse in rank
+    below = np.searchsorted(values, quantiles, side="left") / len(values)
+    at_or_below = np.searchsorted(values, quantiles, side="right") / len(values)
+    resolution = 1 / (QUANTILE_POINTS - 1)
+    assert np.all(below - resolution <= probabilities + 1e-12), f"{name} quantiles are too high"
+    assert np.all(probabilities <= at_or_below + resolution + 1e-12), f"{name} quantiles are too low"
+
+
+def test_discrete_quantiles_of_one_chunk_are_exact(table, tmp_path):
+    stats = column_statistics(table, tmp_path, N_ROWS)[1]["star_rating"]
+    probabilities = np.linspace(0, 1, 21)
+    expected = np.quantile(numeric_values(table, "star_rating"), probabilities, method="inverted_cdf")
+    assert np.array_equal(stats.quantiles(probabilities), expected)
+
+
+def test_unique_counts(table, merged):
+    columns = merged[1]
+    # Few distinct values are counted exactly; beyond KMV_SIZE the estimate has ~1.6% standard error
+    assert columns["product_category"].unique_estimate() == 4
+    true_unique = table.column("review_id").to_pandas().nunique()
+    assert true_unique > KMV_SIZE
+    assert abs(columns["review_id"].unique_estimate() - true_unique) / true_unique < 0.05
+
+
+def test_top_values_and_lengths_are_exact(table, merged):
+    stats = merged[1]["product_category"]
+    values = table.column("product_category").to_pandas().dropna()
+    assert stats.top_values == values.value_counts().to_dict()
+    assert stats.total_length == int(values.str.len().sum())
+
+
+def test_statistics_proto_matches_whole_table(table, merged):
+    proto = to_statistics_proto(*merged).datasets[0]
+    assert proto.num_examples == N_ROWS
+    features = {feature.path.step[0]: feature for feature in proto.features}
+
+    rating = features["star_rating"].num_stats
+    values = numeric_values(table, "star_rating")
+    assert rating.common_stats.num_missing == N_ROWS - len(values)
+    assert rating.median in set(values), "Integer medians should be observed values"
+    standard = [h for h in rating.histograms if h.type == h.STANDARD][0]
+    assert sum(bucket.sample_count for bucket in standard.buckets) == pytest.approx(len(values))
+
+    category = features["product_category"].string_stats
+    assert category.unique == 4
+    assert category.top_values[0].value == table.column("product_category").to_pandas().value_counts().index[0]
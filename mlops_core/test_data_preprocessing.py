@@ -0,0 +1,136 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+REVIEW_WORDS = ["Great", "product!", "très", "bien", "Straße", "naïve", "ok\x0bfine", "file\x1cseparator",
+                "İstanbul", "ﬁne", "broke...", "(refund)", "don't", "👍", "half-price", "5/5"]
+CATEGORIES = ["Books", "Toys", "Home", "Garden", "Électronique"]
+
+
+@pytest.fixture(scope="module")
+def preprocessing(tmp_path_factory):
+    """data_preprocessing, imported from a scratch directory since it creates logs/ in the working directory."""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("preprocessing"))
+    try:
+        from mlops_core import data_preprocessing
+    finally:
+        os.chdir(cwd)
+    return data_preprocessing
+
+
+def make_raw_reviews(n_rows=3000, seed=0, ratings=range(0, 11)):
+    """Raw reviews with missing values, duplicates far apart and values that only occur in some chunks."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "review_id": [f"R{i:06d}" for i in range(n_rows)],
+        "star_rating": rng.choice(list(ratings), size=n_rows),
+        "review_headline": rng.choice(["Nice", "Bad", None], size=n_rows),
+        "review_body": [" ".join(rng.choice(REVIEW_WORDS, size=rng.integers(1, 8))) for _ in range(n_rows)],
+        # The first chunks only see three categories, so codes must come from the whole file
+        "product_category": np.where(np.arange(n_rows) < n_rows // 2, rng.choice(CATEGORIES[2:], size=n_rows),
+                                     rng.choice(CATEGORIES, size=n_rows)),
+        "helpful_votes": rng.integers(0, 50, size=n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.02, "review_body"] = None
+    df.loc[rng.random(n_rows) < 0.02, "product_category"] = None
+    # Extreme ratings sit in a single late chunk, so the scaler must be fitted on the whole file
+    df.loc[n_rows - 50, "star_rating"] = max(ratings)
+    df.loc[n_rows - 49, "star_rating"] = min(ratings)
+    # Exact duplicates of early rows, several chunks later
+    duplicates = df.iloc[rng.choice(n_rows // 3, size=100, replace=False)]
+    return pd.concat([df, duplicates], ignore_index=True)
+
+
+def run(preprocessing, raw, tmp_path, chunksize):
+    """Runs preprocess_data on `raw` and returns (parquet path, csv path)."""
+    workdir = tmp_path / f"chunksize-{chunksize}"
+    workdir.mkdir()
+    raw_path = workdir / "raw.csv"
+    raw.to_csv(raw_path, index=False)
+    parquet_path, csv_path = preprocessing.preprocess_data(
+        str(raw_path), str(workdir / "processed" / "reviews.parquet"), str(workdir / "processed" / "reviews.csv"),
+        chunksize=chunksize,
+    )
+    assert parquet_path is not None, "Preprocessing failed"
+    return parquet_path, csv_path
+
+
+def read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.skipif("PREPROCESS_CHUNKSIZE" in os.environ, reason="chunk size overridden by the environment")
+def test_whole_file_mode_is_the_default(preprocessing):
+    assert preprocessing.PREPROCESS_CHUNKSIZE == 0, "The default run must process the whole file and balance it"
+
+
+@pytest.mark.parametrize("chunksize", [1, 37, 250, 10 ** 6])
+def test_chunked_output_matches_whole_file_run(preprocessing, tmp_path, chunksize):
+    # Sentiments are close enough to balanced that the whole-file run does not apply SMOTE either
+    raw = make_raw_reviews(n_rows=600)
+    whole_parquet, whole_csv = run(preprocessing, raw, tmp_path, 0)
+    chunked_parquet, chunked_csv = run(preprocessing, raw, tmp_path, chunksize)
+
+    assert read_text(chunked_csv) == read_text(whole_csv), "Chunked CSV differs from the whole-file CSV"
+    pd.testing.assert_frame_equal(pd.read_parquet(chunked_parquet), pd.read_parquet(whole_parquet))
+    assert os.path.isfile(whole_parquet) and os.path.isdir(chunked_parquet)
+
+
+@pytest.mark.parametrize("chunksize, passes", [(0, 1), (250, 2)])
+def test_raw_file_is_read_once_per_pass(preprocessing, tmp_path, monkeypatch, chunksize, passes):
+    raw = make_raw_reviews(n_rows=600)
+    paths = []
+    read_csv = pd.read_csv
+
+    def record_read(path, *args, **kwargs):
+        paths.append(os.path.basename(path))
+        return read_csv(path, *args, **kwargs)
+
+    monkeypatch.setattr(preprocessing.pd, "read_csv", record_read)
+    run(preprocessing, raw, tmp_path, chunksize)
+    assert paths == ["raw.csv"] * passes, "The whole-file run should read the raw CSV once; chunked runs scan it first"
+
+
+def test_duplicates_are_dropped_across_chunks(preprocessing, tmp_path):
+    raw = make_raw_reviews()
+    _, csv_path = run(preprocessing, raw, tmp_path, 97)
+    processed = pd.read_csv(csv_path)
+    expected = raw.drop_duplicates().dropna(subset=["star_rating", "review_body", "product_category"])
+    assert len(processed) == len(expected), "Rows repeated in later chunks should be dropped"
+    assert not processed["review_id"].duplicated().any()
+
+
+def test_scaling_and_category_codes_use_the_whole_file(preprocessing, tmp_path):
+    raw = make_raw_reviews()
+    _, csv_path = run(preprocessing, raw, tmp_path, 97)
+    processed = pd.read_csv(csv_path).set_index("review_id")
+    source = raw.drop_duplicates().set_index("review_id").loc[processed.index]
+
+    # The global 0-10 range maps onto 1-5
+    expected_rating = (1 + 0.4 * source["star_rating"]).round().astype(int)
+    assert (processed["star_rating"] == expected_rating).all(), "Ratings should be scaled with the global range"
+    expected_codes = source["product_category"].map({c: i for i, c in enumerate(sorted(CATEGORIES))})
+    assert (processed["product_category_encoded"] == expected_codes).all(), "Codes should follow global categories"
+
+
+def test_whole_file_run_balances_with_smote(preprocessing, tmp_path):
+    raw = make_raw_reviews(ratings=[1, 3, 4, 5, 5, 5, 5, 5])
+    parquet_path, csv_path = run(preprocessing, raw, tmp_path, 0)
+    counts = pd.read_csv(csv_path)["review_sentiment"].value_counts()
+    assert counts.nunique() == 1, f"SMOTE should balance the sentiments, got {counts.to_dict()}"
+    assert os.path.isfile(parquet_path), "The whole-file run should write a single Parquet file"
+
+
+def test_normalize_text_follows_python_regex_semantics(preprocessing):
+    reviews = pd.Series([
+        "ok\x0bfine", "file\x1cseparator\x1d\x1e\x1f", "Très bien!", "Straße", "İstanbul", "ﬁne",
+        "naïve café", "日本語のレビュー", "don't stop (now)...", "tabs\tand\nnewlines", "👍 5/5", "ÀÉÎ ÕÜ", "",
+    ], index=range(10, 23))
+    expected = [preprocessing.PUNCTUATION.sub("", review.lower()) for review in reviews]
+    result = preprocessing.normalize_text(reviews)
+    assert result.tolist() == expected
+    assert result.index.equals(reviews.index)
+    assert result.iloc[0] == "ok\x0bfine" and result.iloc[2] == "très bien"
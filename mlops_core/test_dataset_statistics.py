@@ -0,0 +1,111 @@
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("tensorflow_data_validation")
+from tensorflow_metadata.proto.v0 import statistics_pb2
+
+
+@pytest.fixture(scope="module")
+def dataset_statistics(tmp_path_factory):
+    """dataset_statistics, imported from a scratch directory since it creates logs/ in the working directory."""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("statistics"))
+    try:
+        from mlops_core import dataset_statistics
+    finally:
+        os.chdir(cwd)
+    return dataset_statistics
+
+
+class StatisticsStub:
+    """Stands in for TFDV and the chunked generator, recording which one ran on how many rows."""
+
+    def __init__(self):
+        self.calls = []
+
+    def from_dataframe(self, df):
+        self.calls.append(("tfdv", len(df)))
+        return self.statistics(len(df))
+
+    def chunked(self, input_path):
+        rows = len(pd.read_parquet(input_path))
+        self.calls.append(("chunked", rows))
+        return self.statistics(rows)
+
+    @staticmethod
+    def statistics(num_examples):
+        stats = statistics_pb2.DatasetFeatureStatisticsList()
+        stats.datasets.add(num_examples=num_examples)
+        return stats
+
+
+@pytest.fixture
+def stub(dataset_statistics, monkeypatch):
+    stub = StatisticsStub()
+    monkeypatch.setattr(dataset_statistics.tfdv, "generate_statistics_from_dataframe", stub.from_dataframe)
+    monkeypatch.setattr(dataset_statistics, "generate_chunked_statistics", stub.chunked)
+    monkeypatch.setattr(dataset_statistics, "STATS_MODE", "tfdv")
+    return stub
+
+
+def write_reviews(path, n_rows):
+    pd.DataFrame({"review_id": [f"R{i}" for i in range(n_rows)], "star_rating": [i % 5 + 1 for i in range(n_rows)]}) \
+        .to_parquet(path)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    input_path = str(tmp_path / "reviews.parquet")
+    write_reviews(input_path, 10)
+    return input_path, str(tmp_path / "validation" / "new_stats.tfrecord")
+
+
+def test_unchanged_input_reuses_saved_statistics(dataset_statistics, stub, paths):
+    first = dataset_statistics.load_dataset_statistics(*paths)
+    second = dataset_statistics.load_dataset_statistics(*paths)
+    assert stub.calls == [("tfdv", 10)], "Statistics of an unchanged dataset should be computed once"
+    assert first == second and second.datasets[0].num_examples == 10
+
+
+def test_changed_input_recomputes_statistics(dataset_statistics, stub, paths):
+    input_path, stats_path = paths
+    dataset_statistics.load_dataset_statistics(input_path, stats_path)
+    write_reviews(input_path, 12)
+    stats = dataset_statistics.load_dataset_statistics(input_path, stats_path)
+    assert stub.calls == [("tfdv", 10), ("tfdv", 12)]
+    assert stats.datasets[0].num_examples == 12
+
+
+def test_mode_change_recomputes_statistics(dataset_statistics, stub, paths, monkeypatch):
+    dataset_statistics.load_dataset_statistics(*paths)
+    monkeypatch.setattr(dataset_statistics, "STATS_MODE", "chunked")
+    dataset_statistics.load_dataset_statistics(*paths)
+    dataset_statistics.load_dataset_statistics(*paths)
+    monkeypatch.setattr(dataset_statistics, "STATS_MODE", "tfdv")
+    dataset_statistics.load_dataset_statistics(*paths)
+    assert stub.calls == [("tfdv", 10), ("chunked", 10), ("tfdv", 10)]
+
+
+def test_statistics_without_a_hash_are_recomputed(dataset_statistics, stub, paths):
+    # An interrupted run can leave statistics behind without the hash that marks them current
+    input_path, stats_path = paths
+    dataset_statistics.load_dataset_statistics(input_path, stats_path)
+    os.remove(dataset_statistics.stats_hash_path(stats_path))
+    dataset_statistics.load_dataset_statistics(input_path, stats_path)
+    assert stub.calls == [("tfdv", 10), ("tfdv", 10)]
+
+
+def test_dataset_directories_are_hashed_by_file_names_and_contents(dataset_statistics, tmp_path):
+    directory = tmp_path / "dataset"
+    directory.mkdir()
+    (directory / "part-00000.parquet").write_bytes(b"first")
+    original = dataset_statistics.dataset_hash(str(directory))
+
+    (directory / "part-00001.parquet").write_bytes(b"")
+    assert dataset_statistics.dataset_hash(str(directory)) != original, "An added (even empty) file is a change"
+    os.remove(directory / "part-00001.parquet")
+    assert dataset_statistics.dataset_hash(str(directory)) == original
+    os.rename(directory / "part-00000.parquet", directory / "part-00002.parquet")
+    assert dataset_statistics.dataset_hash(str(directory)) != original, "Renaming a file is a change"